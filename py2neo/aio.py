@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Asyncio-native counterparts to the :class:`.Graph`,
+:class:`.Transaction` and :class:`.Cursor` classes. All network
+activity is carried out on the running event loop, so a single loop can
+drive many concurrent queries without requiring a thread per request::
+
+    >>> from asyncio import get_event_loop
+    >>> from py2neo.aio import AsyncGraph
+    >>> async def main():
+    ...     graph = AsyncGraph("bolt://localhost:7687")
+    ...     cursor = await graph.run("UNWIND range(1, 3) AS n RETURN n")
+    ...     async for record in cursor:
+    ...         print(record["n"])
+    ...     graph.close()
+    >>> get_event_loop().run_until_complete(main())
+    1
+    2
+    3
+
+.. note::
+   This module requires Python 3.5 or above.
+"""
+
+
+__all__ = [
+    "AsyncGraph",
+    "AsyncTransaction",
+    "AsyncCursor",
+]
+
+
+from collections import deque
+
+from py2neo.database import Graph, GraphError, TransactionError
+from py2neo.internal.aio import AsyncConnector
+
+
+class AsyncGraph(object):
+    """ Asyncio counterpart of :class:`.Graph`, accepting the same
+    URI and settings. Entities hydrated from results are bound to, and
+    cached by, the equivalent blocking :class:`.Graph`, which is
+    available as the :attr:`.graph` attribute. That graph only opens
+    a connection pool of its own if it is used for blocking
+    operations; all queries run through this object use the pool of
+    its asynchronous connector.
+    """
+
+    #: The blocking :class:`.Graph` to which hydrated entities are bound.
+    graph = None
+
+    def __init__(self, uri=None, **settings):
+        self.graph = Graph(uri, **settings)
+        self.connector = AsyncConnector(uri, **settings)
+
+    def __repr__(self):
+        return "<AsyncGraph database=%r name=%r>" % (self.graph.database, self.graph.name)
+
+    def close(self):
+        """ Close all pooled connections.
+        """
+        self.connector.close()
+
+    async def begin(self, autocommit=False):
+        """ Begin a new :class:`.AsyncTransaction`.
+
+        :param autocommit: if :py:const:`True`, the transaction will
+                         automatically commit after the first operation
+        """
+        tx = AsyncTransaction(self, autocommit)
+        if not autocommit:
+            tx.transaction = await self.connector.begin()
+        return tx
+
+    async def run(self, cypher, parameters=None, **kwparameters):
+        """ Run a :meth:`.AsyncTransaction.run` operation within an
+        `autocommit` :class:`.AsyncTransaction`.
+
+        :param cypher: Cypher statement
+        :param parameters: dictionary of parameters
+        :param kwparameters: extra keyword parameters
+        :return: :class:`.AsyncCursor` object
+        """
+        tx = await self.begin(autocommit=True)
+        return await tx.run(cypher, parameters, **kwparameters)
+
+    async def evaluate(self, cypher, parameters=None, **kwparameters):
+        """ Run a :meth:`.AsyncTransaction.evaluate` operation within an
+        `autocommit` :class:`.AsyncTransaction`.
+
+        :param cypher: Cypher statement
+        :param parameters: dictionary of parameters
+        :return: first value from the first record returned or
+                 :py:const:`None`.
+        """
+        tx = await self.begin(autocommit=True)
+        return await tx.evaluate(cypher, parameters, **kwparameters)
+
+
+class AsyncTransaction(object):
+    """ Asyncio counterpart of :class:`.Transaction`. Instances should
+    be obtained through :meth:`.AsyncGraph.begin` and may be used as
+    asynchronous context managers::
+
+        async with await graph.begin() as tx:
+            await tx.run("CREATE (a:Person {name:$x})", x="Alice")
+
+    """
+
+    _finished = False
+
+    #: Handle for the underlying server transaction.
+    transaction = None
+
+    def __init__(self, graph, autocommit=False):
+        self.graph = graph
+        self.autocommit = autocommit
+        self.entities = deque()
+        self.connector = graph.connector
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self._rollback()
+
+    def _assert_unfinished(self):
+        if self._finished:
+            raise TransactionError(self)
+
+    def finished(self):
+        """ Indicates whether or not this transaction has been completed
+        or is still open.
+        """
+        return self._finished
+
+    async def run(self, cypher, parameters=None, **kwparameters):
+        """ Send a Cypher statement to the server for execution and return
+        an :class:`.AsyncCursor` for navigating its result.
+
+        :param cypher: Cypher statement
+        :param parameters: dictionary of parameters
+        :returns: :class:`.AsyncCursor` object
+        """
+        from neobolt.exceptions import CypherError
+
+        self._assert_unfinished()
+        try:
+            entities = self.entities.popleft()
+        except IndexError:
+            entities = {}
+
+        try:
+            return AsyncCursor(await self.connector.run(statement=cypher,
+                                                        parameters=dict(parameters or {}, **kwparameters),
+                                                        tx=self.transaction,
+                                                        graph=self.graph.graph,
+                                                        keys=[],
+                                                        entities=entities))
+        except CypherError as error:
+            raise GraphError.hydrate({"code": error.code, "message": error.message})
+        finally:
+            if not self.transaction:
+                self._finished = True
+
+    async def evaluate(self, cypher, parameters=None, **kwparameters):
+        """ Execute a single Cypher statement and return the value from
+        the first column of the first record.
+
+        :param cypher: Cypher statement
+        :param parameters: dictionary of parameters
+        :returns: single return value or :const:`None`
+        """
+        cursor = await self.run(cypher, parameters, **kwparameters)
+        return await cursor.evaluate(0)
+
+    async def process(self):
+        """ Send all pending statements to the server for processing.
+        """
+        self._assert_unfinished()
+        if self.transaction:
+            await self.connector.sync(self.transaction)
+
+    async def commit(self):
+        """ Commit the transaction.
+        """
+        self._assert_unfinished()
+        await self.connector.commit(self.transaction)
+        self._finished = True
+
+    async def _rollback(self):
+        """ Implicit rollback.
+        """
+        if self.connector.is_valid_transaction(self.transaction):
+            await self.connector.rollback(self.transaction)
+        self._finished = True
+
+    async def rollback(self):
+        """ Roll back the current transaction, undoing all actions previously taken.
+        """
+        self._assert_unfinished()
+        await self.connector.rollback(self.transaction)
+        self._finished = True
+
+
+class AsyncCursor(object):
+    """ Asyncio counterpart of :class:`.Cursor`. Records can be
+    consumed using an ``async for`` loop::
+
+        async for record in cursor:
+            print(record["name"])
+
+    """
+
+    def __init__(self, result):
+        self._result = result
+        self._current = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if await self.forward():
+            return self._current
+        else:
+            raise StopAsyncIteration()
+
+    def __getitem__(self, key):
+        return self._current[key]
+
+    @property
+    def current(self):
+        """ Returns the current record or :py:const:`None` if no record
+        has yet been selected.
+        """
+        return self._current
+
+    async def close(self):
+        """ Close this cursor and free up all associated resources.
+        """
+        if self._result is not None:
+            await self._result.discard()    # consume and drop remaining data
+            self._result = None
+        self._current = None
+
+    def keys(self):
+        """ Return the field names for the records in the stream.
+        """
+        return self._result.keys()
+
+    async def summary(self):
+        """ Return the result summary.
+        """
+        return await self._result.summary()
+
+    async def plan(self):
+        """ Return the plan returned with this result, if any.
+        """
+        return await self._result.plan()
+
+    async def stats(self):
+        """ Return the query statistics.
+        """
+        return await self._result.stats()
+
+    async def forward(self, amount=1):
+        """ Attempt to move the cursor one position forward (or by
+        another amount if explicitly specified). The cursor will move
+        position by up to, but never more than, the amount specified.
+
+        :param amount: the amount to move the cursor
+        :returns: the amount that the cursor was able to move
+        """
+        if amount == 0:
+            return 0
+        assert amount > 0
+        amount = int(amount)
+        moved = 0
+        fetch = self._result.fetch
+        while moved != amount:
+            new_current = await fetch()
+            if new_current is None:
+                break
+            else:
+                self._current = new_current
+                moved += 1
+        return moved
+
+    async def evaluate(self, field=0):
+        """ Return the value of the first field from the next record
+        (or the value of another field if explicitly specified).
+
+        :param field: field to select value from (optional)
+        :returns: value of the field or :py:const:`None`
+        """
+        if await self.forward():
+            try:
+                return self[field]
+            except IndexError:
+                return None
+        else:
+            return None
+
+    async def data(self):
+        """ Consume and extract the entire result as a list of
+        dictionaries.
+
+        :return: the full query result
+        :rtype: `list` of `dict`
+        """
+        data = []
+        async for record in self:
+            data.append(record.data())
+        return data
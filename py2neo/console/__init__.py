@@ -38,7 +38,7 @@ from pygments.token import Token
 
 from py2neo.console.meta import HISTORY_FILE_DIR, HISTORY_FILE, TITLE, QUICK_HELP, EDITOR, DESCRIPTION, FULL_HELP
 from py2neo.cypher.lexer import CypherLexer
-from py2neo.data import Table
+from py2neo.data import Table, TableStream
 from py2neo.database import Graph
 from py2neo.internal.connectors import get_connection_data
 
@@ -262,12 +262,12 @@ class Console(object):
             self.echo(u"({})".format(status), err=True, fg=self.meta_colour, bold=True)
 
     def write_result(self, result, page_size=50):
-        table = Table(result)
-        table_size = len(table)
-        for skip in range(0, table_size, page_size):
-            self.result_writer(table, file=self.output_file, header={"fg": "cyan", "bold": True}, skip=skip, limit=page_size)
+        record_count = 0
+        for page in TableStream(result, window_size=page_size).pages():
+            self.result_writer(page, file=self.output_file, header={"fg": "cyan", "bold": True})
             self.echo("\r\n", nl=False)
-        return table_size
+            record_count += len(page)
+        return record_count
 
     def run_command(self, source):
         source = source.lstrip()
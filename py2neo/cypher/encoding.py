@@ -162,7 +162,7 @@ class CypherEncoder(object):
             return u"`" + key.replace(u"`", u"``") + u"`"
 
     def encode_value(self, value):
-        from py2neo.data import Node, Relationship, Path
+        from py2neo.data import Node, LazyNode, Relationship, Path
         from neotime import Date, Time, DateTime, Duration
         if value is None:
             return u"null"
@@ -174,7 +174,7 @@ class CypherEncoder(object):
             return ustr(value)
         if isinstance(value, string_types):
             return self.encode_string(value)
-        if isinstance(value, Node):
+        if isinstance(value, (Node, LazyNode)):
             return self.encode_node(value)
         if isinstance(value, Relationship):
             return self.encode_relationship(value)
@@ -16,11 +16,14 @@
 # limitations under the License.
 
 
+from csv import writer as csv_writer
 from functools import reduce
-from io import StringIO
-from itertools import chain
+from io import BufferedIOBase, RawIOBase, StringIO, TextIOWrapper
+from itertools import chain, islice
 from operator import xor as xor_operator
+from sys import version_info
 from uuid import uuid4
+from weakref import WeakValueDictionary
 
 from py2neo.cypher import cypher_repr, cypher_str
 from py2neo.cypher.encoding import LabelSetView
@@ -72,7 +75,17 @@ class Record(tuple, Mapping):
     yield values rather than keys.
     """
 
-    __keys = None
+    __slots__ = ()
+
+    # Records do not store their own keys. Instead, each record is an
+    # instance of a subclass that holds the keys, and an index of those
+    # keys, for every record that shares them (such as every record in
+    # a result).
+    __keys = ()
+    __index = {}
+    __base = None
+
+    __types = WeakValueDictionary()
 
     def __new__(cls, iterable=()):
         keys = []
@@ -80,9 +93,46 @@ class Record(tuple, Mapping):
         for key, value in iter_items(iterable):
             keys.append(key)
             values.append(value)
-        inst = tuple.__new__(cls, values)
-        inst.__keys = tuple(keys)
-        return inst
+        return tuple.__new__(cls.keyed(keys), values)
+
+    def __reduce__(self):
+        return self.__base or Record, (self.items(),)
+
+    @classmethod
+    def keyed(cls, keys):
+        """ Return the subclass of this class used for records with a
+        given sequence of keys. New records can be created from their
+        values alone by using the :meth:`.from_values` method of this
+        subclass, which is far cheaper than constructing each one from
+        key-value pairs.
+
+        :param keys: sequence of key names
+        :return: :class:`.Record` subclass
+        """
+        base = cls.__base or cls
+        keys = tuple(keys)
+        try:
+            return cls.__types[base, keys]
+        except KeyError:
+            subclass = type(base.__name__, (base,), {
+                "__slots__": (),
+                "__module__": base.__module__,
+                "__doc__": base.__doc__,
+                "_Record__keys": keys,
+                "_Record__index": {key: i for i, key in reversed(list(enumerate(keys)))},
+                "_Record__base": base,
+            })
+            cls.__types[base, keys] = subclass
+            return subclass
+
+    @classmethod
+    def from_values(cls, values):
+        """ Create a new record from a sequence of values. This should
+        only be called on a subclass returned by :meth:`.keyed`.
+
+        :param values: sequence of values, one for each key
+        """
+        return tuple.__new__(cls, values)
 
     def __repr__(self):
         return "<%s %s>" % (self.__class__.__name__,
@@ -102,9 +152,12 @@ class Record(tuple, Mapping):
             keys = self.__keys[key]
             values = super(Record, self).__getitem__(key)
             return self.__class__(zip(keys, values))
-        index = self.index(key)
+        try:
+            index = self.__index[key]
+        except (KeyError, TypeError):
+            index = self.index(key)
         if 0 <= index < len(self):
-            return super(Record, self).__getitem__(index)
+            return tuple.__getitem__(self, index)
         else:
             return None
 
@@ -123,11 +176,11 @@ class Record(tuple, Mapping):
         :return: selected value
         """
         try:
-            index = self.__keys.index(ustr(key))
-        except ValueError:
+            index = self.__index[ustr(key)]
+        except KeyError:
             return default
         if 0 <= index < len(self):
-            return super(Record, self).__getitem__(index)
+            return tuple.__getitem__(self, index)
         else:
             return default
 
@@ -140,8 +193,8 @@ class Record(tuple, Mapping):
             raise IndexError(key)
         elif isinstance(key, string_types):
             try:
-                return self.__keys.index(key)
-            except ValueError:
+                return self.__index[key]
+            except KeyError:
                 raise KeyError(key)
         else:
             raise TypeError(key)
@@ -224,6 +277,8 @@ class Record(tuple, Mapping):
         """
         s = None
         for value in self.values():
+            if isinstance(value, LazyNode):
+                value = value.materialize()
             if isinstance(value, Subgraph):
                 if s is None:
                     s = value
@@ -299,6 +354,65 @@ class PropertyDict(dict):
             self[key] = value
 
 
+def _scan_fields(records, types, optional):
+    """ Update per-field sets of value types and flags of optionality
+    from a sequence of records.
+    """
+    for record in records:
+        for i, value in enumerate(record):
+            if value is None:
+                optional[i] = True
+            else:
+                types[i].add(type(value))
+
+
+def _describe_fields(types, optional):
+    return [{
+        "type": t.copy().pop() if len(t) == 1 else tuple(t),
+        "numeric": all(t_ in numeric_types for t_ in t),
+        "optional": o,
+    } for t, o in zip(types, optional)]
+
+
+def _format_separated_value(value):
+    if value is None:
+        return None
+    elif isinstance(value, string_types):
+        return ustr(value)
+    else:
+        return cypher_repr(value)
+
+
+_format_separated_boolean = {True: u"true", False: u"false", None: None}.get
+
+
+def _separated_value_formatter(field):
+    """ Select a function for converting values of a field into
+    delimiter-separated text, based on the field metadata. Returns
+    :const:`None` for fields whose values the :mod:`csv` module
+    already writes correctly (including :const:`None`, which is
+    written as an empty value).
+    """
+    types = field["type"]
+    if not isinstance(types, tuple):
+        types = (types,)
+    if all(t in (int, float, str) for t in types):
+        return None
+    elif types == (bool,):
+        return _format_separated_boolean
+    else:
+        return _format_separated_value
+
+
+def _iter_windows(records, size):
+    records = iter(records)
+    while True:
+        window = list(map(tuple, islice(records, size)))
+        if not window:
+            break
+        yield window
+
+
 class Table(list):
     """ Immutable list of records.
     """
@@ -312,24 +426,22 @@ class Table(list):
                 raise ValueError("Missing keys")
         else:
             k = list(map(ustr, keys))
-        width = len(k)
-        t = [set() for _ in range(width)]
-        o = [False] * width
-        for record in self:
-            for i, value in enumerate(record):
-                if value is None:
-                    o[i] = True
-                else:
-                    t[i].add(type(value))
-        f = []
-        for i, _ in enumerate(k):
-            f.append({
-                "type": t[i].copy().pop() if len(t[i]) == 1 else tuple(t[i]),
-                "numeric": all(t_ in numeric_types for t_ in t[i]),
-                "optional": o[i],
-            })
+        t = [set() for _ in k]
+        o = [False] * len(k)
+        _scan_fields(self, t, o)
         self._keys = k
-        self._fields = f
+        self._fields = _describe_fields(t, o)
+
+    @classmethod
+    def _from_rows(cls, rows, keys, fields):
+        """ Build a table from a list of tuples for which the field
+        metadata is already known, skipping the scan of every value.
+        """
+        inst = cls.__new__(cls)
+        list.__init__(inst, rows)
+        inst._keys = keys
+        inst._fields = fields
+        return inst
 
     def __repr__(self):
         s = StringIO()
@@ -401,10 +513,18 @@ class Table(list):
         :param newline: newline character sequence
         :return: the number of records included in output
         """
+        widths = [1 if header else 0] * len(self._keys)
+        return self._write(file, header, self._range(skip, limit), widths,
+                           auto_align, padding, separator, newline)
+
+    def _write(self, file, header, indexes, widths, auto_align, padding, separator, newline):
+        """ Write the rows at the given indexes as ASCII art. Column
+        widths are widened in place to fit the values written, so that
+        a list shared between calls keeps columns aligned.
+        """
         from click import secho
 
         space = u" " * padding
-        widths = [1 if header else 0] * len(self._keys)
 
         def calc_widths(values, **_):
             strings = [cypher_str(value).splitlines(False) for value in values]
@@ -442,7 +562,7 @@ class Table(list):
 
         def apply(f):
             count = 0
-            for count, index in enumerate(self._range(skip, limit), start=1):
+            for count, index in enumerate(indexes, start=1):
                 if count == 1 and header:
                     f(self.keys(), underline=u"-")
                 f(self[index])
@@ -463,6 +583,16 @@ class Table(list):
         """
         from click import echo
 
+        echo(u"<table>", file, nl=False)
+        count = self._write_html(file, header, self._range(skip, limit), auto_align)
+        echo(u"</table>", file, nl=False)
+        return count
+
+    def _write_html(self, file, header, indexes, auto_align):
+        """ Write the rows at the given indexes as HTML table rows.
+        """
+        from click import echo
+
         def write_tr(values, tag):
             echo(u"<tr>", file, nl=False)
             for i, value in enumerate(values):
@@ -476,18 +606,20 @@ class Table(list):
             echo(u"</tr>", file, nl=False)
 
         count = 0
-        echo(u"<table>", file, nl=False)
-        for count, index in enumerate(self._range(skip, limit), start=1):
+        for count, index in enumerate(indexes, start=1):
             if count == 1 and header:
                 write_tr(self.keys(), u"th")
             write_tr(self[index], u"td")
-        echo(u"</table>", file, nl=False)
         return count
 
     def write_separated_values(self, separator, file=None, header=None, skip=None, limit=None,
                                newline=u"\r\n", quote=u"\""):
         """ Write data to a delimiter-separated file.
 
+        When writing to a file without header styles, output is
+        produced by a :mod:`csv` writer, which is considerably faster
+        for large tables. Binary files receive UTF-8 encoded text.
+
         :param separator: field separator character
         :param file: file-like object capable of receiving output
         :param header: boolean flag (or dictionary of ``click.secho`` styles) for addition of column headers
@@ -497,6 +629,16 @@ class Table(list):
         :param quote: quote character
         :return: the number of records included in output
         """
+        return self._write_separated_values(separator, file, header, self._range(skip, limit), newline, quote)
+
+    def _write_separated_values(self, separator, file, header, indexes, newline, quote):
+        """ Write the rows at the given indexes as delimiter-separated
+        values.
+        """
+        if (file is not None and not isinstance(header, dict) and
+                len(separator) == 1 and len(quote) == 1 and version_info >= (3,)):
+            return self._export_separated_values(separator, file, header, indexes, newline, quote)
+
         from click import secho
 
         escaped_quote = quote + quote
@@ -510,13 +652,19 @@ class Table(list):
                 return
             if isinstance(value, string_types):
                 value = ustr(value)
-                if any(ch in value for ch in quotable):
-                    value = quote + value.replace(quote, escaped_quote) + quote
             else:
                 value = cypher_repr(value)
+            if any(ch in value for ch in quotable):
+                value = quote + value.replace(quote, escaped_quote) + quote
             secho(value, file, nl=False, **styles)
 
         def write_line(values, **styles):
+            if len(values) == 1 and (values[0] is None or values[0] == u""):
+                # A lone empty value is quoted, as an empty line would
+                # be read back as no value at all.
+                secho(escaped_quote, file, nl=False, **styles)
+                secho(newline, file, nl=False, **styles)
+                return
             for i, value in enumerate(values):
                 if i > 0:
                     secho(separator, file, nl=False, **styles)
@@ -525,7 +673,7 @@ class Table(list):
 
         def apply(f):
             count = 0
-            for count, index in enumerate(self._range(skip, limit), start=1):
+            for count, index in enumerate(indexes, start=1):
                 if count == 1 and header:
                     f(self.keys(), underline=u"-", **header_styles)
                 f(self[index])
@@ -533,6 +681,39 @@ class Table(list):
 
         return apply(write_line)
 
+    def _export_separated_values(self, separator, file, header, indexes, newline, quote):
+        """ Write the rows at the given indexes through a :mod:`csv`
+        writer. This is used in place of the general purpose writer
+        when output is directed to a file without styling. A converter
+        is chosen once per field from the field metadata, and fields
+        of plain strings and numbers are passed to the writer as-is.
+        Binary files receive UTF-8 encoded output.
+        """
+        binary = isinstance(file, (BufferedIOBase, RawIOBase))
+        if binary:
+            file = TextIOWrapper(file, encoding="utf-8", newline="")
+        try:
+            writer = csv_writer(file, delimiter=separator, quotechar=quote, lineterminator=newline)
+            if header and indexes:
+                writer.writerow(self._keys)
+            rows = map(self.__getitem__, indexes)
+            formatters = [(i, f) for i, f in enumerate(map(_separated_value_formatter, self._fields))
+                          if f is not None]
+            if formatters:
+                rows = map(list, rows)
+
+                def format_row(row):
+                    for i, f in formatters:
+                        row[i] = f(row[i])
+                    return row
+
+                rows = map(format_row, rows)
+            writer.writerows(rows)
+        finally:
+            if binary:
+                file.detach()
+        return len(indexes)
+
     def write_csv(self, file=None, header=None, skip=None, limit=None):
         """ Write the data as RFC4180-compatible comma-separated values.
         This is a customised call to :meth:`.write_separated_values`.
@@ -546,12 +727,170 @@ class Table(list):
         return self.write_separated_values(u"\t", file, header, skip, limit)
 
 
+class TableStream(object):
+    """ Forward-only counterpart of :class:`.Table` for results that
+    are too large to hold in memory. Records are drawn from the source
+    one window at a time, so that no more than `window_size` records
+    are held at once and output can begin as soon as the first window
+    has arrived.
+
+    Field metadata is inferred from a look-ahead of one window and
+    refined as each subsequent window is read. When writing ASCII art,
+    column widths are likewise taken from the first window and only
+    ever widen thereafter.
+
+    :param records: :class:`.Cursor` or other iterable of records
+    :param keys: field names (required if `records` has no `keys` method)
+    :param window_size: maximum number of records to read ahead
+    """
+
+    def __init__(self, records, keys=None, window_size=1000):
+        if keys is None:
+            try:
+                keys = records.keys()
+            except AttributeError:
+                raise ValueError("Missing keys")
+        self._keys = list(map(ustr, keys))
+        try:
+            iter_batches = records.iter_batches
+        except AttributeError:
+            self._windows = _iter_windows(records, window_size)
+        else:
+            self._windows = iter_batches(window_size, tuples=True)
+        self._types = [set() for _ in self._keys]
+        self._optional = [False] * len(self._keys)
+        self._fields = _describe_fields(self._types, self._optional)
+        self._look_ahead = None
+
+    def _peek(self):
+        """ Return the next window of records as a :class:`.Table`,
+        reading it from the source if necessary, or :const:`None` if
+        the source is exhausted.
+        """
+        if self._look_ahead is None:
+            try:
+                window = next(self._windows)
+            except StopIteration:
+                return None
+            _scan_fields(window, self._types, self._optional)
+            self._fields = _describe_fields(self._types, self._optional)
+            self._look_ahead = Table._from_rows(window, self._keys, self._fields)
+        return self._look_ahead
+
+    def keys(self):
+        """ Return a list of field names for this table.
+        """
+        return list(self._keys)
+
+    def field(self, key):
+        """ Return a dictionary of metadata for a given field, as
+        described for :meth:`.Table.field`. The metadata reflects only
+        those records read so far, including the look-ahead window.
+        """
+        self._peek()
+        if isinstance(key, string_types):
+            try:
+                key = self._keys.index(key)
+            except ValueError:
+                raise KeyError(key)
+        elif not isinstance(key, integer_types):
+            raise TypeError(key)
+        return self._fields[key]
+
+    def pages(self):
+        """ Iterate through the remaining records as a sequence of
+        :class:`.Table` objects, each holding up to `window_size`
+        records.
+        """
+        while True:
+            page = self._peek()
+            if page is None:
+                break
+            self._look_ahead = None
+            yield page
+
+    def _iter_pages(self, skip, limit):
+        """ Yield a pair of page and index range for each page holding
+        records selected by `skip` and `limit`.
+        """
+        skip = skip or 0
+        pages = self.pages()
+        while limit is None or limit > 0:
+            try:
+                page = next(pages)
+            except StopIteration:
+                break
+            if skip >= len(page):
+                skip -= len(page)
+                continue
+            indexes = page._range(skip, limit)
+            skip = 0
+            if limit is not None:
+                limit -= len(indexes)
+            yield page, indexes
+
+    def write(self, file=None, header=None, skip=None, limit=None, auto_align=True,
+              padding=1, separator=u"|", newline=u"\r\n"):
+        """ Write the remaining data to a human-readable ASCII art table.
+        Arguments are as for :meth:`.Table.write`.
+
+        :return: the number of records included in output
+        """
+        widths = [1 if header else 0] * len(self._keys)
+        count = 0
+        for page, indexes in self._iter_pages(skip, limit):
+            count += page._write(file, None if count else header, indexes, widths,
+                                 auto_align, padding, separator, newline)
+        return count
+
+    def write_html(self, file=None, header=None, skip=None, limit=None, auto_align=True):
+        """ Write the remaining data to an HTML table. Arguments are as
+        for :meth:`.Table.write_html`.
+
+        :return: the number of records included in output
+        """
+        from click import echo
+
+        count = 0
+        echo(u"<table>", file, nl=False)
+        for page, indexes in self._iter_pages(skip, limit):
+            count += page._write_html(file, None if count else header, indexes, auto_align)
+        echo(u"</table>", file, nl=False)
+        return count
+
+    def write_separated_values(self, separator, file=None, header=None, skip=None, limit=None,
+                               newline=u"\r\n", quote=u"\""):
+        """ Write the remaining data to a delimiter-separated file.
+        Arguments are as for :meth:`.Table.write_separated_values`.
+
+        :return: the number of records included in output
+        """
+        count = 0
+        for page, indexes in self._iter_pages(skip, limit):
+            count += page._write_separated_values(separator, file, None if count else header, indexes,
+                                                  newline, quote)
+        return count
+
+    def write_csv(self, file=None, header=None, skip=None, limit=None):
+        """ Write the remaining data as RFC4180-compatible comma-separated
+        values. This is a customised call to :meth:`.write_separated_values`.
+        """
+        return self.write_separated_values(u",", file, header, skip, limit)
+
+    def write_tsv(self, file=None, header=None, skip=None, limit=None):
+        """ Write the remaining data as tab-separated values.
+        This is a customised call to :meth:`.write_separated_values`.
+        """
+        return self.write_separated_values(u"\t", file, header, skip, limit)
+
+
 class Subgraph(object):
     """ Arbitrary, unordered collection of nodes and relationships.
     """
 
     def __init__(self, nodes=None, relationships=None):
-        self.__nodes = frozenset(nodes or [])
+        self.__nodes = frozenset(node.materialize() if isinstance(node, LazyNode) else node
+                                 for node in nodes or [])
         self.__relationships = frozenset(relationships or [])
         self.__nodes |= frozenset(chain(*(r.nodes for r in self.__relationships)))
         if not self.__nodes:
@@ -605,8 +944,8 @@ class Subgraph(object):
         n = (set(self.nodes) ^ set(other.nodes)) | set().union(*(set(rel.nodes) for rel in r))
         return Subgraph(n, r)
 
-    def __db_create__(self, tx):
-        create_subgraph(tx, self)
+    def __db_create__(self, tx, batch_size=None, commit_every=None):
+        create_subgraph(tx, self, batch_size, commit_every)
 
     def __db_delete__(self, tx):
         delete_subgraph(tx, self)
@@ -614,14 +953,14 @@ class Subgraph(object):
     def __db_exists__(self, tx):
         return subgraph_exists(tx, self)
 
-    def __db_merge__(self, tx, primary_label=None, primary_key=None):
-        merge_subgraph(tx, self, primary_label, primary_key)
+    def __db_merge__(self, tx, primary_label=None, primary_key=None, batch_size=None, commit_every=None):
+        merge_subgraph(tx, self, primary_label, primary_key, batch_size, commit_every)
 
-    def __db_pull__(self, tx):
-        pull_subgraph(tx, self)
+    def __db_pull__(self, tx, batch_size=None):
+        pull_subgraph(tx, self, batch_size)
 
-    def __db_push__(self, tx):
-        push_subgraph(tx, self)
+    def __db_push__(self, tx, batch_size=None):
+        push_subgraph(tx, self, batch_size)
 
     def __db_separate__(self, tx):
         separate_subgraph(tx, self)
@@ -759,6 +1098,11 @@ class Entity(PropertyDict, Walkable):
     graph = None
     identity = None
 
+    # Set when local properties are changed, and cleared whenever they
+    # are known to match those of the remote entity. Changes made inside
+    # a list or dict value are not seen here (see `_is_dirty`).
+    _dirty = False
+
     def __init__(self, iterable, properties):
         Walkable.__init__(self, iterable)
         PropertyDict.__init__(self, properties)
@@ -770,6 +1114,39 @@ class Entity(PropertyDict, Walkable):
     def __repr__(self):
         return Walkable.__repr__(self)
 
+    def _is_dirty(self):
+        """ Return true if the local properties may differ from those of
+        the remote entity. A list or dict value can be changed in place
+        without notice, so an entity holding one is always treated as
+        changed.
+        """
+        return self._dirty or any(isinstance(value, (list, dict)) for value in dict.values(self))
+
+    def __setitem__(self, key, value):
+        PropertyDict.__setitem__(self, key, value)
+        self._dirty = True
+
+    def __delitem__(self, key):
+        PropertyDict.__delitem__(self, key)
+        self._dirty = True
+
+    def setdefault(self, key, default=None):
+        if default is not None and key not in self:
+            self._dirty = True
+        return PropertyDict.setdefault(self, key, default)
+
+    def clear(self):
+        PropertyDict.clear(self)
+        self._dirty = True
+
+    def pop(self, key, *default):
+        self._dirty = True
+        return PropertyDict.pop(self, key, *default)
+
+    def popitem(self):
+        self._dirty = True
+        return PropertyDict.popitem(self)
+
     def __bool__(self):
         return len(self) > 0
 
@@ -809,6 +1186,8 @@ class Node(Entity):
         """
         if obj is None or isinstance(obj, Node):
             return obj
+        if isinstance(obj, LazyNode):
+            return obj.materialize()
 
         def apply(x):
             if isinstance(x, dict):
@@ -837,7 +1216,8 @@ class Node(Entity):
         try:
             if any(x is None for x in [self.graph, other.graph, self.identity, other.identity]):
                 return False
-            return issubclass(type(self), Node) and issubclass(type(other), Node) and self.graph == other.graph and self.identity == other.identity
+            return (issubclass(type(self), Node) and issubclass(type(other), (Node, LazyNode)) and
+                    self.graph == other.graph and self.identity == other.identity)
         except (AttributeError, TypeError):
             return False
 
@@ -887,6 +1267,194 @@ class Node(Entity):
         self._labels.update(labels)
 
 
+class LazyNode(object):
+    """ Lightweight stand-in for a :class:`.Node` received in a query
+    result, as returned when a :class:`.Graph` is created with the
+    ``lazy_entities`` setting. The identity, labels and properties of
+    the node can be read exactly as for a :class:`.Node`, directly
+    from the values received from the server.
+
+    A full :class:`.Node` is only built when one is actually required:
+    when the proxy is modified, pushed, pulled or otherwise passed to
+    a transaction, or used as part of a relationship or subgraph,
+    including through the subgraph and walkable operators. That
+    node is built (and cached) exactly as it would have been by eager
+    hydration and is used for all subsequent operations on the proxy.
+    It can also be obtained directly with :meth:`.materialize`.
+
+    Note that a proxy is not an instance of :class:`.Node`, so code
+    that checks ``isinstance(value, Node)`` should also check for
+    :class:`.LazyNode`, or call :meth:`.materialize` first.
+    """
+
+    __slots__ = ("graph", "identity", "_labels", "_properties", "_node")
+
+    def __init__(self, graph, identity, labels, properties):
+        self.graph = graph
+        self.identity = identity
+        self._labels = labels
+        self._properties = properties
+        self._node = None
+
+    def __repr__(self):
+        return xstr(cypher_repr(self))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        try:
+            if any(x is None for x in [self.graph, other.graph, self.identity, other.identity]):
+                return False
+            return isinstance(other, (Node, LazyNode)) and self.graph == other.graph and self.identity == other.identity
+        except (AttributeError, TypeError):
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.graph.database) ^ hash(self.graph.name) ^ hash(self.identity)
+
+    def __getattr__(self, name):
+        if name in LazyNode.__slots__:
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    # Operators are looked up on the type, bypassing __getattr__, so
+    # those of Subgraph and Walkable are applied to the full node here
+
+    def __or__(self, other):
+        return Subgraph.__or__(self.materialize(), other)
+
+    def __ror__(self, other):
+        return Subgraph.__or__(other, self.materialize())
+
+    def __and__(self, other):
+        return Subgraph.__and__(self.materialize(), other)
+
+    def __rand__(self, other):
+        return Subgraph.__and__(other, self.materialize())
+
+    def __sub__(self, other):
+        return Subgraph.__sub__(self.materialize(), other)
+
+    def __rsub__(self, other):
+        return Subgraph.__sub__(other, self.materialize())
+
+    def __xor__(self, other):
+        return Subgraph.__xor__(self.materialize(), other)
+
+    def __rxor__(self, other):
+        return Subgraph.__xor__(other, self.materialize())
+
+    def __add__(self, other):
+        return Walkable.__add__(self.materialize(), other)
+
+    def __radd__(self, other):
+        return Walkable.__add__(other, self.materialize())
+
+    def __getitem__(self, key):
+        return self._properties.get(key)
+
+    def __setitem__(self, key, value):
+        self.materialize()[key] = value
+
+    def __delitem__(self, key):
+        del self.materialize()[key]
+
+    def __contains__(self, key):
+        return key in self._properties
+
+    def __len__(self):
+        return len(self._properties)
+
+    def __iter__(self):
+        return iter(self._properties)
+
+    def __bool__(self):
+        return len(self._properties) > 0
+
+    def __nonzero__(self):
+        return len(self._properties) > 0
+
+    @property
+    def __name__(self):
+        name = self._properties.get("__name__") or self._properties.get("name")
+        if name is None:
+            name = u"_" + ustr(self.identity)
+        return name
+
+    def materialize(self):
+        """ Return the full :class:`.Node` for this proxy, building it
+        on first use. If the graph already holds a node with the same
+        identity, that node is used instead. Any of its labels or
+        properties that have not yet been loaded are filled in from
+        the values received with the proxy, but those already held are
+        kept, as they may be more recent or have local changes of their
+        own. Once materialized, property and label values are read from
+        the node, so that any changes made to it are reflected by the
+        proxy.
+        """
+        if self._node is None:
+            from py2neo.internal.hydration import Hydrator
+            node = self.graph.node_cache.peek(self.identity)
+            if node is None:
+                node = Hydrator(self.graph).hydrate_node(None, self.identity, self._labels, self._properties)
+            else:
+                node = Hydrator(self.graph).hydrate_node(node, self.identity,
+                                                         self._labels if "labels" in node._stale else None,
+                                                         self._properties if "properties" in node._stale else None)
+            self._node = node
+            self._properties = node
+        return self._node
+
+    def get(self, key, default=None):
+        return self._properties.get(key, default)
+
+    def keys(self):
+        return self._properties.keys()
+
+    def values(self):
+        return self._properties.values()
+
+    def items(self):
+        return self._properties.items()
+
+    def setdefault(self, key, default=None):
+        return self.materialize().setdefault(key, default)
+
+    def update(self, iterable=None, **kwargs):
+        self.materialize().update(iterable, **kwargs)
+
+    def clear(self):
+        self.materialize().clear()
+
+    @property
+    def labels(self):
+        """ Set of all node labels.
+        """
+        if self._node is None:
+            return LabelSetView(self._labels)
+        return self._node.labels
+
+    def has_label(self, label):
+        if self._node is None:
+            return label in self._labels
+        return self._node.has_label(label)
+
+    def add_label(self, label):
+        self.materialize().add_label(label)
+
+    def remove_label(self, label):
+        self.materialize().remove_label(label)
+
+    def clear_labels(self):
+        self.materialize().clear_labels()
+
+    def update_labels(self, labels):
+        self.materialize().update_labels(labels)
+
+
 class Relationship(Entity):
     """ A relationship represents a typed connection between a pair of nodes.
 
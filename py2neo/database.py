@@ -20,13 +20,15 @@ from __future__ import absolute_import
 
 from collections import deque, OrderedDict
 from datetime import datetime
+from threading import Lock
 from time import sleep
 from warnings import warn
 
 from py2neo.cypher import cypher_escape
 from py2neo.data import Table
-from py2neo.internal.caching import ThreadLocalEntityCache
+from py2neo.internal.caching import make_entity_cache, DEFAULT_CACHE_CAPACITY, DEFAULT_CACHE_POLICY, DEFAULT_CACHE_TTL
 from py2neo.internal.text import Words
+from py2neo.internal.operations import bulk_create_subgraph, merge_relationships_by_key
 from py2neo.internal.compat import Mapping, string_types, xstr
 from py2neo.internal.versioning import Version
 from py2neo.matching import NodeMatcher, RelationshipMatcher
@@ -72,6 +74,8 @@ class Database(object):
     _cx_pool = None
     # _driver = None
     _connector = None
+    _connector_settings = None
+    _connector_lock = None
     _graphs = None
 
     @classmethod
@@ -81,26 +85,30 @@ class Database(object):
         for _, db in cls._instances.items():
             # db._driver.close()
             # db._driver = None
-            db._connector.close()
-            db._connector = None
+            if db._connector is not None:
+                db._connector.close()
+                db._connector = None
         cls._instances.clear()
 
     def __new__(cls, uri=None, **settings):
-        from py2neo.internal.connectors import get_connection_data
+        from py2neo.internal.connectors import get_connection_data, CONNECTOR_DEFAULTS, CONNECTOR_SETTINGS
         connection_data = get_connection_data(uri, **settings)
         key = connection_data["hash"]
+        connector_settings = {key: settings[key] for key in CONNECTOR_SETTINGS if settings.get(key) is not None}
         try:
             inst = cls._instances[key]
         except KeyError:
             inst = super(Database, cls).__new__(cls)
             inst._connection_data = connection_data
-            from py2neo.internal.connectors import Connector
-            inst._connector = Connector(connection_data["uri"],
-                                        auth=connection_data["auth"],
-                                        secure=connection_data["secure"],
-                                        user_agent=connection_data["user_agent"])
+            inst._connector_settings = connector_settings
+            inst._connector_lock = Lock()
             inst._graphs = {}
             cls._instances[key] = inst
+        else:
+            for name, value in connector_settings.items():
+                current = inst._connector_settings.get(name, CONNECTOR_DEFAULTS[name])
+                if value != current:
+                    raise ValueError("%r already exists with %s=%r" % (inst, name, current))
         return inst
 
     def __repr__(self):
@@ -137,6 +145,16 @@ class Database(object):
 
     @property
     def connector(self):
+        """ The connector for this database. This, and so its
+        connection pool, is only created when first required.
+        """
+        if self._connector is None:
+            with self._connector_lock:
+                if self._connector is None:
+                    from py2neo.internal.connectors import Connector
+                    data = self._connection_data
+                    self._connector = Connector(data["uri"], auth=data["auth"], secure=data["secure"],
+                                                user_agent=data["user_agent"], **self._connector_settings)
         return self._connector
 
     @property
@@ -269,18 +287,69 @@ class Graph(object):
 
     The full set of supported `settings` are:
 
-    ==============  =============================================  ==============  =============
-    Keyword         Description                                    Type            Default
-    ==============  =============================================  ==============  =============
-    ``auth``        A 2-tuple of (user, password)                  tuple           ``('neo4j', 'password')``
-    ``host``        Database server host name                      str             ``'localhost'``
-    ``password``    Password to use for authentication             str             ``'password'``
-    ``port``        Database server port                           int             ``7687``
-    ``scheme``      Use a specific URI scheme                      str             ``'bolt'``
-    ``secure``      Use a secure connection (TLS)                  bool            ``False``
-    ``user``        User to authenticate as                        str             ``'neo4j'``
-    ``user_agent``  User agent to send for all connections         str             `(depends on URI scheme)`
-    ==============  =============================================  ==============  =============
+    ==========================  =============================================  ==============  =============
+    Keyword                     Description                                    Type            Default
+    ==========================  =============================================  ==============  =============
+    ``acquire_timeout``         Seconds to wait for a pooled connection        float           ``60``
+    ``auth``                    A 2-tuple of (user, password)                  tuple           ``('neo4j', 'password')``
+    ``cache_capacity``          Entities retained by ``lru`` and ``ttl``       int             ``10000``
+    ``cache_policy``            Entity cache policy (see below)                str             ``'weak'``
+    ``cache_ttl``               Seconds for which ``ttl`` entries are current  float           ``60``
+    ``compress_requests``       Gzip HTTP request bodies                       bool            ``False``
+    ``fetch_size``              Number of records to read ahead per fetch      int             ``None``
+    ``host``                    Database server host name                      str             ``'localhost'``
+    ``lazy_entities``           Return nodes as :class:`.LazyNode` proxies     bool            ``False``
+    ``liveness_check_timeout``  Idle seconds before checking a connection      float           ``None``
+    ``max_connections``         Maximum number of pooled connections           int             ``100``
+    ``max_idle_time``           Idle seconds before closing a connection       float           ``None``
+    ``max_lifetime``            Maximum age of a connection in seconds         float           ``3600``
+    ``password``                Password to use for authentication             str             ``'password'``
+    ``port``                    Database server port                           int             ``7687``
+    ``scheme``                  Use a specific URI scheme                      str             ``'bolt'``
+    ``secure``                  Use a secure connection (TLS)                  bool            ``False``
+    ``user``                    User to authenticate as                        str             ``'neo4j'``
+    ``user_agent``              User agent to send for all connections         str             `(depends on URI scheme)`
+    ==========================  =============================================  ==============  =============
+
+    The connection pool settings (``acquire_timeout``,
+    ``liveness_check_timeout``, ``max_connections``, ``max_idle_time``
+    and ``max_lifetime``) belong to the underlying :class:`.Database`
+    and therefore take effect when the first :class:`.Graph` for a
+    particular server is created. Only ``max_connections`` applies to
+    HTTP connections, limiting how many are kept alive for reuse; extra
+    connections are opened when all are in use and closed afterwards.
+    The ``compress_requests``, ``fetch_size`` and ``lazy_entities``
+    settings are held in the same way and so apply to all results
+    received from that server. As with the cache settings below,
+    asking for a :class:`.Graph` on the same server with different
+    values for any of these raises a :exc:`ValueError`.
+
+    Each :class:`.Graph` keeps its own caches of the nodes and
+    relationships that it has hydrated, so that the same entity
+    received twice is represented by the same object. The
+    ``cache_policy`` determines how long those entities are kept:
+
+    ==========  =============================================================
+    Policy      Behaviour
+    ==========  =============================================================
+    ``weak``    Keep entities only while they are referenced elsewhere
+    ``lru``     Also keep the ``cache_capacity`` most recently used
+    ``ttl``     As ``lru``, but only trust entities for ``cache_ttl`` seconds
+    ``none``    Disable caching, creating new objects for every entity
+    ==========  =============================================================
+
+    Entities that have outlived the ``cache_ttl``, or that have been
+    marked out of date with :meth:`.invalidate`, are not served from
+    the cache by lookups such as :meth:`.NodeMatcher.get`. Instead,
+    they are refreshed in place by a single query for all those
+    requested.
+
+    A callable accepting `capacity` and `ttl` arguments and returning a
+    custom cache may also be given as the ``cache_policy``. Cache
+    settings take effect when a :class:`.Graph` is first created for
+    a particular database and name. As that :class:`.Graph` is then
+    shared, asking for it again with different cache settings raises
+    a :exc:`ValueError`; settings that are omitted are not checked.
 
     Each setting can be provided as a keyword argument or as part of
     an ``http:``, ``https:``, ``bolt:`` or ``bolt+routing:`` URI. Therefore, the examples
@@ -301,19 +370,38 @@ class Graph(object):
     #: The :class:`.Schema` resource for this :class:`.Graph`.
     schema = None
 
-    node_cache = ThreadLocalEntityCache()
-    relationship_cache = ThreadLocalEntityCache()
+    #: Identity map of the :class:`.Node` objects hydrated by this
+    #: :class:`.Graph`, shared by all threads.
+    node_cache = None
+
+    #: Identity map of the :class:`.Relationship` objects hydrated by
+    #: this :class:`.Graph`, shared by all threads.
+    relationship_cache = None
+
+    _cache_settings = None
 
     def __new__(cls, uri=None, **settings):
         name = settings.pop("name", "data")
+        cache_settings = {"policy": settings.pop("cache_policy", None),
+                          "capacity": settings.pop("cache_capacity", None),
+                          "ttl": settings.pop("cache_ttl", None)}
         database = Database(uri, **settings)
         if name in database:
             inst = database[name]
+            for key, value in cache_settings.items():
+                if value is not None and value != inst._cache_settings[key]:
+                    raise ValueError("%r already exists with cache_%s=%r" %
+                                     (inst, key, inst._cache_settings[key]))
         else:
             inst = object.__new__(cls)
             inst.database = database
             inst.schema = Schema(inst)
             inst.__name__ = name
+            inst.node_cache = make_entity_cache(**cache_settings)
+            inst.relationship_cache = make_entity_cache(**cache_settings)
+            defaults = {"policy": DEFAULT_CACHE_POLICY, "capacity": DEFAULT_CACHE_CAPACITY, "ttl": DEFAULT_CACHE_TTL}
+            inst._cache_settings = {key: defaults[key] if value is None else value
+                                    for key, value in cache_settings.items()}
             database[name] = inst
         return inst
 
@@ -337,23 +425,63 @@ class Graph(object):
 
     __nonzero__ = __bool__
 
-    def begin(self, autocommit=False):
+    def begin(self, autocommit=False, pipelined=False):
         """ Begin a new :class:`.Transaction`.
 
         :param autocommit: if :py:const:`True`, the transaction will
                          automatically commit after the first operation
+        :param pipelined: if :py:const:`True`, statements run within the
+                         transaction will be queued and only sent to the
+                         server when a result is first accessed or when
+                         the transaction is processed or committed
         """
-        return Transaction(self, autocommit)
+        return Transaction(self, autocommit, pipelined)
 
-    def create(self, subgraph):
+    def create(self, subgraph, batch_size=None, commit_every=None):
         """ Run a :meth:`.Transaction.create` operation within a
         :class:`.Transaction`.
 
+        Large subgraphs can be loaded in bounded memory by splitting the
+        work into batches, optionally committing after every few batches::
+
+            >>> g.create(people, batch_size=10000, commit_every=10)
+
         :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
                        :class:`.Subgraph`
+        :param batch_size: maximum number of nodes or relationships to
+                           send to the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed
         """
         with self.begin() as tx:
-            tx.create(subgraph)
+            tx.create(subgraph, batch_size, commit_every)
+
+    def bulk_create(self, subgraph, workers=4, batch_size=10000):
+        """ Create remote nodes and relationships that correspond to
+        those in a large local :class:`.Subgraph`, spreading the work
+        over several concurrent transactions.
+
+        Nodes are grouped by label set and relationships by type, and
+        each group is split into batches of up to `batch_size` entities.
+        Up to `workers` batches are then run at once, each in its own
+        transaction over its own pooled connection. All nodes are created
+        before any relationships. As with :meth:`.create`, local entities
+        become bound to their newly-created counterparts.
+
+        Unlike :meth:`.create`, this operation is not atomic: if a batch
+        fails, the batches already committed remain in the database and
+        their entities remain bound. Batches that fail with a transient
+        error, such as a deadlock between concurrent relationship
+        batches, are retried a few times before the error is raised.
+
+        :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
+                       :class:`.Subgraph`
+        :param workers: number of batches to run concurrently; this
+                        should not exceed the `max_connections` setting
+        :param batch_size: maximum number of nodes or relationships to
+                           send to the server in each query
+        """
+        bulk_create_subgraph(self, subgraph, workers, batch_size)
 
     def delete(self, subgraph):
         """ Run a :meth:`.Transaction.delete` operation within an
@@ -397,6 +525,29 @@ class Graph(object):
         """
         return self.begin(autocommit=True).exists(subgraph)
 
+    def invalidate(self, ids=None, relationship_ids=None):
+        """ Mark cached entities as out of date, so that they will be
+        refreshed from the server when next looked up, for example by
+        :meth:`.NodeMatcher.get`. Each entity remains cached, and is
+        refreshed in place, so that references held elsewhere see the
+        new values.
+
+        If neither argument is given, all cached nodes and
+        relationships are invalidated.
+
+        :param ids: IDs of nodes (or :class:`.Node` objects) to invalidate
+        :param relationship_ids: IDs of relationships (or
+                                 :class:`.Relationship` objects) to invalidate
+        """
+        if ids is None and relationship_ids is None:
+            self.node_cache.invalidate()
+            self.relationship_cache.invalidate()
+            return
+        if ids is not None:
+            self.node_cache.invalidate(getattr(i, "identity", i) for i in ids)
+        if relationship_ids is not None:
+            self.relationship_cache.invalidate(getattr(i, "identity", i) for i in relationship_ids)
+
     def match(self, nodes=None, r_type=None, limit=None):
         """ Match and return all relationships with specific criteria.
 
@@ -426,7 +577,7 @@ class Graph(object):
         else:
             return None
 
-    def merge(self, subgraph, label=None, *property_keys):
+    def merge(self, subgraph, label=None, *property_keys, **options):
         """ Run a :meth:`.Transaction.merge` operation within an
         `autocommit` :class:`.Transaction`.
 
@@ -457,9 +608,57 @@ class Graph(object):
                        :class:`.Subgraph` object
         :param label: label on which to match any existing nodes
         :param property_keys: property keys on which to match any existing nodes
+        :param options: `batch_size` and `commit_every` settings, as
+                        described for :meth:`.create`
         """
+        if len(property_keys) > 1:
+            primary_key = tuple(property_keys)
+        elif property_keys:
+            primary_key = property_keys[0]
+        else:
+            primary_key = None
         with self.begin() as tx:
-            tx.merge(subgraph, label, *property_keys)
+            tx.merge(subgraph, label, primary_key, **options)
+
+    def create_relationships(self, r_type, data, start_node_key, end_node_key=None,
+                             batch_size=None, commit_every=None):
+        """ Run a :meth:`.Transaction.create_relationships` operation
+        within a :class:`.Transaction`.
+
+        :param r_type: relationship type
+        :param data: iterable of (start_value, end_value, properties)
+                     tuples
+        :param start_node_key: (label, key) tuple identifying start nodes
+        :param end_node_key: (label, key) tuple identifying end nodes
+        :param batch_size: maximum number of relationships to send to
+                           the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed
+        :returns: number of relationships created
+        """
+        with self.begin() as tx:
+            return tx.create_relationships(r_type, data, start_node_key, end_node_key,
+                                           batch_size, commit_every)
+
+    def merge_relationships(self, r_type, data, start_node_key, end_node_key=None,
+                            batch_size=None, commit_every=None):
+        """ Run a :meth:`.Transaction.merge_relationships` operation
+        within a :class:`.Transaction`.
+
+        :param r_type: relationship type
+        :param data: iterable of (start_value, end_value, properties)
+                     tuples
+        :param start_node_key: (label, key) tuple identifying start nodes
+        :param end_node_key: (label, key) tuple identifying end nodes
+        :param batch_size: maximum number of relationships to send to
+                           the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed
+        :returns: number of relationships merged
+        """
+        with self.begin() as tx:
+            return tx.merge_relationships(r_type, data, start_node_key, end_node_key,
+                                          batch_size, commit_every)
 
     @property
     def name(self):
@@ -489,21 +688,25 @@ class Graph(object):
         """
         return NodeMatcher(self)
 
-    def pull(self, subgraph):
+    def pull(self, subgraph, batch_size=None):
         """ Pull data to one or more entities from their remote counterparts.
 
         :param subgraph: the collection of nodes and relationships to pull
+        :param batch_size: maximum number of nodes or relationships to
+                           fetch from the server in each query
         """
         with self.begin() as tx:
-            tx.pull(subgraph)
+            tx.pull(subgraph, batch_size)
 
-    def push(self, subgraph):
+    def push(self, subgraph, batch_size=None):
         """ Push data from one or more entities to their remote counterparts.
 
         :param subgraph: the collection of nodes and relationships to push
+        :param batch_size: maximum number of nodes or relationships to
+                           send to the server in each query
         """
         with self.begin() as tx:
-            tx.push(subgraph)
+            tx.push(subgraph, batch_size)
 
     @property
     def relationships(self):
@@ -738,20 +941,44 @@ class TransactionError(GraphError):
     """
 
 
+def _batch_options(batch_size, commit_every):
+    """ Build the keyword arguments for a batched create or merge,
+    omitting those that are not set so that objects which do not
+    support batching can still be created and merged.
+    """
+    options = {}
+    if batch_size is not None:
+        options["batch_size"] = batch_size
+    if commit_every is not None:
+        options["commit_every"] = commit_every
+    return options
+
+
 class Transaction(object):
     """ A transaction is a logical container for multiple Cypher statements.
+
+    A pipelined transaction does not wait for each statement to be
+    acknowledged by the server before returning a :class:`.Cursor`.
+    Instead, statements are queued and sent together when a result is
+    first accessed, or when :meth:`.process` or :meth:`.commit` is
+    called. Any errors are therefore raised lazily, at that point. This
+    can greatly reduce the number of network round trips required for
+    transactions that carry out many small writes. Over HTTP, all queued
+    statements are sent to the server in a single request.
     """
 
     # session = None
 
     _finished = False
 
-    def __init__(self, graph, autocommit=False):
+    def __init__(self, graph, autocommit=False, pipelined=False):
         self.graph = graph
         self.autocommit = autocommit
+        self.pipelined = pipelined
         self.entities = deque()
         self.connector = self.graph.database.connector
         self.results = []
+        self._commit_callbacks = []
         if autocommit:
             self.transaction = None
         else:
@@ -802,7 +1029,8 @@ class Transaction(object):
                                              tx=self.transaction,
                                              graph=self.graph,
                                              keys=[],
-                                             entities=entities))
+                                             entities=entities,
+                                             pipelined=self.pipelined))
         except CypherError as error:
             raise GraphError.hydrate({"code": error.code, "message": error.message})
         finally:
@@ -827,10 +1055,40 @@ class Transaction(object):
         self._assert_unfinished()
         self.connector.commit(self.transaction)
         self._finished = True
+        self._committed()
+
+    def _checkpoint(self):
+        """ Commit the work carried out so far and continue in a new
+        server transaction.
+        """
+        self._assert_unfinished()
+        if self.transaction:
+            self.connector.commit(self.transaction)
+            self.transaction = self.connector.begin()
+            self._committed()
+
+    def _on_commit(self, callback):
+        """ Register a function to be called once the work carried out
+        so far has been successfully committed. Callbacks registered
+        within an autocommit transaction are called immediately, as
+        each statement is committed as soon as it has run.
+
+        :param callback: function taking no arguments
+        """
+        if self.transaction:
+            self._commit_callbacks.append(callback)
+        else:
+            callback()
+
+    def _committed(self):
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            callback()
 
     def _rollback(self):
         """ Implicit rollback.
         """
+        self._commit_callbacks = []
         if self.connector.is_valid_transaction(self.transaction):
             self.connector.rollback(self.transaction)
         self._finished = True
@@ -839,6 +1097,7 @@ class Transaction(object):
         """ Roll back the current transaction, undoing all actions previously taken.
         """
         self._assert_unfinished()
+        self._commit_callbacks = []
         self.connector.rollback(self.transaction)
         self._finished = True
 
@@ -852,7 +1111,7 @@ class Transaction(object):
         """
         return self.run(cypher, parameters, **kwparameters).evaluate(0)
 
-    def create(self, subgraph):
+    def create(self, subgraph, batch_size=None, commit_every=None):
         """ Create remote nodes and relationships that correspond to those in a
         local subgraph. Any entities in *subgraph* that are already bound to
         remote entities will remain unchanged, those which are not will become
@@ -872,15 +1131,27 @@ class Transaction(object):
             >>> g.exists(ab)
             True
 
+        Nodes and relationships are sent to the server in one query per
+        label set or relationship type. If a `batch_size` is given, each
+        such query carries no more than that number of entities. If
+        `commit_every` is also given, the work carried out so far is
+        committed after that number of batches, and the operation then
+        continues in a new server transaction; this keeps server memory
+        bounded during very large loads, at the expense of atomicity.
+
         :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
                     creatable object
+        :param batch_size: maximum number of nodes or relationships to
+                           send to the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed
         """
         try:
             create = subgraph.__db_create__
         except AttributeError:
             raise TypeError("No method defined to create object %r" % subgraph)
         else:
-            create(self)
+            create(self, **_batch_options(batch_size, commit_every))
 
     def delete(self, subgraph):
         """ Delete the remote nodes and relationships that correspond to
@@ -913,7 +1184,7 @@ class Transaction(object):
         else:
             return exists(self)
 
-    def merge(self, subgraph, primary_label=None, primary_key=None):
+    def merge(self, subgraph, primary_label=None, primary_key=None, **options):
         """ Create or update the nodes and relationships of a local
         subgraph in the remote database. Note that the functionality of
         this operation is not strictly identical to the Cypher MERGE
@@ -941,17 +1212,83 @@ class Transaction(object):
         :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
                        :class:`.Subgraph` object
         :param primary_label: label on which to match any existing nodes
-        :param primary_key: property key(s) on which to match any existing
-                            nodes
-        """
+        :param primary_key: property key, or tuple of keys, on which to
+                            match any existing nodes
+        :param options: `batch_size` and `commit_every` settings, as
+                        described for :meth:`.create`; these can only
+                        be passed by keyword
+        """
+        batch_size = options.pop("batch_size", None)
+        commit_every = options.pop("commit_every", None)
+        if options:
+            raise TypeError("Unexpected keyword arguments %s" % ", ".join(sorted(options)))
         try:
             merge = subgraph.__db_merge__
         except AttributeError:
             raise TypeError("No method defined to merge object %r" % subgraph)
         else:
-            merge(self, primary_label, primary_key)
+            merge(self, primary_label, primary_key, **_batch_options(batch_size, commit_every))
 
-    def pull(self, subgraph):
+    def create_relationships(self, r_type, data, start_node_key, end_node_key=None,
+                             batch_size=None, commit_every=None):
+        """ Create relationships between existing remote nodes, with
+        each endpoint identified by a label and property value instead
+        of by a bound :class:`.Node`. This allows relationships to be
+        loaded without first fetching the IDs of their nodes::
+
+            >>> g = Graph()
+            >>> tx = g.begin()
+            >>> tx.create_relationships("KNOWS", [("Alice", "Bob", {"since": 1999})],
+            ...                         ("Person", "name"))
+            1
+            >>> tx.commit()
+
+        Nodes are matched using the schema index for each label and key,
+        if one exists. If no such index exists, a warning is issued, as
+        every relationship will then require a scan of all nodes with
+        that label. If several nodes match an endpoint, a relationship is
+        created for each of them; if none match, no relationship is
+        created.
+
+        :param r_type: relationship type
+        :param data: iterable of (start_value, end_value, properties)
+                     tuples; this is consumed one batch at a time
+        :param start_node_key: (label, key) tuple identifying start nodes
+        :param end_node_key: (label, key) tuple identifying end nodes;
+                             defaults to `start_node_key`
+        :param batch_size: maximum number of relationships to send to
+                           the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed (see :meth:`.create`)
+        :returns: number of relationships created
+        """
+        return merge_relationships_by_key(self, r_type, data, start_node_key, end_node_key, merge=False,
+                                          batch_size=batch_size, commit_every=commit_every)
+
+    def merge_relationships(self, r_type, data, start_node_key, end_node_key=None,
+                            batch_size=None, commit_every=None):
+        """ Merge relationships between existing remote nodes, with
+        each endpoint identified by a label and property value. This
+        works in the same way as :meth:`.create_relationships` except
+        that a relationship of the same type between the same nodes is
+        updated instead of duplicated.
+
+        :param r_type: relationship type
+        :param data: iterable of (start_value, end_value, properties)
+                     tuples; this is consumed one batch at a time
+        :param start_node_key: (label, key) tuple identifying start nodes
+        :param end_node_key: (label, key) tuple identifying end nodes;
+                             defaults to `start_node_key`
+        :param batch_size: maximum number of relationships to send to
+                           the server in each query
+        :param commit_every: number of batches after which the work done
+                             so far is committed (see :meth:`.create`)
+        :returns: number of relationships created or updated
+        """
+        return merge_relationships_by_key(self, r_type, data, start_node_key, end_node_key, merge=True,
+                                          batch_size=batch_size, commit_every=commit_every)
+
+    def pull(self, subgraph, batch_size=None):
         """ Update local entities from their remote counterparts.
 
         For any nodes and relationships that exist in both the local
@@ -959,17 +1296,25 @@ class Transaction(object):
         and node labels into the local copies. This operation does not
         create or delete any entities.
 
+        All nodes are fetched in a single query, as are all
+        relationships, unless a `batch_size` is given.
+
         :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
                        :class:`.Subgraph`
+        :param batch_size: maximum number of nodes or relationships to
+                           fetch from the server in each query
         """
         try:
             pull = subgraph.__db_pull__
         except AttributeError:
             raise TypeError("No method defined to pull object %r" % subgraph)
         else:
-            return pull(self)
+            if batch_size is None:
+                return pull(self)
+            else:
+                return pull(self, batch_size=batch_size)
 
-    def push(self, subgraph):
+    def push(self, subgraph, batch_size=None):
         """ Update remote entities from their local counterparts.
 
         For any nodes and relationships that exist in both the local
@@ -977,15 +1322,25 @@ class Transaction(object):
         and node labels into the remote copies. This operation does not
         create or delete any entities.
 
+        Only entities whose properties or labels have been changed since
+        they were last created, pulled or pushed are sent. Nodes that
+        need the same label changes are pushed together, in one query
+        per batch.
+
         :param subgraph: a :class:`.Node`, :class:`.Relationship` or other
                        :class:`.Subgraph`
+        :param batch_size: maximum number of nodes or relationships to
+                           send to the server in each query
         """
         try:
             push = subgraph.__db_push__
         except AttributeError:
             raise TypeError("No method defined to push object %r" % subgraph)
         else:
-            return push(self)
+            if batch_size is None:
+                return push(self)
+            else:
+                return push(self, batch_size=batch_size)
 
     def separate(self, subgraph):
         """ Delete the remote relationships that correspond to those in a local
@@ -1085,7 +1440,7 @@ class Cursor(object):
         """ Close this cursor and free up all associated resources.
         """
         if self._result is not None:
-            self._result.buffer()   # force consumption of remaining data
+            self._result.discard()  # consume and drop remaining data
             self._result = None
         self._current = None
 
@@ -1138,6 +1493,45 @@ class Cursor(object):
                 moved += 1
         return moved
 
+    def fetch_many(self, n, tuples=False):
+        """ Fetch up to `n` records in a single call, moving the cursor
+        past them. This avoids the per-record overhead of
+        :meth:`.forward` when processing large results in chunks.
+
+        :param n: maximum number of records to fetch
+        :param tuples: if :const:`True`, return plain tuples of values
+                       instead of :class:`.Record` objects
+        :returns: list of records or value tuples; this list will
+                  only be shorter than `n` if the result is exhausted
+        """
+        batch = self._result.fetch_many(n)
+        if batch:
+            from_values = self._result.record_type().from_values
+            self._current = from_values(batch[-1])
+            if not tuples:
+                batch = list(map(from_values, batch))
+        return batch
+
+    def iter_batches(self, size, tuples=False):
+        """ Iterate through the remaining records in batches of up to
+        `size` records each::
+
+            >>> for batch in graph.run("UNWIND range(1, 5) AS n RETURN n").iter_batches(2, tuples=True):
+            ...     print(batch)
+            [(1,), (2,)]
+            [(3,), (4,)]
+            [(5,)]
+
+        :param size: maximum number of records per batch
+        :param tuples: if :const:`True`, yield lists of plain tuples of
+                       values instead of lists of :class:`.Record` objects
+        """
+        while True:
+            batch = self.fetch_many(size, tuples)
+            if not batch:
+                break
+            yield batch
+
     def evaluate(self, field=0):
         """ Return the value of the first field from the next record
         (or the value of another field if explicitly specified).
@@ -1215,6 +1609,53 @@ class Cursor(object):
                     s |= s_
         return s
 
+    def to_columns(self, fields=None):
+        """ Consume and extract the entire result in columnar form, as
+        an ordered dictionary mapping each field name to a sequence of
+        values. Values are appended straight into per-field buffers as
+        records arrive, without building intermediate records. Columns
+        holding only integers or only floats are packed into
+        :class:`array.array` objects; all other columns are lists.
+
+            >>> from py2neo import Graph
+            >>> graph = Graph()
+            >>> graph.run("UNWIND range(1, 3) AS n RETURN n, n / 2.0 AS half").to_columns()
+            OrderedDict([('n', array('q', [1, 2, 3])), ('half', array('d', [0.5, 1.0, 1.5]))])
+
+        :param fields: names or indexes of the fields to extract
+                       (defaults to all fields)
+        :returns: :class:`collections.OrderedDict` of field name to
+                  :class:`array.array` or :class:`list`
+        """
+        from py2neo.internal.collections import ColumnBuffer
+        keys = list(self.keys())
+        if fields is None:
+            indexes = list(range(len(keys)))
+        else:
+            indexes = [field if isinstance(field, int) else keys.index(field) for field in fields]
+        buffers = [ColumnBuffer() for _ in indexes]
+        appenders = [(i, buffer.append) for i, buffer in zip(indexes, buffers)]
+        fetch_values = self._result.fetch_values
+        values = fetch_values()
+        while values is not None:
+            for i, append in appenders:
+                append(values[i])
+            values = fetch_values()
+        return OrderedDict((keys[i], buffer.values) for i, buffer in zip(indexes, buffers))
+
+    @classmethod
+    def _wrap_column(cls, column):
+        """ Wrap a packed column extracted by :meth:`.to_columns` in a
+        one-dimensional `ndarray`, without copying. Other columns are
+        returned unchanged.
+        """
+        from array import array
+        from numpy import frombuffer
+        if isinstance(column, array):
+            return frombuffer(column, dtype=column.typecode)
+        else:
+            return column
+
     def to_ndarray(self, dtype=None, order='K'):
         """ Consume and extract the entire result as a
         `numpy.ndarray <https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.html>`_.
@@ -1228,12 +1669,22 @@ class Cursor(object):
         :returns: `ndarray <https://docs.scipy.org/doc/numpy/reference/generated/numpy.ndarray.html>`__ object.
         """
         try:
-            from numpy import array
+            from numpy import array, empty, result_type
         except ImportError:
             warn("Numpy is not installed.")
             raise
         else:
-            return array(list(map(list, self)), dtype=dtype, order=order)
+            columns = list(self.to_columns().values())
+            if not columns or not len(columns[0]):
+                return array([], dtype=dtype, order=order)
+            arrays = [self._wrap_column(column) for column in columns]
+            if any(isinstance(column, list) for column in arrays):
+                return array([list(row) for row in zip(*arrays)], dtype=dtype, order=order)
+            out = empty((len(arrays[0]), len(arrays)), dtype=dtype or result_type(*arrays),
+                        order="F" if order == "F" else "C")
+            for j, column in enumerate(arrays):
+                out[:, j] = column
+            return out
 
     def to_series(self, field=0, index=None, dtype=None):
         """ Consume and extract one field of the entire result as a
@@ -1254,7 +1705,8 @@ class Cursor(object):
             warn("Pandas is not installed.")
             raise
         else:
-            return Series([record[field] for record in self], index=index, dtype=dtype)
+            column, = self.to_columns([field]).values()
+            return Series(self._wrap_column(column), index=index, dtype=dtype)
 
     def to_data_frame(self, index=None, columns=None, dtype=None):
         """ Consume and extract the entire result as a
@@ -1265,11 +1717,11 @@ class Cursor(object):
             >>> from py2neo import Graph
             >>> graph = Graph()
             >>> graph.run("MATCH (a:Person) RETURN a.name, a.born LIMIT 4").to_data_frame()
-               a.born              a.name
-            0    1964        Keanu Reeves
-            1    1967    Carrie-Anne Moss
-            2    1961  Laurence Fishburne
-            3    1960        Hugo Weaving
+                           a.name  a.born
+            0        Keanu Reeves    1964
+            1    Carrie-Anne Moss    1967
+            2  Laurence Fishburne    1961
+            3        Hugo Weaving    1960
 
         .. note::
            This method requires `pandas` to be installed.
@@ -1286,7 +1738,238 @@ class Cursor(object):
             warn("Pandas is not installed.")
             raise
         else:
-            return DataFrame(list(map(dict, self)), index=index, columns=columns, dtype=dtype)
+            data = OrderedDict((key, self._wrap_column(column)) for key, column in self.to_columns().items())
+            return DataFrame(data, index=index, columns=columns, dtype=dtype)
+
+    @classmethod
+    def _flatten(cls, value):
+        """ Flatten a value into a form that can be stored in an
+        Arrow column. Nodes and relationships become maps of their
+        identity, labels or type, and properties; paths become maps of
+        their nodes and relationships.
+        """
+        from py2neo.data import Node, LazyNode, Relationship, Path
+        if isinstance(value, (Node, LazyNode)):
+            return {"id": value.identity, "labels": sorted(value.labels), "properties": dict(value)}
+        elif isinstance(value, Relationship):
+            return {"id": value.identity, "type": type(value).__name__,
+                    "start": value.start_node.identity, "end": value.end_node.identity,
+                    "properties": dict(value)}
+        elif isinstance(value, Path):
+            return {"nodes": [cls._flatten(node) for node in value.nodes],
+                    "relationships": [cls._flatten(rel) for rel in value.relationships]}
+        elif isinstance(value, list):
+            return [cls._flatten(item) for item in value]
+        elif isinstance(value, dict):
+            return {key: cls._flatten(item) for key, item in value.items()}
+        elif hasattr(value, "to_native"):
+            return value.to_native()
+        else:
+            return value
+
+    def _iter_arrow_batches(self, batch_size, schema=None):
+        """ Consume the result in batches of up to `batch_size` records,
+        yielding each as a `pyarrow.RecordBatch`. If a schema is
+        supplied, it is applied to every batch; otherwise, the schema of
+        each batch is inferred from its own values.
+        """
+        from pyarrow import array, schema as arrow_schema, RecordBatch
+        keys = list(self.keys())
+        flatten = self._flatten
+        fetch_values = self._result.fetch_values
+        while True:
+            columns = [[] for _ in keys]
+            values = fetch_values()
+            while values is not None:
+                for column, value in zip(columns, values):
+                    column.append(flatten(value))
+                if len(columns[0]) >= batch_size:
+                    break
+                values = fetch_values()
+            if not columns or not columns[0]:
+                return
+            if schema is None:
+                arrays = [array(column) for column in columns]
+                batch_schema = arrow_schema([(key, a.type) for key, a in zip(keys, arrays)])
+            else:
+                arrays = [array(column, type=f.type) for column, f in zip(columns, schema)]
+                batch_schema = schema
+            yield RecordBatch.from_arrays(arrays, schema=batch_schema)
+
+    @classmethod
+    def _merge_arrow_types(cls, a, b):
+        """ Return a `pyarrow.DataType` that can hold values of both
+        `a` and `b`. A null type gives way to any other type, struct
+        types are merged field by field, and integer and floating
+        point types are widened as necessary.
+        """
+        from pyarrow import field, float64, int64, list_, struct, types
+        if a.equals(b) or types.is_null(b):
+            return a
+        elif types.is_null(a):
+            return b
+        elif types.is_struct(a) and types.is_struct(b):
+            merged = OrderedDict((f.name, f.type) for f in a)
+            for f in b:
+                if f.name in merged:
+                    merged[f.name] = cls._merge_arrow_types(merged[f.name], f.type)
+                else:
+                    merged[f.name] = f.type
+            return struct([field(name, t) for name, t in merged.items()])
+        elif types.is_list(a) and types.is_list(b):
+            return list_(cls._merge_arrow_types(a.value_type, b.value_type))
+        elif types.is_integer(a) and types.is_integer(b):
+            return int64()
+        elif (types.is_integer(a) or types.is_floating(a)) and (types.is_integer(b) or types.is_floating(b)):
+            return float64()
+        else:
+            raise TypeError("Cannot merge Arrow types %s and %s" % (a, b))
+
+    def _unified_arrow_batches(self, batch_size):
+        """ Consume the result into a list of `pyarrow.RecordBatch`
+        objects that share a single schema. This schema is merged
+        from those inferred for every batch, so that properties first
+        seen in later records are kept, and columns that are null in
+        early batches take the type of their later values.
+
+        :returns: 2-tuple of (schema, list of batches)
+        """
+        from pyarrow import field, null, schema as arrow_schema
+        batches = list(self._iter_arrow_batches(batch_size))
+        if not batches:
+            return arrow_schema([field(key, null()) for key in self.keys()]), batches
+        fields = list(batches[0].schema)
+        for batch in batches[1:]:
+            fields = [field(f.name, self._merge_arrow_types(f.type, g.type))
+                      for f, g in zip(fields, batch.schema)]
+        schema = arrow_schema(fields)
+        return schema, [self._cast_arrow_batch(batch, schema) for batch in batches]
+
+    @classmethod
+    def _cast_arrow_batch(cls, batch, schema):
+        """ Return `batch` with each column cast to the type given by
+        `schema`, which must be able to hold every value in it.
+        """
+        from pyarrow import array, RecordBatch
+        if batch.schema.equals(schema):
+            return batch
+        arrays = [column if column.type.equals(f.type) else array(column.to_pylist(), type=f.type)
+                  for column, f in zip(batch.columns, schema)]
+        return RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _streamed_arrow_batches(self, batch_size):
+        """ Consume the result in batches, inferring a schema from the
+        first batch only. Each later batch is cast to that schema, and
+        a `TypeError` is raised for any batch holding values that the
+        schema cannot, such as properties first seen in that batch.
+
+        :returns: 2-tuple of (schema, iterator of batches)
+        """
+        from pyarrow import field, null, schema as arrow_schema
+        batches = self._iter_arrow_batches(batch_size)
+        try:
+            first = next(batches)
+        except StopIteration:
+            return arrow_schema([field(key, null()) for key in self.keys()]), iter(())
+        schema = first.schema
+
+        def stream():
+            yield first
+            for batch in batches:
+                for f, g in zip(schema, batch.schema):
+                    if not self._merge_arrow_types(f.type, g.type).equals(f.type):
+                        raise TypeError("Values of type %s in column %r do not fit the type %s inferred "
+                                        "from the first batch" % (g.type, f.name, f.type))
+                yield self._cast_arrow_batch(batch, schema)
+
+        return schema, stream()
+
+    def to_arrow(self, schema=None, batch_size=65536):
+        """ Consume and extract the entire result as a
+        `pyarrow.Table <https://arrow.apache.org/docs/python/generated/pyarrow.Table.html>`_,
+        built incrementally from record batches.
+
+        Nodes, relationships and paths are flattened into struct
+        columns: nodes carry `id`, `labels` and `properties` fields;
+        relationships carry `id`, `type`, `start`, `end` and
+        `properties` fields; and paths carry lists of `nodes` and
+        `relationships`.
+
+        If no schema is supplied, one is inferred from all records.
+        As the table holds every batch anyway, this costs no more
+        memory than the table itself.
+
+        .. note::
+           This method requires `pyarrow` to be installed.
+
+        :param schema: `pyarrow.Schema` to apply to the table (inferred
+                       from all records by default)
+        :param batch_size: number of records per record batch
+        :warns: If `pyarrow` is not installed
+        :returns: `Table <https://arrow.apache.org/docs/python/generated/pyarrow.Table.html>`__ object.
+        """
+        try:
+            from pyarrow import Table
+        except ImportError:
+            warn("PyArrow is not installed.")
+            raise
+        else:
+            if schema is None:
+                schema, batches = self._unified_arrow_batches(batch_size)
+            else:
+                batches = list(self._iter_arrow_batches(batch_size, schema))
+            return Table.from_batches(batches, schema=schema)
+
+    def write_parquet(self, path, schema=None, batch_size=65536, infer_from_all=False, **kwargs):
+        """ Consume the entire result and write it to a
+        `Parquet <https://parquet.apache.org/>`_ file, one record batch
+        at a time. Values are flattened as described for
+        :meth:`.to_arrow`.
+
+        By default, each batch is written as soon as it is received,
+        so that the full result is never held in memory. The schema
+        is either supplied or inferred from the first batch. In the
+        latter case, a `TypeError` is raised for any later value that
+        does not fit that schema, such as a property that no record
+        in the first batch has. Setting `infer_from_all` instead infers
+        the schema from all records, at the cost of holding the entire
+        result in Arrow format until it has been consumed.
+
+        .. note::
+           This method requires `pyarrow` to be installed.
+
+        :param path: path or file-like object to write to
+        :param schema: `pyarrow.Schema` to apply to the file (inferred
+                       from the first batch by default)
+        :param batch_size: number of records per record batch
+        :param infer_from_all: if no schema is supplied, infer one from
+                               all records rather than the first batch
+        :param kwargs: extra arguments for `pyarrow.parquet.ParquetWriter`
+        :warns: If `pyarrow` is not installed
+        :returns: number of records written
+        """
+        try:
+            from pyarrow import Table
+            from pyarrow.parquet import ParquetWriter
+        except ImportError:
+            warn("PyArrow is not installed.")
+            raise
+        else:
+            if schema is not None:
+                batches = self._iter_arrow_batches(batch_size, schema)
+            elif infer_from_all:
+                schema, batches = self._unified_arrow_batches(batch_size)
+            else:
+                schema, batches = self._streamed_arrow_batches(batch_size)
+            count = 0
+            writer = ParquetWriter(path, schema, **kwargs)
+            try:
+                for batch in batches:
+                    writer.write_table(Table.from_batches([batch], schema=schema))
+                    count += batch.num_rows
+            finally:
+                writer.close()
+            return count
 
     def to_matrix(self, mutable=False):
         """ Consume and extract the entire result as a
@@ -0,0 +1,702 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Asyncio connectors for Bolt and HTTP. These mirror the blocking
+connectors in :mod:`py2neo.internal.connectors` but carry out all
+network I/O on an event loop, using `asyncio` streams. Note that this
+module requires Python 3.5 or above.
+"""
+
+
+from asyncio import get_event_loop, open_connection
+from collections import deque, OrderedDict
+from json import dumps as json_dumps
+from ssl import create_default_context, CERT_NONE
+from struct import pack as struct_pack, unpack as struct_unpack
+
+from neobolt.addressing import SocketAddress
+from neobolt.direct import ServerInfo, ChunkedInputBuffer, ChunkedOutputBuffer
+from neobolt.exceptions import AuthError, ProtocolError, ServiceUnavailable
+from neobolt.packstream import Packer, Unpacker
+from neobolt.security import AuthToken
+from urllib3 import make_headers
+
+from py2neo.internal.compat import urlsplit
+from py2neo.internal.connectors import get_connection_data, http_status_error, CONNECTOR_SETTINGS
+from py2neo.internal.hydration import CypherResult, JSONHydrator, PackStreamHydrator, HydrationError, \
+    RELATIONSHIP_TYPES_QUERY
+
+
+BOLT_MAGIC_PREAMBLE = 0x6060B017
+BOLT_VERSIONS = (3, 2, 1, 0)
+
+
+def _ssl_context(cx_data):
+    if not cx_data["secure"]:
+        return None
+    context = create_default_context()
+    if not cx_data["verified"]:
+        context.check_hostname = False
+        context.verify_mode = CERT_NONE
+    return context
+
+
+class AsyncJSONHydrator(JSONHydrator):
+    """ JSON hydrator for use on an event loop. This never looks up
+    relationship types itself, as that would block the loop; instead,
+    the types of any relationships in paths must be resolved by the
+    connector before the records are hydrated.
+    """
+
+    def lookup_relationship_types(self, r_ids):
+        raise HydrationError("Types of relationships %r are unknown" % sorted(r_ids))
+
+
+class AsyncCypherResult(object):
+    """ Asynchronous wrapper around a :class:`.CypherResult` buffer.
+    Records and metadata are collected into the wrapped result by the
+    connector; this wrapper simply awaits the arrival of more data
+    whenever the buffer runs dry.
+    """
+
+    def __init__(self, result, on_more=None):
+        self._result = result
+        self._on_more = on_more
+
+    async def _more(self):
+        if self._on_more is None:
+            self._result.done()
+        else:
+            await self._on_more()
+
+    def keys(self):
+        return self._result.keys()
+
+    async def buffer(self):
+        while not self._result._is_done():
+            await self._more()
+
+    async def discard(self):
+        self._result._start_discarding()
+        await self.buffer()
+
+    async def fetch(self):
+        if self._result._is_empty():
+            while self._result._awaiting_records():
+                await self._more()
+        return self._result.fetch()
+
+    async def summary(self):
+        await self.buffer()
+        return self._result.summary()
+
+    async def plan(self):
+        await self.buffer()
+        return self._result.plan()
+
+    async def stats(self):
+        await self.buffer()
+        return self._result.stats()
+
+
+class AsyncConnectionPool(object):
+    """ Pool of connections to a single server, shared by all
+    coroutines running on the same event loop.
+
+    :param connector: coroutine function used to open a new connection
+    :param max_size: maximum number of connections held by the pool
+    """
+
+    def __init__(self, connector, max_size=100):
+        self.connector = connector
+        self.max_size = max_size
+        self.size = 0
+        self._idle = deque()
+        self._waiters = deque()
+
+    async def acquire(self):
+        while True:
+            while self._idle:
+                cx = self._idle.popleft()
+                if not cx.closed():
+                    try:
+                        await cx.sync()     # consume any outstanding responses, such as RESET
+                    except Exception:
+                        cx.close()
+                    else:
+                        return cx
+                self.size -= 1
+            if self.size < self.max_size:
+                self.size += 1
+                try:
+                    return await self.connector()
+                except Exception:
+                    self.size -= 1
+                    raise
+            waiter = get_event_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    def release(self, cx):
+        self._idle.append(cx)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def close(self):
+        while self._idle:
+            self._idle.popleft().close()
+            self.size -= 1
+
+
+class AsyncBoltConnection(object):
+    """ A single Bolt connection driven by an asyncio event loop.
+    Messages are queued locally by :meth:`.run`, :meth:`.pull_all`,
+    etc, then sent by :meth:`.send`. Responses are received and
+    dispatched to their handlers by :meth:`.fetch`.
+    """
+
+    @classmethod
+    async def open(cls, cx_data):
+        reader, writer = await open_connection(cx_data["host"], cx_data["port"], ssl=_ssl_context(cx_data))
+        writer.write(b"".join(struct_pack(">I", num) for num in (BOLT_MAGIC_PREAMBLE,) + BOLT_VERSIONS))
+        await writer.drain()
+        data = await reader.read(4)
+        if len(data) == 0:
+            writer.close()
+            raise ServiceUnavailable("Connection to %r closed without handshake "
+                                     "response" % (cx_data["uri"],))
+        if len(data) != 4:
+            writer.close()
+            raise ProtocolError("Expected four byte Bolt handshake response from %r, received %r "
+                                "instead; check for incorrect port number" % (cx_data["uri"], data))
+        protocol_version, = struct_unpack(">I", data)
+        if protocol_version not in BOLT_VERSIONS or protocol_version == 0:
+            writer.close()
+            raise ProtocolError("Unable to agree a Bolt protocol version with %r" % (cx_data["uri"],))
+        inst = cls(reader, writer, protocol_version)
+        await inst.init(cx_data["user_agent"], cx_data["auth"])
+        return inst
+
+    def __init__(self, reader, writer, protocol_version):
+        self.reader = reader
+        self.writer = writer
+        self.protocol_version = protocol_version
+        self.server = ServerInfo(SocketAddress.from_socket(writer.get_extra_info("socket")), protocol_version)
+        self.input_buffer = ChunkedInputBuffer()
+        self.output_buffer = ChunkedOutputBuffer()
+        self.packer = Packer(self.output_buffer)
+        self.unpacker = Unpacker()
+        self.responses = deque()
+        self._closed = False
+
+    async def init(self, user_agent, auth):
+        failure = {}
+        auth_dict = vars(AuthToken("basic", *auth))
+        if self.protocol_version >= 3:
+            headers = dict(auth_dict, user_agent=user_agent)
+            self._append(b"\x01", (headers,), on_success=self.server.metadata.update, on_failure=failure.update)
+        else:
+            self._append(b"\x01", (user_agent, auth_dict),
+                         on_success=self.server.metadata.update, on_failure=failure.update)
+        try:
+            await self.sync()
+        except ServiceUnavailable:
+            # the server may close the connection on failure
+            if not failure:
+                raise
+        if failure:
+            self.close()
+            message = failure.get("message", "Connection initialisation failed")
+            if failure.get("code") == "Neo.ClientError.Security.Unauthorized":
+                raise AuthError(message)
+            else:
+                raise ServiceUnavailable(message)
+        self.packer.supports_bytes = self.server.supports("bytes")
+
+    def _append(self, signature, fields=(), **handlers):
+        self.packer.pack_struct(signature, fields)
+        self.output_buffer.chunk()
+        self.output_buffer.chunk()
+        self.responses.append(handlers)
+
+    def run(self, statement, parameters=None, **handlers):
+        if self.protocol_version >= 3:
+            self._append(b"\x10", (statement, parameters or {}, {}), **handlers)
+        else:
+            self._append(b"\x10", (statement, parameters or {}), **handlers)
+
+    def discard_all(self, **handlers):
+        self._append(b"\x2F", (), **handlers)
+
+    def pull_all(self, **handlers):
+        self._append(b"\x3F", (), **handlers)
+
+    def begin(self, **handlers):
+        if self.protocol_version >= 3:
+            self._append(b"\x11", ({},), **handlers)
+        else:
+            self.run(u"BEGIN", {}, **handlers)
+            self.discard_all(**handlers)
+
+    def commit(self, **handlers):
+        if self.protocol_version >= 3:
+            self._append(b"\x12", (), **handlers)
+        else:
+            self.run(u"COMMIT", {}, **handlers)
+            self.discard_all(**handlers)
+
+    def rollback(self, **handlers):
+        if self.protocol_version >= 3:
+            self._append(b"\x13", (), **handlers)
+        else:
+            self.run(u"ROLLBACK", {}, **handlers)
+            self.discard_all(**handlers)
+
+    def reset(self):
+        """ Queue a RESET message. This is not sent immediately, but
+        will be flushed by the next call to :meth:`.send`.
+        """
+
+        def fail(metadata):
+            raise ProtocolError("RESET failed %r" % metadata)
+
+        self._append(b"\x0F", on_failure=fail)
+
+    async def send(self):
+        data = self.output_buffer.view()
+        if not data:
+            return
+        if self._closed:
+            raise ServiceUnavailable("Failed to write to closed connection")
+        self.writer.write(data.tobytes())
+        self.output_buffer.clear()
+        await self.writer.drain()
+
+    async def _receive(self):
+        while not self.input_buffer.frame_message():
+            data = await self.reader.read(8192)
+            if not data:
+                self.close()
+                raise ServiceUnavailable("Failed to read from defunct connection")
+            self.input_buffer.load(data)
+
+    async def fetch(self):
+        """ Receive and dispatch at least one message from the server.
+        """
+        if not self.responses:
+            return
+        await self.send()
+        await self._receive()
+        records = []
+        signature = metadata = None
+        while True:
+            self.unpacker.attach(self.input_buffer.frame())
+            _, tag = self.unpacker.unpack_structure_header()
+            if tag == b"\x71":
+                records.append(self.unpacker.unpack_list())
+                if not self.input_buffer.frame_message():
+                    break
+            else:
+                signature = tag
+                metadata = self.unpacker.unpack_map()
+                break
+        handlers = self.responses[0]
+        if records:
+            handler = handlers.get("on_records")
+            if callable(handler):
+                handler(records)
+        if signature is None:
+            return
+        self.responses.popleft()
+        if signature == b"\x70":
+            keys = ["on_success", "on_summary"]
+        elif signature == b"\x7E":
+            keys = ["on_ignored", "on_summary"]
+        elif signature == b"\x7F":
+            self.reset()
+            keys = ["on_failure", "on_summary"]
+        else:
+            raise ProtocolError("Unexpected response message with signature %r" % signature)
+        for key in keys:
+            handler = handlers.get(key)
+            if callable(handler):
+                if key == "on_summary":
+                    handler()
+                else:
+                    handler(metadata or {})
+
+    async def sync(self):
+        await self.send()
+        while self.responses:
+            await self.fetch()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.writer.close()
+
+    def closed(self):
+        return self._closed
+
+
+class AsyncHTTPConnection(object):
+    """ A single keep-alive HTTP/1.1 connection driven by an asyncio
+    event loop.
+    """
+
+    @classmethod
+    async def open(cls, cx_data):
+        reader, writer = await open_connection(cx_data["host"], cx_data["port"], ssl=_ssl_context(cx_data))
+        return cls(reader, writer, "%s:%s" % (cx_data["host"], cx_data["port"]))
+
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self._closed = False
+
+    async def request(self, method, url, headers, body=None):
+        """ Make a request and return a 3-tuple of status code, headers
+        and body.
+        """
+        if self._closed:
+            raise ServiceUnavailable("Failed to write to closed connection")
+        lines = ["%s %s HTTP/1.1" % (method, url), "Host: %s" % self.host]
+        lines.extend("%s: %s" % item for item in headers.items())
+        if body is not None:
+            lines.append("Content-Length: %d" % len(body))
+        lines.append("\r\n")
+        self.writer.write("\r\n".join(lines).encode("latin-1"))
+        if body is not None:
+            self.writer.write(body)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ServiceUnavailable("Failed to read from defunct connection")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b""):
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = await self.reader.read()
+            self.close()
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, response_headers, data
+
+    async def sync(self):
+        pass
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.writer.close()
+
+    def closed(self):
+        return self._closed
+
+
+class AsyncConnector(object):
+    """ Base class for asyncio connectors. Instantiating this class
+    selects and returns an instance of the subclass that supports the
+    URI scheme specified.
+    """
+
+    scheme = NotImplemented
+
+    pool = None
+
+    config = None
+
+    fetch_size = None
+
+    lazy_entities = False
+
+    @classmethod
+    def walk_subclasses(cls):
+        subclasses = cls.__subclasses__()
+        for subclass in subclasses:
+            yield subclass
+            for c in subclass.walk_subclasses():
+                yield c
+
+    def __new__(cls, uri, **settings):
+        cx_data = get_connection_data(uri, **settings)
+        for subclass in cls.walk_subclasses():
+            if subclass.scheme == cx_data["scheme"]:
+                inst = object.__new__(subclass)
+                inst.connection_data = cx_data
+                inst.transactions = set()
+                inst.config = {key: settings[key] for key in CONNECTOR_SETTINGS if settings.get(key) is not None}
+                inst.fetch_size = inst.config.get("fetch_size")
+                inst.lazy_entities = bool(inst.config.get("lazy_entities"))
+                inst.open(cx_data)
+                return inst
+        raise ValueError("Unsupported scheme %r" % cx_data["scheme"])
+
+    def open(self, cx_data):
+        raise NotImplementedError()
+
+    def close(self):
+        self.pool.close()
+
+    async def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
+        raise NotImplementedError()
+
+    def is_valid_transaction(self, tx):
+        return tx is not None and tx in self.transactions
+
+    def _assert_valid_tx(self, tx):
+        from py2neo.database import TransactionError
+        if tx is None:
+            raise TransactionError("No transaction")
+        if tx not in self.transactions:
+            raise TransactionError("Invalid transaction")
+
+    async def begin(self):
+        raise NotImplementedError()
+
+    async def commit(self, tx):
+        raise NotImplementedError()
+
+    async def rollback(self, tx):
+        raise NotImplementedError()
+
+    async def sync(self, tx):
+        raise NotImplementedError()
+
+
+class AsyncBoltConnector(AsyncConnector):
+
+    scheme = "bolt"
+
+    def open(self, cx_data):
+
+        async def connector():
+            return await AsyncBoltConnection.open(cx_data)
+
+        self.pool = AsyncConnectionPool(connector, max_size=self.config.get("max_connections", 100))
+
+    @classmethod
+    def _fail(cls, metadata):
+        from py2neo.database import GraphError
+        raise GraphError.hydrate(metadata)
+
+    async def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
+        if tx is None:
+            cx = await self.pool.acquire()
+        else:
+            self._assert_valid_tx(tx)
+            cx = tx
+
+        released = []
+
+        def release():
+            # Outstanding responses on a released connection are
+            # consumed by the pool before that connection is reused.
+            if not released:
+                released.append(cx)
+                self.pool.release(cx)
+
+        def fail(metadata):
+            if tx is not None:
+                self.transactions.discard(tx)
+            release()
+            self._fail(metadata)
+
+        hydrator = PackStreamHydrator(version=cx.protocol_version, graph=graph, keys=keys, entities=entities,
+                                      lazy=self.lazy_entities)
+        dehydrated_parameters = hydrator.dehydrate(parameters)
+        result = CypherResult(on_done=None if tx else release, fetch_size=self.fetch_size)
+        result.update_metadata({"connection": self.connection_data})
+
+        def update_metadata_with_keys(metadata):
+            result.update_metadata(metadata)
+            hydrator.keys = result.keys()
+
+        cx.run(statement, dehydrated_parameters or {}, on_success=update_metadata_with_keys, on_failure=fail)
+        cx.pull_all(on_records=lambda records: result.append_records(map(hydrator.hydrate, records)),
+                    on_success=result.update_metadata, on_failure=fail, on_summary=result.done)
+        async_result = AsyncCypherResult(result, on_more=cx.fetch)
+        while result._awaiting_keys():
+            await cx.fetch()    # force receipt of RUN summary, to detect any errors
+        return async_result
+
+    async def begin(self):
+        tx = await self.pool.acquire()
+        tx.begin()
+        self.transactions.add(tx)
+        return tx
+
+    async def commit(self, tx):
+        self._assert_valid_tx(tx)
+        self.transactions.remove(tx)
+        tx.commit()
+        try:
+            await tx.sync()
+        finally:
+            self.pool.release(tx)
+
+    async def rollback(self, tx):
+        self._assert_valid_tx(tx)
+        self.transactions.remove(tx)
+        tx.rollback()
+        try:
+            await tx.sync()
+        finally:
+            self.pool.release(tx)
+
+    async def sync(self, tx):
+        await tx.sync()
+
+
+class AsyncHTTPConnector(AsyncConnector):
+
+    scheme = "http"
+
+    headers = None
+
+    def open(self, cx_data):
+
+        async def connector():
+            return await AsyncHTTPConnection.open(cx_data)
+
+        self.pool = AsyncConnectionPool(connector, max_size=self.config.get("max_connections", 100))
+        self.headers = make_headers(basic_auth=":".join(cx_data["auth"]),
+                                    user_agent=cx_data["user_agent"], keep_alive=True)
+
+    async def _request(self, method, url, body=None):
+        headers = dict(self.headers)
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json_dumps(body).encode("utf-8")
+        cx = await self.pool.acquire()
+        try:
+            status, headers, data = await cx.request(method, url, headers, body)
+        except Exception:
+            cx.close()
+            raise
+        finally:
+            self.pool.release(cx)
+        return status, headers, data
+
+    async def _post(self, url, statement=None, parameters=None):
+        if statement:
+            statements = [
+                OrderedDict([
+                    ("statement", statement),
+                    ("parameters", parameters or {}),
+                    ("resultDataContents", ["REST"]),
+                    ("includeStats", True),
+                ])
+            ]
+        else:
+            statements = []
+        return await self._request("POST", url, {"statements": statements})
+
+    async def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
+        hydrator = AsyncJSONHydrator(version="rest", graph=graph, keys=keys, entities=entities,
+                                     lazy=self.lazy_entities)
+        status, _, data = await self._post("/db/data/transaction/%s" % (tx or "commit"),
+                                           statement, hydrator.dehydrate(parameters))
+        if status != 200:
+            raise http_status_error(status)
+        try:
+            raw_result = hydrator.hydrate_result(data.decode("utf-8"))
+        except HydrationError as e:
+            from py2neo.database import GraphError
+            if tx is not None:
+                self.transactions.discard(tx)
+            raise GraphError.hydrate(e.args[0])
+        else:
+            result = CypherResult({
+                "connection": self.connection_data,
+                "fields": raw_result.get("columns"),
+                "plan": raw_result.get("plan"),
+                "stats": raw_result.get("stats"),
+            })
+            hydrator.keys = result.keys()
+            records = [record[hydrator.version] for record in raw_result["data"]]
+            await self._resolve_relationship_types(hydrator, records)
+            result.append_records(hydrator.hydrate_records(records))
+            result.done()
+            return AsyncCypherResult(result)
+
+    async def _resolve_relationship_types(self, hydrator, records):
+        """ Look up the types of any relationships in paths that are
+        not already known, so that they are all available before the
+        records are hydrated.
+        """
+        missing = hydrator.unknown_relationship_types(hydrator.path_relationship_ids(records))
+        if missing:
+            lookup = await self.run(RELATIONSHIP_TYPES_QUERY, {"x": list(missing)}, graph=hydrator.graph)
+            while True:
+                record = await lookup.fetch()
+                if record is None:
+                    break
+                r_id, r_type = record
+                hydrator.relationship_types[r_id] = r_type
+
+    async def begin(self):
+        status, headers, _ = await self._post("/db/data/transaction")
+        if status == 201:
+            location_path = urlsplit(headers["location"]).path
+            tx = location_path.rpartition("/")[-1]
+            self.transactions.add(tx)
+            return tx
+        else:
+            raise RuntimeError("Can't begin a new transaction")
+
+    async def commit(self, tx):
+        self._assert_valid_tx(tx)
+        self.transactions.remove(tx)
+        await self._post("/db/data/transaction/%s/commit" % tx)
+
+    async def rollback(self, tx):
+        self._assert_valid_tx(tx)
+        self.transactions.remove(tx)
+        await self._request("DELETE", "/db/data/transaction/%s" % tx)
+
+    async def sync(self, tx):
+        pass
+
+
+class AsyncSecureHTTPConnector(AsyncHTTPConnector):
+
+    scheme = "https"
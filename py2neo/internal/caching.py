@@ -16,53 +16,342 @@
 # limitations under the License.
 
 
-from threading import Lock, local
+from collections import OrderedDict
+from threading import Lock
+from timeit import default_timer as timer
 from weakref import WeakValueDictionary
 
 
-class ThreadLocalEntityCache(local):
+#: Default number of independently locked stripes in an :class:`.EntityCache`.
+DEFAULT_CACHE_STRIPES = 16
 
-    def __init__(self):
+#: Cache policy used when none is given.
+DEFAULT_CACHE_POLICY = "weak"
+
+#: Default number of recently used entities retained by the ``lru``
+#: and ``ttl`` cache policies.
+DEFAULT_CACHE_CAPACITY = 10000
+
+#: Default number of seconds for which the ``ttl`` cache policy
+#: considers a cached entity to be current.
+DEFAULT_CACHE_TTL = 60.0
+
+
+class EntityCacheStripe(object):
+    """ One independently locked section of an :class:`.EntityCache`.
+    """
+
+    def __init__(self, capacity, ttl):
         self.lock = Lock()
-        self._dict = WeakValueDictionary()
+        self.capacity = capacity
+        self.ttl = ttl
+        self.entries = WeakValueDictionary()
+        self.retained = OrderedDict()
+        self.stamps = {}
+        self.invalidated = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def retain(self, key, value):
+        """ Hold a strong reference to a value as the most recently
+        used, evicting the least recently used value if capacity is
+        exceeded. Must be called with the lock held.
+        """
+        if not self.capacity:
+            return
+        retained = self.retained
+        retained.pop(key, None)
+        retained[key] = value
+        if len(retained) > self.capacity:
+            retained.popitem(last=False)
+            self.evictions += 1
+
+    def stamp(self, key):
+        """ Record that the value for a key is current as of now. Must
+        be called with the lock held.
+        """
+        self.invalidated.discard(key)
+        if self.ttl is None:
+            return
+        stamps = self.stamps
+        stamps[key] = timer()
+        if len(stamps) > 2 * len(self.entries) + 64:
+            # Forget the stamps of values that are no longer cached
+            for k in [k for k in stamps if k not in self.entries]:
+                del stamps[k]
+
+    def invalidate(self, key):
+        """ Record that the value for a key is no longer current. Must
+        be called with the lock held. Any strong reference is kept, so
+        that the value is not collected before it can be refreshed.
+        """
+        if key in self.entries:
+            invalidated = self.invalidated
+            invalidated.add(key)
+            self.stamps.pop(key, None)
+            if len(invalidated) > 2 * len(self.entries) + 64:
+                # Forget invalidated keys that are no longer cached
+                invalidated.intersection_update(self.entries.keys())
+
+    def is_current(self, key):
+        """ Check whether the value for a key has not been invalidated
+        and, if there is a time-to-live, was stamped within it. Must be
+        called with the lock held.
+        """
+        if key in self.invalidated:
+            return False
+        if self.ttl is None:
+            return True
+        stamp = self.stamps.get(key)
+        return stamp is not None and timer() - stamp <= self.ttl
+
+    def lookup(self, key):
+        """ Return the current value for a key, or :const:`None`,
+        counting a hit or miss. Must be called with the lock held.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        elif not self.is_current(key):
+            self.misses += 1
+            value = None
+        else:
+            self.hits += 1
+            self.retain(key, value)
+        return value
+
+
+class EntityCache(object):
+    """ Identity map from entity IDs to entities, shared by all threads.
+
+    Entities are held by weak reference and so only remain cached
+    while in use elsewhere. Optionally, up to `capacity` recently used
+    entities can also be held by strong reference, so that they
+    survive between queries; the least recently used are evicted
+    beyond that. Keys are spread over a number of stripes, each with
+    its own lock, so that concurrent updates seldom contend.
+
+    If a `ttl` is given, an entity is only returned by lookups for
+    that many seconds after it was last hydrated. Hydration always
+    reuses a cached entity however old, so that entity identity is
+    preserved when a stale entity is reloaded.
+
+    :param capacity: number of recently used entities to retain
+                     (approximately, as each stripe holds an equal
+                     share), or 0 to retain none
+    :param ttl: number of seconds for which entities are current,
+                or :const:`None` for no limit
+    :param stripes: number of independently locked stripes
+    """
+
+    def __init__(self, capacity=0, ttl=None, stripes=DEFAULT_CACHE_STRIPES):
+        self.capacity = capacity
+        self.ttl = ttl
+        share = -(-capacity // stripes)
+        self._stripes = [EntityCacheStripe(share, ttl) for _ in range(stripes)]
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
 
     def __contains__(self, key):
-        return key in self._dict
+        stripe = self._stripe(key)
+        if self.ttl is None and not stripe.invalidated:
+            return key in stripe.entries
+        with stripe.lock:
+            return key in stripe.entries and stripe.is_current(key)
 
     def __getitem__(self, key):
-        return self._dict[key]
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
 
     def get(self, key, default=None):
-        return self._dict.get(key, default)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            value = stripe.lookup(key)
+        return default if value is None else value
+
+    def peek(self, key):
+        """ Return the value for a key, whether or not it is current,
+        or :const:`None` if no value is cached. Lookup statistics are
+        not affected.
+        """
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return stripe.entries.get(key)
 
     def clear(self):
-        self._dict.clear()
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+                stripe.retained.clear()
+                stripe.stamps.clear()
+                stripe.invalidated.clear()
 
     def keys(self):
-        return self._dict.keys()
+        keys = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                keys.extend(stripe.entries.keys())
+        return keys
+
+    def stats(self):
+        """ Return a dictionary of cache statistics: the number of
+        `hits`, `misses` and `evictions` since the cache was created,
+        the number of entities currently `cached` and the number of
+        those `retained` by strong reference.
+        """
+        stats = dict.fromkeys(["hits", "misses", "evictions", "cached", "retained"], 0)
+        for stripe in self._stripes:
+            with stripe.lock:
+                stats["hits"] += stripe.hits
+                stats["misses"] += stripe.misses
+                stats["evictions"] += stripe.evictions
+                stats["cached"] += len(stripe.entries)
+                stats["retained"] += len(stripe.retained)
+        return stats
+
+    def invalidate(self, keys=None):
+        """ Mark the entities for the given keys (or for all keys, if
+        none are specified) as no longer current. Lookups will then
+        miss until each entity is next hydrated, but the entities
+        remain cached, so that their identity is preserved.
+        """
+        if keys is None:
+            for stripe in self._stripes:
+                with stripe.lock:
+                    for key in list(stripe.entries.keys()):
+                        stripe.invalidate(key)
+        else:
+            for key in keys:
+                stripe = self._stripe(key)
+                with stripe.lock:
+                    stripe.invalidate(key)
+
+    def touch(self, key):
+        """ Mark the entity for a given key as current, typically
+        after it has been refreshed with data from the server.
+        """
+        stripe = self._stripe(key)
+        if self.ttl is None and not stripe.invalidated:
+            return
+        with stripe.lock:
+            if key in stripe.entries:
+                stripe.stamp(key)
 
     def update(self, key, value):
         """ Extract, insert or remove a value for a given key.
+
+        If `value` is :const:`None`, any existing entry for `key` is
+        removed. If `value` is callable, the existing entry is
+        returned or, if none exists, `value` is called to construct a
+        new entry which is then inserted and returned. Otherwise,
+        `value` is inserted, replacing any existing entry.
         """
-        with self.lock:
+        stripe = self._stripe(key)
+        with stripe.lock:
             if value is None:
                 # remove
-                try:
-                    del self._dict[key]
-                except KeyError:
-                    pass
-                else:
-                    return None
+                stripe.retained.pop(key, None)
+                stripe.stamps.pop(key, None)
+                stripe.invalidated.discard(key)
+                stripe.entries.pop(key, None)
+                return None
             elif callable(value):
-                try:
-                    # extract
-                    return self._dict[key]
-                except KeyError:
-                    # construct and insert
-                    new_value = value()
-                    self._dict[key] = new_value
-                    return new_value
-            else:
-                # insert or replace
-                self._dict[key] = value
-                return value
+                # extract
+                existing = stripe.entries.get(key)
+                if existing is not None:
+                    stripe.hits += 1
+                    stripe.retain(key, existing)
+                    return existing
+                # construct and insert
+                stripe.misses += 1
+                value = value()
+            # insert or replace
+            stripe.entries[key] = value
+            stripe.retain(key, value)
+            stripe.stamp(key)
+            return value
+
+
+class NullEntityCache(object):
+    """ Entity cache that holds nothing, for use when caching is
+    disabled. Every hydrated entity is therefore a new object.
+    """
+
+    capacity = 0
+
+    ttl = None
+
+    def __contains__(self, key):
+        return False
+
+    def __getitem__(self, key):
+        raise KeyError(key)
+
+    def __len__(self):
+        return 0
+
+    def get(self, key, default=None):
+        return default
+
+    def peek(self, key):
+        return None
+
+    def clear(self):
+        pass
+
+    def invalidate(self, keys=None):
+        pass
+
+    def keys(self):
+        return []
+
+    def stats(self):
+        return dict.fromkeys(["hits", "misses", "evictions", "cached", "retained"], 0)
+
+    def touch(self, key):
+        pass
+
+    def update(self, key, value):
+        if callable(value):
+            return value()
+        return value
+
+
+#: Entity cache factories, keyed by cache policy name. Each is called
+#: with the `capacity` and `ttl` settings of a :class:`.Graph`.
+CACHE_POLICIES = {
+    "weak": lambda capacity, ttl: EntityCache(),
+    "lru": lambda capacity, ttl: EntityCache(capacity=capacity),
+    "ttl": lambda capacity, ttl: EntityCache(capacity=capacity, ttl=ttl),
+    "none": lambda capacity, ttl: NullEntityCache(),
+}
+
+
+def make_entity_cache(policy=None, capacity=None, ttl=None):
+    """ Create an entity cache for a given cache policy.
+
+    :param policy: name of a policy from :data:`.CACHE_POLICIES`
+                   (default ``"weak"``) or a callable accepting the
+                   same arguments as those factories
+    :param capacity: number of recently used entities to retain
+    :param ttl: number of seconds for which entities are current
+    """
+    if capacity is None:
+        capacity = DEFAULT_CACHE_CAPACITY
+    if ttl is None:
+        ttl = DEFAULT_CACHE_TTL
+    if callable(policy):
+        return policy(capacity, ttl)
+    try:
+        factory = CACHE_POLICIES[policy or DEFAULT_CACHE_POLICY]
+    except KeyError:
+        raise ValueError("Unknown cache policy %r" % policy)
+    else:
+        return factory(capacity, ttl)
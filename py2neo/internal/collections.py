@@ -18,9 +18,18 @@
 
 from __future__ import absolute_import
 
+from array import array
 from itertools import cycle, islice
 
-from py2neo.internal.compat import Set, bytes_types, string_types
+from py2neo.internal.compat import Set, bytes_types, integer_types, string_types
+
+
+try:
+    array("q")
+except ValueError:
+    INT64_TYPECODE = "l"
+else:
+    INT64_TYPECODE = "q"
 
 
 def is_collection(obj):
@@ -74,3 +83,51 @@ class SetView(Set):
     def difference(self, other):
         cls = self.__class__
         return cls(frozenset(self).difference(frozenset(other)))
+
+
+class ColumnBuffer(object):
+    """ Append-only buffer for the values of a single field. While all
+    values appended are integers, or all are floats, they are packed
+    into an :class:`array.array`; the buffer reverts to a list as soon
+    as any other value is appended.
+    """
+
+    def __init__(self):
+        self.data = None
+        self._types = None
+
+    def __len__(self):
+        return len(self.data or ())
+
+    def __iter__(self):
+        return iter(self.data or ())
+
+    def append(self, value):
+        data = self.data
+        if data is None:
+            if type(value) in integer_types:
+                data = self.data = array(INT64_TYPECODE)
+                self._types = integer_types
+            elif type(value) is float:
+                data = self.data = array("d")
+                self._types = (float,)
+            else:
+                data = self.data = []
+        if self._types is not None:
+            if type(value) in self._types:
+                try:
+                    data.append(value)
+                except OverflowError:
+                    pass
+                else:
+                    return
+            data = self.data = list(data)
+            self._types = None
+        data.append(value)
+
+    @property
+    def values(self):
+        """ The buffered values, as either an :class:`array.array` or
+        a list.
+        """
+        return [] if self.data is None else self.data
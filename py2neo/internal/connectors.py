@@ -21,14 +21,17 @@ from __future__ import absolute_import
 from collections import OrderedDict
 from hashlib import new as hashlib_new
 from json import dumps as json_dumps, loads as json_loads
+from zlib import compressobj, DEFLATED, MAX_WBITS
 
 from certifi import where
+from neobolt.compat import perf_counter
 from neobolt.direct import connect, ConnectionPool
+from neobolt.exceptions import ProtocolError, ServiceUnavailable
 from neobolt.routing import RoutingConnectionPool
 from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, make_headers
 
 from py2neo.internal.compat import bstr, urlsplit
-from py2neo.internal.hydration import CypherResult, JSONHydrator, PackStreamHydrator, HydrationError
+from py2neo.internal.hydration import CypherResult, JSONHydrator, PackStreamHydrator
 from py2neo.meta import NEO4J_URI, NEO4J_AUTH, NEO4J_USER_AGENT, NEO4J_SECURE, NEO4J_VERIFIED, \
     bolt_user_agent, http_user_agent
 
@@ -42,6 +45,42 @@ DEFAULT_HOST = "localhost"
 DEFAULT_BOLT_PORT = 7687
 DEFAULT_HTTP_PORT = 7474
 DEFAULT_HTTPS_PORT = 7473
+DEFAULT_MAX_CONNECTIONS = 100
+
+HTTP_CHUNK_SIZE = 65536
+HTTP_HYDRATION_BATCH_SIZE = 1000
+
+#: Settings that tune the behaviour of a connector, rather than
+#: identifying the server to which it connects.
+CONNECTOR_SETTINGS = ("fetch_size", "max_connections", "acquire_timeout", "max_idle_time",
+                      "max_lifetime", "liveness_check_timeout", "compress_requests", "lazy_entities")
+
+#: Values used for connector settings that are not supplied.
+CONNECTOR_DEFAULTS = {
+    "fetch_size": None,
+    "max_connections": DEFAULT_MAX_CONNECTIONS,
+    "acquire_timeout": 60,
+    "max_idle_time": None,
+    "max_lifetime": 3600,
+    "liveness_check_timeout": None,
+    "compress_requests": False,
+    "lazy_entities": False,
+}
+
+
+def gzip_compress(data):
+    """ Compress a byte string into gzip format.
+    """
+    compressor = compressobj(6, DEFLATED, 16 + MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def http_status_error(status):
+    """ Build the error to raise when a transactional HTTP request
+    returns an unexpected status code.
+    """
+    from py2neo.database import GraphError  # TODO: breaks abstraction layers :(
+    return GraphError("Unexpected HTTP status %d" % status, http_status_code=status)
 
 
 def coalesce(*values):
@@ -146,12 +185,134 @@ def get_connection_data(uri=None, **settings):
     return data
 
 
+class IdleConnectionPoolMixin(object):
+    """ Mixin for Bolt connection pools that evicts idle connections
+    and checks the liveness of connections before they are reused. This
+    applies to the connections held for every address in the pool.
+    """
+
+    #: Number of seconds a connection may sit idle in the pool before
+    #: it is closed.
+    max_idle_time = None
+
+    #: Number of seconds a connection may sit idle before it is reset
+    #: to check that it is still alive.
+    liveness_check_timeout = None
+
+    def _discard(self, address, connection):
+        with self.lock:
+            try:
+                self.connections[address].remove(connection)
+            except (KeyError, ValueError):
+                pass
+        try:
+            connection.close()
+        except IOError:
+            pass
+
+    def _idle_time(self, connection):
+        try:
+            return perf_counter() - connection.last_used
+        except AttributeError:
+            return 0
+
+    def _is_stale(self, connection):
+        return (connection.closed() or connection.defunct() or connection.timedout() or
+                (self.max_idle_time is not None and self._idle_time(connection) > self.max_idle_time))
+
+    def _is_alive(self, connection):
+        if self.liveness_check_timeout is None or self._idle_time(connection) <= self.liveness_check_timeout:
+            return True
+        try:
+            connection.reset()
+        except (IOError, OSError, ProtocolError, ServiceUnavailable):
+            return False
+        else:
+            return True
+
+    def evict(self):
+        """ Close and remove all idle connections that are stale.
+        """
+        with self.lock:
+            for address, connections in list(self.connections.items()):
+                for connection in list(connections):
+                    if not connection.in_use and self._is_stale(connection):
+                        self._discard(address, connection)
+
+    def acquire_direct(self, address):
+        self.evict()
+        while True:
+            connection = super(IdleConnectionPoolMixin, self).acquire_direct(address)
+            if self._is_alive(connection):
+                return connection
+            self._discard(address, connection)
+            with self.lock:
+                self.cond.notify_all()
+
+    def release(self, connection):
+        connection.last_used = perf_counter()
+        super(IdleConnectionPoolMixin, self).release(connection)
+
+
+class BoltConnectionPool(IdleConnectionPoolMixin, ConnectionPool):
+    """ Connection pool for a single Bolt server which, in addition to
+    the size limit and acquisition timeout offered by the base pool,
+    evicts idle connections and checks the liveness of connections
+    before they are reused.
+
+    :param max_idle_time: number of seconds a connection may sit idle
+                          in the pool before it is closed
+    :param liveness_check_timeout: number of seconds a connection may
+                                   sit idle before it is reset to check
+                                   that it is still alive
+    """
+
+    def __init__(self, connector, address, max_idle_time=None, liveness_check_timeout=None, **config):
+        super(BoltConnectionPool, self).__init__(connector, address, **config)
+        self.max_idle_time = max_idle_time
+        self.liveness_check_timeout = liveness_check_timeout
+
+
+class BoltRoutingConnectionPool(IdleConnectionPoolMixin, RoutingConnectionPool):
+    """ Routing connection pool for a Bolt cluster, which evicts idle
+    connections and checks their liveness in the same way as
+    :class:`.BoltConnectionPool`, for every server in the cluster.
+
+    :param max_idle_time: number of seconds a connection may sit idle
+                          in the pool before it is closed
+    :param liveness_check_timeout: number of seconds a connection may
+                                   sit idle before it is reset to check
+                                   that it is still alive
+    """
+
+    def __init__(self, connector, initial_address, routing_context, *routers, **config):
+        max_idle_time = config.pop("max_idle_time", None)
+        liveness_check_timeout = config.pop("liveness_check_timeout", None)
+        super(BoltRoutingConnectionPool, self).__init__(connector, initial_address, routing_context,
+                                                        *routers, **config)
+        self.max_idle_time = max_idle_time
+        self.liveness_check_timeout = liveness_check_timeout
+
+
 class Connector(object):
 
     scheme = NotImplemented
 
     pool = None
-    transactions = set()
+
+    #: Set of transactions currently open through this connector.
+    transactions = None
+
+    #: Connector settings (see :data:`.CONNECTOR_SETTINGS`).
+    config = None
+
+    #: Number of records to pull from the network in each batch while
+    #: a result is consumed (:const:`None` means a single read).
+    fetch_size = None
+
+    #: If :const:`True`, nodes in results are hydrated as
+    #: :class:`.LazyNode` proxies.
+    lazy_entities = False
 
     @classmethod
     def walk_subclasses(cls):
@@ -166,6 +327,10 @@ class Connector(object):
         for subclass in cls.walk_subclasses():
             if subclass.scheme == cx_data["scheme"]:
                 inst = object.__new__(subclass)
+                inst.transactions = set()
+                inst.config = {key: settings[key] for key in CONNECTOR_SETTINGS if settings.get(key) is not None}
+                inst.fetch_size = inst.config.get("fetch_size")
+                inst.lazy_entities = bool(inst.config.get("lazy_entities"))
                 inst.open(cx_data)
                 inst.connection_data = cx_data
                 return inst
@@ -181,7 +346,7 @@ class Connector(object):
     def close(self):
         raise NotImplementedError()
 
-    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
+    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None, pipelined=False):
         raise NotImplementedError()
 
     def is_valid_transaction(self, tx):
@@ -211,6 +376,10 @@ class BoltConnector(Connector):
 
     scheme = "bolt"
 
+    #: Results of pipelined statements, keyed by transaction, kept
+    #: until that transaction ends.
+    pipelined_results = None
+
     @property
     def server_agent(self):
         cx = self.pool.acquire()
@@ -219,22 +388,41 @@ class BoltConnector(Connector):
         finally:
             self.pool.release(cx)
 
-    def open(self, cx_data):
+    def _pool_config(self):
+        config = {}
+        if "max_connections" in self.config:
+            config["max_connection_pool_size"] = self.config["max_connections"]
+        if "acquire_timeout" in self.config:
+            config["connection_acquisition_timeout"] = self.config["acquire_timeout"]
+        return config
+
+    def _connector(self, cx_data):
+        config = {"auth": cx_data["auth"]}
+        if "max_lifetime" in self.config:
+            config["max_connection_lifetime"] = self.config["max_lifetime"]
 
         def connector(address_, **kwargs):
-            return connect(address_, auth=cx_data["auth"], **kwargs)
+            return connect(address_, **dict(config, **kwargs))
+
+        return connector
 
+    def open(self, cx_data):
         address = (cx_data["host"], cx_data["port"])
-        self.pool = ConnectionPool(connector, address)
+        self.pool = BoltConnectionPool(self._connector(cx_data), address,
+                                       max_idle_time=self.config.get("max_idle_time"),
+                                       liveness_check_timeout=self.config.get("liveness_check_timeout"),
+                                       **self._pool_config())
+        self.pipelined_results = {}
 
     def close(self):
         self.pool.close()
 
     def _run_1(self, statement, parameters, graph, keys, entities):
         cx = self.pool.acquire()
-        hydrator = PackStreamHydrator(version=cx.protocol_version, graph=graph, keys=keys, entities=entities)
+        hydrator = PackStreamHydrator(version=cx.protocol_version, graph=graph, keys=keys, entities=entities,
+                                      lazy=self.lazy_entities)
         dehydrated_parameters = hydrator.dehydrate(parameters)
-        result = CypherResult(on_more=cx.fetch, on_done=lambda: self.pool.release(cx))
+        result = CypherResult(on_more=cx.fetch, on_done=lambda: self.pool.release(cx), fetch_size=self.fetch_size)
         result.update_metadata({"connection": self.connection_data})
 
         def update_metadata_with_keys(metadata):
@@ -248,31 +436,61 @@ class BoltConnector(Connector):
         cx.fetch()
         return result
 
-    def _run_in_tx(self, statement, parameters, tx, graph, keys, entities):
+    def _run_in_tx(self, statement, parameters, tx, graph, keys, entities, pipelined):
         self._assert_valid_tx(tx)
 
         def fetch():
+            tx.send()   # flush any pipelined messages (no-op if nothing is queued)
             tx.fetch()
 
         def fail(metadata):
-            self.transactions.remove(tx)
+            from py2neo.database import GraphError, TransactionError
+            self.transactions.discard(tx)
             self.pool.release(tx)
-            self._fail(metadata)
-
-        hydrator = PackStreamHydrator(version=tx.protocol_version, graph=graph, keys=keys, entities=entities)
+            error = GraphError.hydrate(metadata)
+            # The whole transaction has now been rolled back, so the
+            # results of pipelined statements that ran before this one
+            # cannot be relied upon either
+            for earlier in self.pipelined_results.pop(tx, []):
+                if earlier is result:
+                    break
+                earlier.fail(TransactionError("Statement rolled back, as a later "
+                                              "statement in the transaction failed"))
+            result.fail(error)
+            raise error
+
+        hydrator = PackStreamHydrator(version=tx.protocol_version, graph=graph, keys=keys, entities=entities,
+                                      lazy=self.lazy_entities)
         dehydrated_parameters = hydrator.dehydrate(parameters)
-        result = CypherResult(on_more=fetch)
+        result = CypherResult(on_more=fetch, fetch_size=self.fetch_size)
         result.update_metadata({"connection": self.connection_data})
 
         def update_metadata_with_keys(metadata):
             result.update_metadata(metadata)
             hydrator.keys = result.keys()
 
-        tx.run(statement, dehydrated_parameters or {}, on_success=update_metadata_with_keys, on_failure=fail)
+        def ignore(metadata):
+            # The server skips every statement queued after one that
+            # fails, so the results of those statements must not look
+            # like empty successes. The connection is reset before the
+            # failure itself is handled, which also skips the PULL_ALL
+            # of the failed statement, but the error recorded for that
+            # statement must be the failure, not this one.
+            from py2neo.database import TransactionError
+            if not result._is_failed():
+                result.fail(TransactionError("Statement not executed, as an earlier "
+                                             "statement in the transaction failed"))
+
+        tx.run(statement, dehydrated_parameters or {}, on_success=update_metadata_with_keys, on_failure=fail,
+               on_ignored=ignore)
         tx.pull_all(on_records=lambda records: result.append_records(map(hydrator.hydrate, records)),
-                    on_success=result.update_metadata, on_failure=fail, on_summary=result.done)
-        tx.send()
-        result.keys()   # force receipt of RUN summary, to detect any errors
+                    on_success=result.update_metadata, on_failure=fail, on_ignored=ignore,
+                    on_summary=result.done)
+        if pipelined:
+            self.pipelined_results.setdefault(tx, []).append(result)
+        else:
+            tx.send()
+            result.keys()   # force receipt of RUN summary, to detect any errors
         return result
 
     @classmethod
@@ -280,11 +498,11 @@ class BoltConnector(Connector):
         from py2neo.database import GraphError
         raise GraphError.hydrate(metadata)
 
-    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
+    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None, pipelined=False):
         if tx is None:
             return self._run_1(statement, parameters, graph, keys, entities)
         else:
-            return self._run_in_tx(statement, parameters, tx, graph, keys, entities)
+            return self._run_in_tx(statement, parameters, tx, graph, keys, entities, pipelined)
 
     def begin(self):
         tx = self.pool.acquire()
@@ -297,6 +515,7 @@ class BoltConnector(Connector):
         self.transactions.remove(tx)
         tx.commit()
         tx.sync()
+        self.pipelined_results.pop(tx, None)
         self.pool.release(tx)
 
     def rollback(self, tx):
@@ -304,6 +523,7 @@ class BoltConnector(Connector):
         self.transactions.remove(tx)
         tx.rollback()
         tx.sync()
+        self.pipelined_results.pop(tx, None)
         self.pool.release(tx)
 
     def sync(self, cx):
@@ -315,78 +535,235 @@ class BoltRoutingConnector(BoltConnector):
     scheme = "bolt+routing"
 
     def open(self, cx_data):
-
-        def connector(address_, **kwargs):
-            return connect(address_, auth=cx_data["auth"], **kwargs)
-
         address = (cx_data["host"], cx_data["port"])
-        self.pool = RoutingConnectionPool(connector, address, {})
+        self.pool = BoltRoutingConnectionPool(self._connector(cx_data), address, {},
+                                              max_idle_time=self.config.get("max_idle_time"),
+                                              liveness_check_timeout=self.config.get("liveness_check_timeout"),
+                                              **self._pool_config())
+        self.pipelined_results = {}
 
 
 class HTTPConnector(Connector):
 
     scheme = "http"
 
+    #: Headers sent with every request.
     headers = None
 
+    #: Headers sent with every request that carries a JSON body.
+    json_headers = None
+
+    #: Statements queued by pipelined transactions, keyed by transaction.
+    pending = None
+
     @property
     def server_agent(self):
         r = self.pool.request(method="GET",
                               url="/db/data/",
-                              headers=dict(self.headers))
+                              headers=self.headers)
         return "Neo4j/{neo4j_version}".format(**json_loads(r.data.decode("utf-8")))
 
+    def _pool_config(self):
+        # The pool does not block when every connection is in use, as
+        # a result may hold its connection until it is fully consumed.
+        # Extra connections are opened instead and closed after use.
+        return {
+            "maxsize": self.config.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+            "block": False,
+        }
+
+    def _open_headers(self, cx_data):
+        self.headers = make_headers(basic_auth=":".join(cx_data["auth"]), keep_alive=True,
+                                    accept_encoding=True, user_agent=cx_data["user_agent"])
+        self.json_headers = dict(self.headers, **{"Content-Type": "application/json"})
+        if self.config.get("compress_requests"):
+            self.json_headers["Content-Encoding"] = "gzip"
+
     def open(self, cx_data):
-        self.pool = HTTPConnectionPool(host=cx_data["host"], port=cx_data["port"])
-        self.headers = make_headers(basic_auth=":".join(cx_data["auth"]))
+        self.pool = HTTPConnectionPool(host=cx_data["host"], port=cx_data["port"], **self._pool_config())
+        self._open_headers(cx_data)
+        self.pending = {}
 
     def close(self):
         self.pool.close()
 
-    def _post(self, url, statement=None, parameters=None):
-        if statement:
-            statements = [
-                OrderedDict([
-                    ("statement", statement),
-                    ("parameters", parameters or {}),
-                    ("resultDataContents", ["REST"]),
-                    ("includeStats", True),
-                ])
-            ]
-        else:
-            statements = []
+    def _post(self, url, statements=(), preload_content=True):
+        body = json_dumps({"statements": [
+            OrderedDict([
+                ("statement", statement),
+                ("parameters", parameters or {}),
+                ("resultDataContents", ["REST"]),
+                ("includeStats", True),
+            ])
+            for statement, parameters in statements
+        ]}, separators=(",", ":")).encode("utf-8")
+        if self.config.get("compress_requests"):
+            body = gzip_compress(body)
         return self.pool.request(method="POST",
                                  url=url,
-                                 headers=dict(self.headers, **{"Content-Type": "application/json"}),
-                                 body=json_dumps({"statements": statements}))
+                                 headers=self.json_headers,
+                                 body=body,
+                                 preload_content=preload_content)
 
     def _delete(self, url):
         return self.pool.request(method="DELETE",
                                  url=url,
-                                 headers=dict(self.headers))
+                                 headers=self.headers)
+
+    def _stream(self, r, results, tx=None):
+        """ Generator that incrementally parses a response, loading
+        records into their respective :class:`.CypherResult` and
+        yielding after each item of data. Errors reported by
+        the server are raised once the response has been consumed, and
+        every result in the request is marked as failed. If the response
+        itself cannot be read, every result not yet complete is failed
+        with the error raised.
+
+        Records are hydrated in batches, so that any information
+        missing from the response, such as the types of relationships
+        in paths, can be looked up once per batch instead of once per
+        record. Such lookups cannot be made while the response is
+        still being read, so a result that needs one is buffered from
+        that point on and hydrated only once the response has been
+        consumed and its connection released.
+
+        :param r: response object
+        :param results: list of (hydrator, result) pairs, one for each
+                        statement sent in the request
+        :param tx: transaction within which the request was made
+        """
+        errors = None
+        complete = False
+        ended = 0
+        batches = [[] for _ in results]
+        deferred = [[] for _ in results]
+
+        def load(index):
+            hydrator, result = results[index]
+            batch = batches[index]
+            if not deferred[index] and not hydrator.unknown_relationship_types(hydrator.path_relationship_ids(batch)):
+                result.append_records(hydrator.hydrate_records(batch))
+            else:
+                deferred[index].extend(batch)
+            del batch[:]
 
-    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None):
-        hydrator = JSONHydrator(version="rest", graph=graph, keys=keys, entities=entities)
-        r = self._post("/db/data/transaction/%s" % (tx or "commit"), statement, hydrator.dehydrate(parameters))
-        assert r.status == 200  # TODO: other codes
         try:
-            raw_result = hydrator.hydrate_result(r.data.decode("utf-8"))
-        except HydrationError as e:
-            from py2neo.database import GraphError  # TODO: breaks abstraction layers :(
+            for index, key, value in JSONHydrator.iter_response(r.stream(HTTP_CHUNK_SIZE)):
+                if index is None:
+                    if key == "errors":
+                        errors = value
+                    continue
+                hydrator, result = results[index]
+                batch = batches[index]
+                if key == "record":
+                    batch.append(value[hydrator.version])
+                    if len(batch) >= HTTP_HYDRATION_BATCH_SIZE:
+                        load(index)
+                elif key == "columns":
+                    hydrator.keys = value
+                    result.update_metadata({"fields": value})
+                elif key in ("plan", "stats"):
+                    result.update_metadata({key: value})
+                elif key == "end":
+                    ended += 1
+                    load(index)
+                    if not deferred[index]:
+                        result.done()
+                yield
+            complete = True
+        except Exception as error:
+            # A result left unfinished would otherwise read as an
+            # empty or truncated success
             if tx is not None:
-                self.transactions.remove(tx)
-            raise GraphError.hydrate(e.args[0])
-        else:
-            result = CypherResult({
-                "connection": self.connection_data,
-                "fields": raw_result.get("columns"),
-                "plan": raw_result.get("plan"),
-                "stats": raw_result.get("stats"),
-            })
-            hydrator.keys = result.keys()
-            result.append_records(hydrator.hydrate(record[hydrator.version]) for record in raw_result["data"])
-            result.done()
+                self.transactions.discard(tx)
+                self.pending.pop(tx, None)
+            for _, result in results[ended:]:
+                result.fail(error)
+            raise
+        finally:
+            if not complete:
+                r.close()   # unread data would otherwise corrupt the next request on this connection
+            r.release_conn()
+            try:
+                if complete and not errors:
+                    for (hydrator, result), records in zip(results, deferred):
+                        if records:
+                            result.append_records(hydrator.hydrate_records(records))
+            finally:
+                for _, result in results:
+                    if not result._is_done():
+                        result.done()
+        if errors:
+            from py2neo.database import GraphError, TransactionError  # TODO: breaks abstraction layers :(
+            if tx is not None:
+                self.transactions.discard(tx)
+                self.pending.pop(tx, None)
+            error = GraphError.hydrate(errors[0])
+            # The server returns results only for the statements that
+            # completed before the failure, and rolls back all of their
+            # work, so no result from this request can be relied upon
+            failed = min(ended, len(results) - 1)
+            for index, (_, result) in enumerate(results):
+                if index < failed:
+                    result.fail(TransactionError("Statement rolled back, as a later "
+                                                 "statement in the transaction failed"))
+                elif index == failed:
+                    result.fail(error)
+                else:
+                    result.fail(TransactionError("Statement not executed, as an earlier "
+                                                 "statement in the transaction failed"))
+            raise error
+
+    def _flush(self, tx, url):
+        """ Send all statements queued for a transaction in a single
+        request, and load the results of each into its respective
+        :class:`.CypherResult`.
+        """
+        pending = self.pending.pop(tx, [])
+        if tx in self.transactions:
+            self.pending[tx] = []
+        try:
+            r = self._post(url, [(statement, parameters) for statement, parameters, _, _ in pending],
+                           preload_content=False)
+            if r.status != 200:
+                r.read()
+                r.release_conn()
+                raise http_status_error(r.status)
+        except Exception as error:
+            # None of the queued statements can be known to have run,
+            # and the transaction cannot safely be carried on without
+            # them, so every result fails along with the transaction
+            self.transactions.discard(tx)
+            self.pending.pop(tx, None)
+            for _, _, _, result in pending:
+                result.fail(error)
+                result.done()
+            raise
+        for _ in self._stream(r, [(hydrator, result) for _, _, hydrator, result in pending], tx):
+            pass
+
+    def run(self, statement, parameters=None, tx=None, graph=None, keys=None, entities=None, pipelined=False):
+        hydrator = JSONHydrator(version="rest", graph=graph, keys=keys, entities=entities, lazy=self.lazy_entities)
+        if tx is not None and pipelined:
+            self._assert_valid_tx(tx)
+            result = CypherResult({"connection": self.connection_data}, on_more=lambda: self.sync(tx),
+                                  fetch_size=self.fetch_size)
+            self.pending[tx].append((statement, hydrator.dehydrate(parameters), hydrator, result))
             return result
+        r = self._post("/db/data/transaction/%s" % (tx or "commit"), [(statement, hydrator.dehydrate(parameters))],
+                       preload_content=False)
+        if r.status != 200:
+            r.read()
+            r.release_conn()
+            raise http_status_error(r.status)
+        result = CypherResult({"connection": self.connection_data}, on_more=lambda: next(stream, None),
+                              fetch_size=self.fetch_size)
+        stream = self._stream(r, [(hydrator, result)], tx)
+        if tx is None:
+            result.keys()   # read up to the start of the data, to detect any errors
+        else:
+            result.buffer()     # the transaction cannot be used again until the response is consumed
+        return result
 
     def begin(self):
         r = self._post("/db/data/transaction")
@@ -394,6 +771,7 @@ class HTTPConnector(Connector):
             location_path = urlsplit(r.headers["Location"]).path
             tx = location_path.rpartition("/")[-1]
             self.transactions.add(tx)
+            self.pending[tx] = []
             return tx
         else:
             raise RuntimeError("Can't begin a new transaction")
@@ -401,15 +779,18 @@ class HTTPConnector(Connector):
     def commit(self, tx):
         self._assert_valid_tx(tx)
         self.transactions.remove(tx)
-        self._post("/db/data/transaction/%s/commit" % tx)
+        self._flush(tx, "/db/data/transaction/%s/commit" % tx)
 
     def rollback(self, tx):
         self._assert_valid_tx(tx)
         self.transactions.remove(tx)
+        for _, _, _, result in self.pending.pop(tx, []):
+            result.done()
         self._delete("/db/data/transaction/%s" % tx)
 
     def sync(self, tx):
-        pass
+        if self.pending.get(tx):
+            self._flush(tx, "/db/data/transaction/%s" % tx)
 
 
 class SecureHTTPConnector(HTTPConnector):
@@ -418,5 +799,6 @@ class SecureHTTPConnector(HTTPConnector):
 
     def open(self, cx_data):
         self.pool = HTTPSConnectionPool(host=cx_data["host"], port=cx_data["port"],
-                                        cert_reqs="CERT_NONE", ca_certs=where())
-        self.headers = make_headers(basic_auth=":".join(cx_data["auth"]))
+                                        cert_reqs="CERT_NONE", ca_certs=where(), **self._pool_config())
+        self._open_headers(cx_data)
+        self.pending = {}
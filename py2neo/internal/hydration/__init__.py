@@ -28,16 +28,24 @@ from py2neo.internal.hydration.spatial import (
     hydration_functions as spatial_hydration_functions,
     dehydration_functions as spatial_dehydration_functions,
 )
+from py2neo.internal.hydration.streaming import JSONStream
 from py2neo.internal.hydration.temporal import (
     hydration_functions as temporal_hydration_functions,
     dehydration_functions as temporal_dehydration_functions,
 )
-from py2neo.matching import RelationshipMatcher
 
 
 INT64_LO = -(2 ** 63)
 INT64_HI = 2 ** 63 - 1
 
+#: Types of value that never require hydration.
+SCALAR_TYPES = frozenset([type(None), bool, float, bytes, bytearray] + list(integer_types) + list(string_types))
+
+
+#: Query used to look up the types of relationships in paths returned
+#: over HTTP, which carry only relationship URIs.
+RELATIONSHIP_TYPES_QUERY = "MATCH ()-[r]->() WHERE id(r) IN $x RETURN id(r), type(r)"
+
 
 def uri_to_id(uri):
     """ Utility function to convert entity URIs into numeric identifiers.
@@ -48,21 +56,49 @@ def uri_to_id(uri):
 
 class CypherResult(object):
     """ Buffer for a result from a Cypher query.
+
+    Records are pulled from the underlying source on demand, and only
+    once the buffer is empty. When a `fetch_size` is given, each such
+    pull reads ahead until at least that many records are buffered,
+    which reduces the number of small network reads for large results.
+
+    Note that this does not bound memory usage in every case. Results
+    on a single connection arrive in order, so if a later statement is
+    run on the same connection before an earlier result has been
+    consumed, the remainder of that earlier result is read into its
+    buffer in full.
     """
 
-    def __init__(self, metadata=None, on_more=None, on_done=None):
+    def __init__(self, metadata=None, on_more=None, on_done=None, fetch_size=None):
         self._on_more = on_more
         self._on_done = on_done
+        self._fetch_size = fetch_size or 1
         self._records = deque()
         self._metadata = metadata or {}
         self._done = False
+        self._discarding = False
+        self._record_type = None
+        self._error = None
 
     def append_records(self, records):
+        if self._discarding:
+            return
         self._records.extend(tuple(record) for record in records)
 
     def update_metadata(self, metadata):
         self._metadata.update(metadata)
 
+    def fail(self, error):
+        """ Mark this result as failed, so that `error` is raised on
+        any further attempt to read from it.
+        """
+        self._error = error
+        self._records.clear()
+
+    def _check(self):
+        if self._error is not None and not self._discarding:
+            raise self._error
+
     def done(self):
         if callable(self._on_done):
             self._on_done()
@@ -72,15 +108,60 @@ class CypherResult(object):
     def _keys(self):
         return self._metadata.get("fields")
 
+    # The methods below allow a wrapper, such as the asyncio result, to
+    # drive this buffer from outside, in place of `on_more`.
+
+    def _is_done(self):
+        return self._done
+
+    def _is_empty(self):
+        return not self._records
+
+    def _is_failed(self):
+        return self._error is not None
+
+    def _awaiting_keys(self):
+        """ Return true if more data is needed before the keys are known.
+        """
+        return not self._keys and not self._done
+
+    def _awaiting_records(self):
+        """ Return true if more records should be pulled to fill the
+        buffer up to the fetch size.
+        """
+        return len(self._records) < self._fetch_size and not self._done
+
+    def _start_discarding(self):
+        """ Drop all buffered records, as well as any that arrive later.
+        """
+        self._discarding = True
+        self._records.clear()
+
     def keys(self):
-        while not self._keys and not self._done and callable(self._on_more):
+        while self._awaiting_keys() and callable(self._on_more):
             self._on_more()
+        self._check()
         return self._keys
 
     def buffer(self):
         while not self._done:
             if callable(self._on_more):
                 self._on_more()
+        self._check()
+
+    def discard(self):
+        """ Consume the remainder of the result, discarding any
+        records that are either buffered or yet to arrive.
+        """
+        self._start_discarding()
+        self.buffer()
+
+    def _fill(self):
+        """ Pull the next batch of records from the source.
+        """
+        while self._awaiting_records():
+            if callable(self._on_more):
+                self._on_more()
 
     def summary(self):
         from py2neo.database import CypherSummary
@@ -102,26 +183,56 @@ class CypherResult(object):
         self.buffer()
         return CypherStats(**self._metadata.get("stats", {}))
 
-    def fetch(self):
-        from py2neo.data import Record
-        if self._records:
-            return Record(zip(self.keys(), self._records.popleft()))
-        elif self._done:
+    def fetch_values(self):
+        """ Fetch the values of the next record, as a tuple, or
+        :const:`None` if no more records remain.
+        """
+        if not self._records:
+            self._fill()
+            self._check()
+        try:
+            return self._records.popleft()
+        except IndexError:
             return None
+
+    def fetch_many(self, n):
+        """ Fetch the values of up to `n` records, as a list of tuples.
+        Fewer than `n` are returned only when the result is exhausted.
+        """
+        records = self._records
+        while len(records) < n and not self._done:
+            if callable(self._on_more):
+                self._on_more()
+        self._check()
+        if len(records) <= n:
+            batch = list(records)
+            records.clear()
         else:
-            while not self._records and not self._done:
-                if callable(self._on_more):
-                    self._on_more()
-            try:
-                return Record(zip(self.keys(), self._records.popleft()))
-            except IndexError:
-                return None
+            popleft = records.popleft
+            batch = [popleft() for _ in range(n)]
+        return batch
+
+    def record_type(self):
+        """ Return the :class:`.Record` subclass for records in this
+        result.
+        """
+        if self._record_type is None:
+            from py2neo.data import Record
+            self._record_type = Record.keyed(self.keys())
+        return self._record_type
+
+    def fetch(self):
+        values = self.fetch_values()
+        if values is None:
+            return None
+        return self.record_type().from_values(values)
 
 
 class Hydrator(object):
 
-    def __init__(self, graph):
+    def __init__(self, graph, lazy=False):
         self.graph = graph
+        self.lazy = lazy
 
     def hydrate(self, values):
         raise NotImplementedError()
@@ -141,6 +252,8 @@ class Hydrator(object):
                 return new_instance
 
             instance = self.graph.node_cache.update(identity, instance_constructor)
+            if properties is not None:
+                self.graph.node_cache.touch(identity)
         else:
             instance.graph = self.graph
             instance.identity = identity
@@ -150,6 +263,7 @@ class Hydrator(object):
             instance._stale.discard("properties")
             instance.clear()
             instance.update(properties)
+            instance._dirty = False
 
         if labels is not None:
             instance._stale.discard("labels")
@@ -159,6 +273,17 @@ class Hydrator(object):
 
         return instance
 
+    def hydrate_lazy_node(self, identity, labels, properties):
+        """ Return a :class:`.LazyNode` over the labels and properties
+        received for a node, unless that node is already cached, in
+        which case the cached :class:`.Node` is updated and returned.
+        """
+        instance = self.graph.node_cache.peek(identity)
+        if instance is None:
+            from py2neo.data import LazyNode
+            return LazyNode(self.graph, identity, labels, properties)
+        return self.hydrate_node(instance, identity, labels, properties)
+
     def hydrate_relationship(self, instance, identity, start, end, type=None, properties=None):
 
         if instance is None:
@@ -172,11 +297,14 @@ class Hydrator(object):
                 else:
                     new_instance = Relationship(self.hydrate_node(None, start), type,
                                                 self.hydrate_node(None, end), **properties)
+                    new_instance._dirty = False
                 new_instance.graph = self.graph
                 new_instance.identity = identity
                 return new_instance
 
             instance = self.graph.relationship_cache.update(identity, instance_constructor)
+            if properties is not None:
+                self.graph.relationship_cache.touch(identity)
         else:
             instance.graph = self.graph
             instance.identity = identity
@@ -188,6 +316,7 @@ class Hydrator(object):
             else:
                 instance.clear()
                 instance.update(properties)
+                instance._dirty = False
             self.graph.relationship_cache.update(identity, instance)
         return instance
 
@@ -201,11 +330,13 @@ class PackStreamHydrator(Hydrator):
 
     unbound_relationship = namedtuple("UnboundRelationship", ["id", "type", "properties"])
 
-    def __init__(self, version, graph, keys, entities=None):
-        super(PackStreamHydrator, self).__init__(graph)
+    def __init__(self, version, graph, keys, entities=None, lazy=False):
+        super(PackStreamHydrator, self).__init__(graph, lazy)
         self.version = version
         self.keys = keys
         self.entities = entities or {}
+        self.scalar_columns = None
+        self.all_scalar = False
         self.hydration_functions = {}
         self.dehydration_functions = {}
         if self.version >= 2:
@@ -216,15 +347,44 @@ class PackStreamHydrator(Hydrator):
 
     def hydrate(self, values):
         """ Convert PackStream values into native values.
+
+        The columns that hold scalar values, such as numbers and
+        strings, are detected from the first record of the result.
+        Values in those columns are then passed through untouched, so
+        a result made up only of scalar columns is never hydrated at
+        all. If any other value later appears in a scalar column, that
+        column is hydrated value by value from then on.
         """
-        return tuple(self.hydrate_object(value, self.entities.get(self.keys[i]))
-                     for i, value in enumerate(values))
+        scalar_columns = self.scalar_columns
+        if scalar_columns is None:
+            entities = self.entities
+            scalar_columns = self.scalar_columns = [type(value) in SCALAR_TYPES and
+                                                    not (entities and self.keys[i] in entities)
+                                                    for i, value in enumerate(values)]
+            self.all_scalar = all(scalar_columns)
+        if self.all_scalar and SCALAR_TYPES.issuperset(map(type, values)):
+            return tuple(values)
+        hydrated = []
+        for i, value in enumerate(values):
+            if scalar_columns[i]:
+                if type(value) in SCALAR_TYPES:
+                    hydrated.append(value)
+                    continue
+                scalar_columns[i] = False
+                self.all_scalar = False
+            hydrated.append(self.hydrate_object(value, self.entities.get(self.keys[i])))
+        return tuple(hydrated)
 
     def hydrate_object(self, obj, inst=None):
         if isinstance(obj, Structure):
             tag = obj.tag
             fields = obj.fields
             if tag == b"N":
+                if self.lazy and inst is None:
+                    properties = fields[2]
+                    if not SCALAR_TYPES.issuperset(map(type, properties.values())):
+                        properties = self.hydrate_object(properties)
+                    return self.hydrate_lazy_node(fields[0], fields[1], properties)
                 return self.hydrate_node(inst, fields[0], fields[1], self.hydrate_object(fields[2]))
             elif tag == b"R":
                 return self.hydrate_relationship(inst, fields[0], fields[1], fields[2], fields[3],
@@ -303,132 +463,175 @@ class PackStreamHydrator(Hydrator):
 
 class JSONHydrator(Hydrator):
 
-    unbound_relationship = namedtuple("UnboundRelationship", ["id", "type", "properties"])
-
-    def __init__(self, version, graph, keys, entities=None):
-        super(JSONHydrator, self).__init__(graph)
+    def __init__(self, version, graph, keys, entities=None, lazy=False):
+        super(JSONHydrator, self).__init__(graph, lazy)
         self.version = version
         if self.version != "rest":
             raise ValueError("Unsupported JSON version %r" % self.version)
         self.keys = keys
         self.entities = entities or {}
-        self.hydration_functions = {}
+        self.relationship_types = {}
 
-    @classmethod
-    def json_to_packstream(cls, data):
-        """ This converts from JSON format into PackStream prior to
-        proper hydration. This code needs to die horribly in a freak
-        yachting accident.
+    def hydrate(self, values):
+        """ Convert JSON values into native values.
         """
-        # TODO: other partial hydration
-        if "self" in data:
-            if "type" in data:
-                return Structure(b"R",
-                                 uri_to_id(data["self"]),
-                                 uri_to_id(data["start"]),
-                                 uri_to_id(data["end"]),
-                                 data["type"],
-                                 data["data"])
+        entities = self.entities
+        keys = self.keys
+        return tuple(self.hydrate_object(value, entities.get(keys[i])) for i, value in enumerate(values))
+
+    def hydrate_object(self, obj, inst=None):
+        """ Convert a value parsed from REST format JSON into a native
+        value, building graph entities directly from their JSON maps.
+        """
+        if isinstance(obj, dict):
+            if "self" in obj:
+                if "type" in obj:
+                    return self.hydrate_relationship(inst, uri_to_id(obj["self"]),
+                                                     uri_to_id(obj["start"]), uri_to_id(obj["end"]),
+                                                     obj["type"], obj["data"])
+                elif self.lazy and inst is None:
+                    return self.hydrate_lazy_node(uri_to_id(obj["self"]), obj["metadata"]["labels"], obj["data"])
+                else:
+                    return self.hydrate_node(inst, uri_to_id(obj["self"]),
+                                             obj["metadata"]["labels"], obj["data"])
+            elif "nodes" in obj and "relationships" in obj:
+                return self.hydrate_path(obj["nodes"], obj["relationships"], obj["directions"])
             else:
-                return Structure(b"N",
-                                 uri_to_id(data["self"]),
-                                 data["metadata"]["labels"],
-                                 data["data"])
-        elif "nodes" in data and "relationships" in data:
-            nodes = [Structure(b"N", i, None, None) for i in map(uri_to_id, data["nodes"])]
-            relps = [Structure(b"r", i, None, None) for i in map(uri_to_id, data["relationships"])]
-            seq = [i // 2 + 1 for i in range(2 * len(data["relationships"]))]
-            for i, direction in enumerate(data["directions"]):
-                if direction == "<-":
-                    seq[2 * i] *= -1
-            return Structure(b"P", nodes, relps, seq)
+                # from warnings import warn
+                # warn("Map literals returned over the Neo4j HTTP interface are ambiguous "
+                #      "and may be unintentionally hydrated as graph objects")
+                return {key: self.hydrate_object(value) for key, value in obj.items()}
+        elif isinstance(obj, list):
+            return list(map(self.hydrate_object, obj))
         else:
-            # from warnings import warn
-            # warn("Map literals returned over the Neo4j HTTP interface are ambiguous "
-            #      "and may be unintentionally hydrated as graph objects")
-            return data
+            return obj
 
-    def hydrate(self, values):
-        """ Convert JSON values into native values. This is the other half
-        of the HTTP hydration process, and is basically a copy of the
-        Bolt/PackStream hydration code. It needs to be combined with the
-        code in `json_to_packstream` so that hydration is done in a single
-        pass.
+    def hydrate_records(self, records):
+        """ Convert a batch of JSON records into native values,
+        resolving the types of all relationships in any paths with a
+        single lookup beforehand.
         """
+        self.resolve_relationship_types(self.path_relationship_ids(records))
+        return [self.hydrate(values) for values in records]
 
-        graph = self.graph
-        entities = self.entities
-        keys = self.keys
+    @classmethod
+    def path_relationship_ids(cls, records):
+        """ Return the IDs of all relationships in any paths within a
+        batch of JSON records.
+        """
+        r_ids = []
+        for values in records:
+            cls._collect_path_relationship_ids(values, r_ids)
+        return r_ids
 
-        def hydrate_object(obj, inst=None):
-            from py2neo.data import Path
-            if isinstance(obj, Structure):
-                tag = obj.tag
-                fields = obj.fields
-                if tag == b"N":
-                    return self.hydrate_node(inst, fields[0], fields[1], hydrate_object(fields[2]))
-                elif tag == b"R":
-                    return self.hydrate_relationship(inst, fields[0],
-                                                     fields[1], fields[2],
-                                                     fields[3], hydrate_object(fields[4]))
-                elif tag == b"P":
-                    # Herein lies a dirty hack to retrieve missing relationship
-                    # detail for paths received over HTTP.
-                    nodes = [hydrate_object(node) for node in fields[0]]
-                    u_rels = []
-                    typeless_u_rel_ids = []
-                    for r in fields[1]:
-                        u_rel = self.unbound_relationship(*map(hydrate_object, r))
-                        assert u_rel.type is None
-                        typeless_u_rel_ids.append(u_rel.id)
-                        u_rels.append(u_rel)
-                    if typeless_u_rel_ids:
-                        r_dict = {r.identity: r for r in RelationshipMatcher(graph).get(typeless_u_rel_ids)}
-                        for i, u_rel in enumerate(u_rels):
-                            if u_rel.type is None:
-                                u_rels[i] = self.unbound_relationship(
-                                    u_rel.id,
-                                    type(r_dict[u_rel.id]).__name__,
-                                    u_rel.properties
-                                )
-                    sequence = fields[2]
-                    last_node = nodes[0]
-                    steps = [last_node]
-                    for i, rel_index in enumerate(sequence[::2]):
-                        next_node = nodes[sequence[2 * i + 1]]
-                        if rel_index > 0:
-                            u_rel = u_rels[rel_index - 1]
-                            rel = self.hydrate_relationship(None, u_rel.id,
-                                                            last_node.identity, next_node.identity,
-                                                            u_rel.type, u_rel.properties)
-                        else:
-                            u_rel = u_rels[-rel_index - 1]
-                            rel = self.hydrate_relationship(None, u_rel.id,
-                                                            next_node.identity, last_node.identity,
-                                                            u_rel.type, u_rel.properties)
-                        steps.append(rel)
-                        # steps.append(next_node)
-                        last_node = next_node
-                    return Path(*steps)
+    @classmethod
+    def _collect_path_relationship_ids(cls, obj, r_ids):
+        if isinstance(obj, dict):
+            if "nodes" in obj and "relationships" in obj:
+                r_ids.extend(map(uri_to_id, obj["relationships"]))
+            elif "self" not in obj:
+                for value in obj.values():
+                    cls._collect_path_relationship_ids(value, r_ids)
+        elif isinstance(obj, list):
+            for value in obj:
+                cls._collect_path_relationship_ids(value, r_ids)
+
+    def unknown_relationship_types(self, r_ids):
+        """ Take the types of the given relationships from the
+        relationship cache where possible, and return the set of IDs
+        for which the type is still unknown.
+        """
+        types = self.relationship_types
+        cache = self.graph.relationship_cache
+        missing = set()
+        for r_id in r_ids:
+            if r_id not in types:
+                relationship = cache.get(r_id)
+                if relationship is None:
+                    missing.add(r_id)
                 else:
-                    try:
-                        f = self.hydration_functions[obj.tag]
-                    except KeyError:
-                        # If we don't recognise the structure type, just return it as-is
-                        return obj
-                    else:
-                        return f(*map(hydrate_object, obj.fields))
-            elif isinstance(obj, list):
-                return list(map(hydrate_object, obj))
-            elif isinstance(obj, dict):
-                return {key: hydrate_object(value) for key, value in obj.items()}
+                    types[r_id] = type(relationship).__name__
+        return missing
+
+    def resolve_relationship_types(self, r_ids):
+        """ Ensure the types of the given relationships are known,
+        taking them from the relationship cache where possible and
+        looking up the remainder from the server in a single query.
+        """
+        missing = self.unknown_relationship_types(r_ids)
+        if missing:
+            for r_id, r_type in self.lookup_relationship_types(missing):
+                self.relationship_types[r_id] = r_type
+
+    def lookup_relationship_types(self, r_ids):
+        """ Look up the types of the given relationships from the
+        server, returning an iterable of (id, type) pairs.
+        """
+        return self.graph.run(RELATIONSHIP_TYPES_QUERY, x=list(r_ids))
+
+    def hydrate_path(self, node_uris, relationship_uris, directions):
+        """ Build a :class:`.Path` from its REST format representation,
+        which carries only URIs for its nodes and relationships.
+        """
+        from py2neo.data import Path
+        nodes = [self.hydrate_node(None, uri_to_id(uri)) for uri in node_uris]
+        r_ids = [uri_to_id(uri) for uri in relationship_uris]
+        self.resolve_relationship_types(r_ids)
+        last_node = nodes[0]
+        steps = [last_node]
+        for i, r_id in enumerate(r_ids):
+            next_node = nodes[i + 1]
+            if directions[i] == "<-":
+                start, end = next_node.identity, last_node.identity
             else:
-                return obj
+                start, end = last_node.identity, next_node.identity
+            steps.append(self.hydrate_relationship(None, r_id, start, end, self.relationship_types[r_id]))
+            last_node = next_node
+        return Path(*steps)
+
+    @classmethod
+    def parse(cls, data):
+        """ Parse and partially hydrate a response from the HTTP
+        transactional endpoint.
+
+        :param data: JSON response body, either as a string or as a
+                     file-like object from which it can be read
+        """
+        if hasattr(data, "read"):
+            data = data.read()
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return json_loads(data)
 
-        return tuple(hydrate_object(value, entities.get(keys[i])) for i, value in enumerate(values))
+    @classmethod
+    def iter_response(cls, chunks):
+        """ Incrementally parse and partially hydrate a response from
+        the HTTP transactional endpoint as it arrives, yielding a
+        3-tuple of (index, key, value) for each item of data. For each
+        statement result, the index is that of the result; the key is
+        either a result field (such as ``"columns"`` or ``"stats"``),
+        ``"record"`` for each row of data, or ``"end"`` at the end of the
+        result. Top-level fields, such as ``"errors"``, are yielded with
+        an index of :const:`None`.
+
+        :param chunks: iterable of JSON response body chunks
+        """
+        stream = JSONStream(chunks)
+        for key in stream.iter_object():
+            if key == "results":
+                for index, _ in enumerate(stream.iter_array()):
+                    for result_key in stream.iter_object():
+                        if result_key == "data":
+                            for _ in stream.iter_array():
+                                yield index, "record", stream.value()
+                        else:
+                            yield index, result_key, stream.value()
+                    yield index, "end", None
+            else:
+                yield None, key, stream.value()
 
     def hydrate_result(self, data, index=0):
-        data = json_loads(data, object_hook=self.json_to_packstream)
+        data = self.parse(data)
         if data.get("errors"):
             raise HydrationError(*data["errors"])
         return data["results"][index]
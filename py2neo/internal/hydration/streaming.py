@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Incremental parsing of JSON documents that arrive in chunks, such
+as HTTP response bodies read from a socket.
+"""
+
+
+from __future__ import absolute_import
+
+from codecs import getincrementaldecoder
+from json import JSONDecoder
+from json.decoder import scanstring
+
+
+WHITESPACE = " \t\n\r"
+
+DELIMITERS = WHITESPACE + ",:]}"
+
+
+class JSONStream(object):
+    """ Reader for a JSON document that arrives as a sequence of byte
+    or text chunks. Containers can be walked one member at a time using
+    :meth:`.iter_object` and :meth:`.iter_array`, and individual values
+    decoded with :meth:`.value`, so that only the value currently being
+    decoded needs to be held in memory.
+
+    :param chunks: iterable of byte or text chunks
+    :param object_hook: function applied to each decoded JSON object
+    """
+
+    def __init__(self, chunks, object_hook=None):
+        self._chunks = iter(chunks)
+        self._decoder = JSONDecoder(object_hook=object_hook)
+        self._text_decoder = getincrementaldecoder("utf-8")()
+        self._buffer = u""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """ Read the next chunk into the buffer, discarding any data
+        already consumed. Returns :const:`False` at the end of the
+        document.
+        """
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = self._text_decoder.decode(b"", final=True)
+        else:
+            if isinstance(chunk, bytes):
+                chunk = self._text_decoder.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """ Return the next non-whitespace character without consuming it.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Expected %r at position %d of JSON chunk" % (char, self._pos))
+        self._pos += 1
+
+    def value(self):
+        """ Decode and return the next complete value.
+
+        A value that is already complete in the buffer is decoded in
+        one step. Otherwise, it is decoded piece by piece as more data
+        arrives: containers one member at a time and strings by
+        scanning forward from where the last chunk ended. So no part
+        of a value is ever decoded twice, however many chunks it
+        spans.
+        """
+        self._peek()
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except ValueError:
+            # Most likely an incomplete value, so decode it incrementally
+            if self._eof:
+                raise
+            return self._partial_value()
+        else:
+            if not self._eof and self._buffer[self._pos] not in "{[\"" and not self._ends_at(end):
+                # A number or literal may continue into the next chunk
+                return self._partial_value()
+            self._pos = end
+            return value
+
+    def _ends_at(self, end):
+        """ Return true if a number or literal decoded up to position
+        `end` of the buffer is certain to be complete.
+        """
+        return end < len(self._buffer) and self._buffer[end] in DELIMITERS
+
+    def _partial_value(self):
+        """ Decode the next value, which may span several chunks.
+        """
+        char = self._peek()
+        if char == "{":
+            obj = {}
+            for key in self.iter_object():
+                obj[key] = self.value()
+            object_hook = self._decoder.object_hook
+            return obj if object_hook is None else object_hook(obj)
+        elif char == "[":
+            return [self.value() for _ in self.iter_array()]
+        elif char == "\"":
+            return self._partial_string()
+        else:
+            # Numbers and literals are short, so simply retry each time
+            while True:
+                try:
+                    value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                except ValueError:
+                    if not self._read():
+                        raise
+                else:
+                    if not self._ends_at(end) and self._read():
+                        continue
+                    self._pos = end
+                    return value
+
+    def _partial_string(self):
+        """ Decode the next string, which may span several chunks. The
+        raw text of the string is collected chunk by chunk, and only
+        unescaped once the closing quote has been found.
+        """
+        self._pos += 1
+        parts = []
+        while True:
+            buffer = self._buffer
+            start = self._pos
+            end = buffer.find("\"", start)
+            while end != -1:
+                if self._backslashes_before(end, start) % 2 == 0:
+                    parts.append(buffer[start:end])
+                    self._pos = end + 1
+                    text, _ = scanstring(u"".join(parts) + u"\"", 0, self._decoder.strict)
+                    return text
+                end = buffer.find("\"", end + 1)
+            # Keep a trailing, unpaired backslash with the next chunk,
+            # as it escapes the character that follows
+            cut = len(buffer)
+            if self._backslashes_before(cut, start) % 2 == 1:
+                cut -= 1
+            parts.append(buffer[start:cut])
+            self._pos = cut
+            if not self._read():
+                raise ValueError("Unterminated string in JSON document")
+
+    def _backslashes_before(self, end, start):
+        """ Count the backslashes that immediately precede position
+        `end` of the buffer, looking no further back than `start`.
+        """
+        buffer = self._buffer
+        i = end
+        while i > start and buffer[i - 1] == "\\":
+            i -= 1
+        return end - i
+
+    def iter_array(self):
+        """ Step through the members of an array. The caller must
+        consume each member (for example, with :meth:`.value`) before
+        requesting the next.
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            char = self._peek()
+            self._pos += 1
+            if char == "]":
+                return
+            elif char != ",":
+                raise ValueError("Expected ',' or ']' in JSON array, found %r" % char)
+
+    def iter_object(self):
+        """ Step through the members of an object, yielding each key.
+        The caller must consume each corresponding value (for example,
+        with :meth:`.value`) before requesting the next key.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != "\"":
+                raise ValueError("Expected a key in JSON object")
+            key = self.value()
+            self._expect(":")
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            elif char != ",":
+                raise ValueError("Expected ',' or '}' in JSON object, found %r" % char)
@@ -20,8 +20,10 @@ from __future__ import absolute_import
 
 
 __all__ = [
+    "bulk_create_subgraph",
     "create_subgraph",
     "delete_subgraph",
+    "merge_relationships_by_key",
     "merge_subgraph",
     "pull_subgraph",
     "push_subgraph",
@@ -30,9 +32,19 @@ __all__ = [
 ]
 
 
+from functools import partial
+from itertools import count, islice
+from multiprocessing.pool import ThreadPool
+from warnings import warn
+
 from py2neo.cypher import cypher_escape
 
 
+#: Number of times a bulk load batch is attempted before a transient
+#: error, such as a deadlock between concurrent batches, is raised.
+BULK_ATTEMPTS = 3
+
+
 def _node_create_dict(nodes):
     """ Convert a set of :class:`.Node` objects into a dictionary of
     :class:`.Node` lists, keyed by frozenset(labels).
@@ -93,15 +105,20 @@ def _merge_nodes(tx, p_label, p_key, labels, data):
 
     :param tx:
     :param p_label:
-    :param p_key:
+    :param p_key: property key, or tuple of keys
     :param labels:
-    :param data: list of (p_value, properties)
+    :param data: list of (p_value, properties), where p_value is a
+                 list of values if p_key is a tuple
     :return:
     """
     assert isinstance(labels, frozenset)
     label_string = ":".join(cypher_escape(label) for label in sorted(labels))
-    cypher = "UNWIND $x AS data MERGE (_:%s {%s:data[0]}) SET _:%s SET _ = data[1] RETURN id(_)" % (
-        cypher_escape(p_label), cypher_escape(p_key), label_string)
+    if isinstance(p_key, tuple):
+        key_string = ", ".join("%s:data[0][%d]" % (cypher_escape(key), i) for i, key in enumerate(p_key))
+    else:
+        key_string = "%s:data[0]" % cypher_escape(p_key)
+    cypher = "UNWIND $x AS data MERGE (_:%s {%s}) SET _:%s SET _ = data[1] RETURN id(_)" % (
+        cypher_escape(p_label), key_string, label_string)
     for record in tx.run(cypher, x=data):
         yield record[0]
 
@@ -122,34 +139,101 @@ def _merge_relationships(tx, r_type, data):
         yield record[0]
 
 
-def create_subgraph(tx, subgraph):
+def _batches(items, batch_size):
+    """ Split a sequence of items into consecutive lists of at most
+    *batch_size* items each. If no batch size is given, all items are
+    returned as a single batch. Iterators are consumed one batch at a
+    time.
+
+    :param items: list or other iterable of items
+    :param batch_size: maximum number of items per batch, or :const:`None`
+    :return: iterator of lists
+    """
+    if batch_size is None:
+        if not isinstance(items, list):
+            items = list(items)
+        if items:
+            yield items
+        return
+    if batch_size < 1:
+        raise ValueError("Batch size must be a positive integer")
+    if isinstance(items, list):
+        for i in range(0, len(items), batch_size):
+            yield items[i:i + batch_size]
+    else:
+        iterator = iter(items)
+        batch = list(islice(iterator, batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(iterator, batch_size))
+
+
+class _Checkpointer(object):
+    """ Callable invoked before each batch is sent, which commits the
+    enclosing transaction after every *commit_every* batches.
+    """
+
+    def __init__(self, tx, commit_every=None):
+        if commit_every is not None and commit_every < 1:
+            raise ValueError("Commit interval must be a positive integer")
+        self.tx = tx
+        self.commit_every = commit_every
+        self.count = 0
+
+    def __call__(self):
+        if self.commit_every and self.count and self.count % self.commit_every == 0:
+            self.tx._checkpoint()
+        self.count += 1
+
+
+def _bind_nodes(graph, nodes, identities, labels):
+    for node, identity in zip(nodes, identities):
+        node.graph = graph
+        node.identity = identity
+        node._remote_labels = labels
+        node._dirty = False
+        graph.node_cache.update(identity, node)
+
+
+def _bind_relationships(graph, relationships, identities):
+    for relationship, identity in zip(relationships, identities):
+        relationship.graph = graph
+        relationship.identity = identity
+        relationship._dirty = False
+        graph.relationship_cache.update(identity, relationship)
+
+
+def _create_relationships(tx, subgraph, batch_size, checkpoint):
+    graph = tx.graph
+    for r_type, relationships in _rel_create_dict(r for r in subgraph.relationships if r.graph is None).items():
+        for batch in _batches(relationships, batch_size):
+            checkpoint()
+            identities = _merge_relationships(tx, r_type, list(map(
+                lambda r: [r.start_node.identity, r.end_node.identity, dict(r)], batch)))
+            _bind_relationships(graph, batch, identities)
+
+
+def create_subgraph(tx, subgraph, batch_size=None, commit_every=None):
     """ Create new data in a remote :class:`.Graph` from a local
     :class:`.Subgraph`.
 
     :param tx:
     :param subgraph:
+    :param batch_size: maximum number of entities to send per query
+    :param commit_every: number of batches after which to commit
     :return:
     """
     graph = tx.graph
+    checkpoint = _Checkpointer(tx, commit_every)
     for labels, nodes in _node_create_dict(n for n in subgraph.nodes if n.graph is None).items():
-        identities = _create_nodes(tx, labels, list(map(dict, nodes)))
-        for i, identity in enumerate(identities):
-            node = nodes[i]
-            node.graph = graph
-            node.identity = identity
-            node._remote_labels = labels
-            graph.node_cache.update(identity, node)
-    for r_type, relationships in _rel_create_dict(r for r in subgraph.relationships if r.graph is None).items():
-        identities = _merge_relationships(tx, r_type, list(map(
-            lambda r: [r.start_node.identity, r.end_node.identity, dict(r)], relationships)))
-        for i, identity in enumerate(identities):
-            relationship = relationships[i]
-            relationship.graph = graph
-            relationship.identity = identity
-            graph.relationship_cache.update(identity, relationship)
+        for batch in _batches(nodes, batch_size):
+            checkpoint()
+            identities = _create_nodes(tx, labels, list(map(dict, batch)))
+            _bind_nodes(graph, batch, identities, labels)
+    _create_relationships(tx, subgraph, batch_size, checkpoint)
 
 
-def merge_subgraph(tx, subgraph, p_label, p_key):
+def merge_subgraph(tx, subgraph, p_label, p_key, batch_size=None, commit_every=None):
     """ Merge data into a remote :class:`.Graph` from a local
     :class:`.Subgraph`.
 
@@ -157,27 +241,146 @@ def merge_subgraph(tx, subgraph, p_label, p_key):
     :param subgraph:
     :param p_label:
     :param p_key:
+    :param batch_size: maximum number of entities to send per query
+    :param commit_every: number of batches after which to commit
     :return:
     """
     graph = tx.graph
+    checkpoint = _Checkpointer(tx, commit_every)
     for (pl, pk, labels), nodes in _node_merge_dict(p_label, p_key, (n for n in subgraph.nodes if n.graph is None)).items():
         if pl is None or pk is None:
             raise ValueError("Primary label and primary key are required for MERGE operation")
-        identities = _merge_nodes(tx, pl, pk, labels, list(map(lambda n: [n.get(pk), dict(n)], nodes)))
-        for i, identity in enumerate(identities):
-            node = nodes[i]
-            node.graph = graph
-            node.identity = identity
-            node._remote_labels = labels
-            graph.node_cache.update(identity, node)
-    for r_type, relationships in _rel_create_dict(r for r in subgraph.relationships if r.graph is None).items():
-        identities = _merge_relationships(tx, r_type, list(map(
-            lambda r: [r.start_node.identity, r.end_node.identity, dict(r)], relationships)))
-        for i, identity in enumerate(identities):
-            relationship = relationships[i]
-            relationship.graph = graph
-            relationship.identity = identity
-            graph.relationship_cache.update(identity, relationship)
+        for batch in _batches(nodes, batch_size):
+            checkpoint()
+            if isinstance(pk, tuple):
+                data = [[[n.get(k) for k in pk], dict(n)] for n in batch]
+            else:
+                data = [[n.get(pk), dict(n)] for n in batch]
+            identities = _merge_nodes(tx, pl, pk, labels, data)
+            _bind_nodes(graph, batch, identities, labels)
+    _create_relationships(tx, subgraph, batch_size, checkpoint)
+
+
+def _endpoint_matches(graph, start_node_key, end_node_key):
+    """ Build a MATCH clause for each end of a relationship, selecting
+    nodes by label and property value. An index hint is added where the
+    schema has an index for that label and property; otherwise a
+    warning is issued, as each row will require a label scan.
+    """
+    indexes = {}
+    clauses = []
+    for index, (name, (label, key)) in enumerate([("a", start_node_key), ("b", end_node_key)]):
+        clause = "MATCH (%s:%s {%s:data[%d]})" % (name, cypher_escape(label), cypher_escape(key), index)
+        if label not in indexes:
+            indexes[label] = graph.schema.get_indexes(label)
+        if (key,) in indexes[label]:
+            clause += " USING INDEX %s:%s(%s)" % (name, cypher_escape(label), cypher_escape(key))
+        elif index == 0 or (label, key) != tuple(start_node_key):
+            warn("No index exists for :%s(%s), so relationship endpoints will be "
+                 "matched by label scan" % (label, key))
+        clauses.append(clause)
+    return clauses
+
+
+def merge_relationships_by_key(tx, r_type, data, start_node_key, end_node_key=None,
+                               merge=True, batch_size=None, commit_every=None):
+    """ Create or merge relationships between existing remote nodes,
+    identifying each endpoint by label and property value instead of by
+    internal node ID.
+
+    :param tx:
+    :param r_type: relationship type
+    :param data: iterable of (start_value, end_value, properties)
+    :param start_node_key: (label, key) tuple identifying start nodes
+    :param end_node_key: (label, key) tuple identifying end nodes;
+                         defaults to `start_node_key`
+    :param merge: use MERGE instead of CREATE
+    :param batch_size: maximum number of relationships to send per query
+    :param commit_every: number of batches after which to commit
+    :return: number of relationships created or merged
+    """
+    if end_node_key is None:
+        end_node_key = start_node_key
+    cypher = "\n".join([
+        "UNWIND $x AS data",
+    ] + _endpoint_matches(tx.graph, start_node_key, end_node_key) + [
+        "%s (a)-[_:%s]->(b) SET _ = data[2]" % ("MERGE" if merge else "CREATE", cypher_escape(r_type)),
+        "RETURN count(_)",
+    ])
+    checkpoint = _Checkpointer(tx, commit_every)
+    total = 0
+    for batch in _batches(data, batch_size):
+        checkpoint()
+        total += tx.evaluate(cypher, x=[[start, end, dict(properties)] for start, end, properties in batch])
+    return total
+
+
+def _run_bulk_batch(job):
+    """ Run a single bulk load batch in a transaction of its own,
+    retrying if the server reports a transient error.
+
+    :param job: tuple of (graph, function, batch, key, data function)
+    :return: tuple of (batch, key, identities)
+    """
+    from py2neo.database import TransientError
+    graph, run, batch, key, data = job
+    for attempt in count(1):
+        try:
+            with graph.begin() as tx:
+                identities = list(run(tx, key, data(batch)))
+        except TransientError:
+            if attempt >= BULK_ATTEMPTS:
+                raise
+        else:
+            return batch, key, identities
+
+
+def _run_bulk_jobs(pool, jobs, bind):
+    for batch, key, identities in pool.imap_unordered(_run_bulk_batch, jobs):
+        bind(batch, key, identities)
+
+
+def bulk_create_subgraph(graph, subgraph, workers, batch_size):
+    """ Create new data in a remote :class:`.Graph` from a local
+    :class:`.Subgraph`, running batches concurrently in separate
+    transactions.
+
+    :param graph:
+    :param subgraph:
+    :param workers: number of batches to run at once
+    :param batch_size: maximum number of entities to send per query
+    :return:
+    """
+    if workers < 1:
+        raise ValueError("Number of workers must be a positive integer")
+
+    def node_data(batch):
+        return list(map(dict, batch))
+
+    def relationship_data(batch):
+        return list(map(lambda r: [r.start_node.identity, r.end_node.identity, dict(r)], batch))
+
+    def bind_nodes(batch, labels, identities):
+        _bind_nodes(graph, batch, identities, labels)
+
+    def bind_relationships(batch, r_type, identities):
+        _bind_relationships(graph, batch, identities)
+
+    node_jobs = [(graph, _create_nodes, batch, labels, node_data)
+                 for labels, nodes in _node_create_dict(n for n in subgraph.nodes if n.graph is None).items()
+                 for batch in _batches(nodes, batch_size)]
+    pool = ThreadPool(workers)
+    try:
+        _run_bulk_jobs(pool, node_jobs, bind_nodes)
+        # Relationships can only be created once all of their nodes exist
+        relationship_jobs = [(graph, _merge_relationships, batch, r_type, relationship_data)
+                             for r_type, relationships in _rel_create_dict(r for r in subgraph.relationships
+                                                                           if r.graph is None).items()
+                             for batch in _batches(relationships, batch_size)]
+        _run_bulk_jobs(pool, relationship_jobs, bind_relationships)
+    finally:
+        pool.terminate()
+        pool.join()
 
 
 def delete_subgraph(tx, subgraph):
@@ -223,60 +426,116 @@ def separate_subgraph(tx, subgraph):
     list(tx.run("MATCH ()-[_]->() WHERE id(_) IN $x DELETE _", x=relationship_identities))
 
 
-def pull_subgraph(tx, subgraph):
+def pull_subgraph(tx, subgraph, batch_size=None):
     """ Copy data from a remote :class:`.Graph` into a local
-    :class:`.Subgraph`.
+    :class:`.Subgraph`. All nodes are fetched with one query, and all
+    relationships with another, and the results are hydrated into the
+    existing local entities.
 
     :param tx:
     :param subgraph:
+    :param batch_size: maximum number of entities to fetch per query
     :return:
     """
+    from py2neo.internal.hydration import Hydrator
     graph = tx.graph
-    nodes = {node: None for node in subgraph.nodes}
-    relationships = list(subgraph.relationships)
+    hydrator = Hydrator(graph)
+    nodes = {node.identity: node for node in subgraph.nodes if node.graph is graph}
+    relationships = {r.identity: r for r in subgraph.relationships if r.graph is graph}
+    node_cursors = [tx.run("UNWIND $x AS id MATCH (_) WHERE id(_) = id RETURN _", x=batch)
+                    for batch in _batches(list(nodes), batch_size)]
+    relationship_cursors = [tx.run("UNWIND $x AS id MATCH ()-[_]->() WHERE id(_) = id RETURN _", x=batch)
+                            for batch in _batches(list(relationships), batch_size)]
+    for cursor in node_cursors:
+        for remote, in cursor:
+            # The remote node may be the local node itself, if it was
+            # found in the cache, so copy its labels and properties first
+            hydrator.hydrate_node(nodes[remote.identity], remote.identity,
+                                  frozenset(remote.labels), dict(remote))
+    for cursor in relationship_cursors:
+        for remote, in cursor:
+            hydrator.hydrate_relationship(relationships[remote.identity], remote.identity,
+                                          remote.start_node.identity, remote.end_node.identity,
+                                          type(remote).__name__, dict(remote))
+
+
+def _node_push_dict(graph, nodes):
+    """ Select the bound nodes that have changed locally and group them
+    by the changes required: whether properties need to be replaced and
+    which labels need to be removed and added.
+
+    :param graph:
+    :param nodes:
+    :return: dict of (dirty, frozenset(old_labels), frozenset(new_labels))
+             to list(nodes)
+    """
+    d = {}
     for node in nodes:
         if node.graph is graph:
-            tx.entities.append({"_": node})
-            cursor = tx.run("MATCH (_) WHERE id(_) = {x} RETURN _, labels(_)", x=node.identity)
-            nodes[node] = cursor
-    for relationship in relationships:
-        if relationship.graph is graph:
-            tx.entities.append({"_": relationship})
-            list(tx.run("MATCH ()-[_]->() WHERE id(_) = {x} RETURN _", x=relationship.identity))
-    for node, cursor in nodes.items():
-        new_labels = cursor.evaluate(1)
-        if new_labels:
-            node._remote_labels = frozenset(new_labels)
-            labels = node._labels
-            labels.clear()
-            labels.update(new_labels)
+            old_labels = node._remote_labels - node._labels
+            new_labels = frozenset(node._labels - node._remote_labels)
+            dirty = node._is_dirty()
+            if dirty or old_labels or new_labels:
+                key = (dirty, old_labels, new_labels)
+                d.setdefault(key, []).append(node)
+    return d
 
 
-def push_subgraph(tx, subgraph):
+def push_subgraph(tx, subgraph, batch_size=None):
     """ Copy data into a remote :class:`.Graph` from a local
-    :class:`.Subgraph`.
+    :class:`.Subgraph`. Only entities that have changed since they were
+    last created, pulled or pushed are sent, except that those holding
+    list values are always sent, as those lists may have been changed
+    in place.
 
     :param tx:
     :param subgraph:
+    :param batch_size: maximum number of entities to send per query
     :return:
     """
     graph = tx.graph
-    for node in subgraph.nodes:
-        if node.graph is graph:
-            clauses = ["MATCH (_) WHERE id(_) = {x}", "SET _ = {y}"]
-            parameters = {"x": node.identity, "y": dict(node)}
-            old_labels = node._remote_labels - node._labels
-            if old_labels:
-                clauses.append("REMOVE _:%s" % ":".join(map(cypher_escape, old_labels)))
-            new_labels = node._labels - node._remote_labels
-            if new_labels:
-                clauses.append("SET _:%s" % ":".join(map(cypher_escape, new_labels)))
-            tx.run("\n".join(clauses), parameters)
-    for relationship in subgraph.relationships:
-        if relationship.graph is graph:
-            clauses = ["MATCH ()-[_]->() WHERE id(_) = {x}", "SET _ = {y}"]
-            parameters = {"x": relationship.identity, "y": dict(relationship)}
-            tx.run("\n".join(clauses), parameters)
+    for (dirty, old_labels, new_labels), nodes in _node_push_dict(graph, subgraph.nodes).items():
+        clauses = ["UNWIND $x AS data", "MATCH (_) WHERE id(_) = data[0]"]
+        if dirty:
+            clauses.append("SET _ = data[1]")
+        if old_labels:
+            clauses.append("REMOVE _:%s" % ":".join(map(cypher_escape, sorted(old_labels))))
+        if new_labels:
+            clauses.append("SET _:%s" % ":".join(map(cypher_escape, sorted(new_labels))))
+        cypher = "\n".join(clauses)
+        for batch in _batches(nodes, batch_size):
+            properties = [dict(node) if dirty else None for node in batch]
+            tx.run(cypher, x=[[node.identity, p] for node, p in zip(batch, properties)])
+            tx._on_commit(partial(_clean_nodes, batch, properties, [frozenset(node._labels) for node in batch]))
+    relationships = [r for r in subgraph.relationships if r.graph is graph and r._is_dirty()]
+    cypher = "UNWIND $x AS data MATCH ()-[_]->() WHERE id(_) = data[0] SET _ = data[1]"
+    for batch in _batches(relationships, batch_size):
+        properties = [dict(relationship) for relationship in batch]
+        tx.run(cypher, x=[[relationship.identity, p] for relationship, p in zip(batch, properties)])
+        tx._on_commit(partial(_clean_relationships, batch, properties))
+
+
+def _clean_nodes(nodes, properties, labels):
+    """ Mark pushed nodes as matching their remote counterparts, once
+    the transaction that pushed them has been committed. The labels and
+    properties recorded are those that were pushed, so that changes
+    made after the push, but before the commit, are still sent the
+    next time the node is pushed.
+    """
+    for node, pushed_properties, remote_labels in zip(nodes, properties, labels):
+        node._remote_labels = remote_labels
+        if pushed_properties is not None and dict(node) == pushed_properties:
+            node._dirty = False
+
+
+def _clean_relationships(relationships, properties):
+    """ Mark pushed relationships as matching their remote counterparts,
+    once the transaction that pushed them has been committed, unless
+    they have been changed again since the push.
+    """
+    for relationship, pushed_properties in zip(relationships, properties):
+        if dict(relationship) == pushed_properties:
+            relationship._dirty = False
 
 
 def subgraph_exists(tx, subgraph):
@@ -213,13 +213,26 @@ class NodeMatcher(object):
         If no such :class:`.Node` is found, py:const:`None` is returned
         instead. Contrast with `matcher[1234]` which raises a `KeyError`
         if no entity is found.
+
+        Current nodes are taken from the node cache of the graph. Any
+        others, including those that have expired or been invalidated,
+        are fetched (and refreshed) with a single query.
         """
         t = type(identity)
         if issubclass(t, (list, tuple, set, frozenset)):
-            missing = [i for i in identity if i not in self.graph.node_cache]
+            cache = self.graph.node_cache
+            found = {}
+            for i in identity:
+                entity = cache.get(i)
+                if entity is not None:
+                    found[i] = entity
+            missing = [i for i in identity if i not in found]
             if missing:
-                list(self.match().where("id(_) in %s" % cypher_repr(missing)))
-            return t(self.graph.node_cache.get(i) for i in identity)
+                # Iterate rather than call list(), which would also
+                # run a count query through __len__
+                for entity in self.match().where("id(_) in %s" % cypher_repr(missing)):
+                    found[entity.identity] = entity
+            return t(found.get(i) for i in identity)
         else:
             try:
                 return self.graph.node_cache[identity]
@@ -470,13 +483,27 @@ class RelationshipMatcher(object):
         If no such :class:`.Relationship` is found, py:const:`None` is returned
         instead. Contrast with `matcher[1234]` which raises a `KeyError`
         if no entity is found.
+
+        Current relationships are taken from the relationship cache of
+        the graph. Any others, including those that have expired or
+        been invalidated, are fetched (and refreshed) with a single
+        query.
         """
         t = type(identity)
         if issubclass(t, (list, tuple, set, frozenset)):
-            missing = [i for i in identity if i not in self.graph.relationship_cache]
+            cache = self.graph.relationship_cache
+            found = {}
+            for i in identity:
+                entity = cache.get(i)
+                if entity is not None:
+                    found[i] = entity
+            missing = [i for i in identity if i not in found]
             if missing:
-                list(self.match().where("id(_) in %s" % cypher_repr(missing)))
-            return t(self.graph.relationship_cache.get(i) for i in identity)
+                # Iterate rather than call list(), which would also
+                # run a count query through __len__
+                for entity in self.match().where("id(_) in %s" % cypher_repr(missing)):
+                    found[entity.identity] = entity
+            return t(found.get(i) for i in identity)
         else:
             try:
                 return self.graph.relationship_cache[identity]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Benchmark for the construction, key lookup and memory usage of
+records fetched from a result.
+
+This is not part of the test suite, and needs no server. Run it from
+the root of the repository, once on each revision to be compared::
+
+    python -m test.benchmark.records
+
+Memory usage is only measured where :mod:`tracemalloc` is available.
+"""
+
+
+from timeit import default_timer as timer
+
+try:
+    from tracemalloc import start as start_tracing, stop as stop_tracing, get_traced_memory
+except ImportError:
+    start_tracing = None
+
+from py2neo.internal.hydration import CypherResult
+
+
+LARGE_RECORD_COUNT = 1000000
+WIDE_RECORD_WIDTH = 20
+KEYS = ["x%d" % i for i in range(WIDE_RECORD_WIDTH)]
+
+
+def make_result():
+    values = tuple(range(WIDE_RECORD_WIDTH))
+    result = CypherResult({"fields": KEYS})
+    result.append_records(values for _ in range(LARGE_RECORD_COUNT))
+    result.done()
+    return result
+
+
+def fetch_all(result):
+    records = []
+    fetch = result.fetch
+    record = fetch()
+    while record is not None:
+        records.append(record)
+        record = fetch()
+    return records
+
+
+def main():
+    result = make_result()
+    t0 = timer()
+    records = fetch_all(result)
+    t1 = timer()
+    print("Built %d records of width %d at %.0f records/second" % (
+        len(records), WIDE_RECORD_WIDTH, len(records) / (t1 - t0)))
+    last_key = KEYS[-1]
+    t0 = timer()
+    total = sum(record[last_key] for record in records)
+    t1 = timer()
+    assert total == (WIDE_RECORD_WIDTH - 1) * LARGE_RECORD_COUNT
+    print("Looked up %d values by key at %.0f lookups/second" % (len(records), len(records) / (t1 - t0)))
+    del records
+    if start_tracing is not None:
+        result = make_result()
+        start_tracing()
+        try:
+            records = fetch_all(result)
+            current, _ = get_traced_memory()
+        finally:
+            stop_tracing()
+        print("Holding %d records of width %d uses %.1f MB (%.0f bytes/record)" % (
+            len(records), WIDE_RECORD_WIDTH, current / 1e6, float(current) / len(records)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Benchmark for the hydration of REST format JSON into entities.
+
+This is not part of the test suite, and needs no server. Run it from
+the root of the repository, once on each revision to be compared::
+
+    python -m test.benchmark.rest_hydration
+"""
+
+
+from json import dumps as json_dumps
+from timeit import default_timer as timer
+
+from py2neo import Graph
+from py2neo.internal.hydration import JSONHydrator
+
+
+RECORD_COUNT = 20000
+
+
+def rest_node(identity):
+    return {
+        "self": "http://localhost:7474/db/data/node/%d" % identity,
+        "metadata": {"id": identity, "labels": ["Person"]},
+        "data": {"name": "Person %d" % identity, "age": identity % 100},
+    }
+
+
+def rest_relationship(identity, start, end):
+    return {
+        "self": "http://localhost:7474/db/data/relationship/%d" % identity,
+        "start": "http://localhost:7474/db/data/node/%d" % start,
+        "end": "http://localhost:7474/db/data/node/%d" % end,
+        "type": "KNOWS",
+        "metadata": {"id": identity, "type": "KNOWS"},
+        "data": {"since": 1999},
+    }
+
+
+def rest_body(count):
+    return json_dumps({
+        "results": [{
+            "columns": ["a", "r", "b", "n"],
+            "data": [{"rest": [rest_node(2 * i), rest_relationship(i, 2 * i, 2 * i + 1), rest_node(2 * i + 1), i],
+                      "meta": [None, None, None, None]} for i in range(count)],
+        }],
+        "errors": [],
+    }).encode("utf-8")
+
+
+def hydrate_all(graph, body, chunk_size=65536):
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=[])
+    records = []
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    for _, key, value in JSONHydrator.iter_response(chunks):
+        if key == "columns":
+            hydrator.keys = value
+        elif key == "record":
+            records.append(hydrator.hydrate(value["rest"]))
+    return records
+
+
+def main(repeat=5):
+    body = rest_body(RECORD_COUNT)
+    graph = Graph("http://localhost:7474")
+    best = None
+    for _ in range(repeat):
+        graph.node_cache.clear()
+        graph.relationship_cache.clear()
+        t0 = timer()
+        records = hydrate_all(graph, body)
+        t1 = timer()
+        assert len(records) == RECORD_COUNT
+        if best is None or t1 - t0 < best:
+            best = t1 - t0
+    print("Hydrated %d REST records at %.0f records/second" % (RECORD_COUNT, RECORD_COUNT / best))
+
+
+if __name__ == "__main__":
+    main()
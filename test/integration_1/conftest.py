@@ -18,6 +18,7 @@
 
 from os import getenv
 from socket import create_connection
+from sys import version_info
 from uuid import uuid4
 
 from pytest import fixture
@@ -44,6 +45,9 @@ NEO4J_PASSWORD = "password"
 NEO4J_DEBUG = getenv("NEO4J_DEBUG", "")
 NEO4J_PROCESS = {}
 
+# The asyncio tests use syntax only available in Python 3.5 and above
+collect_ignore = [] if version_info >= (3, 5) else ["test_aio.py"]
+
 
 def is_server_running():
     host = NEO4J_HOST
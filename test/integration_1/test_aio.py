@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from asyncio import gather, get_event_loop
+
+from pytest import fixture, raises
+
+from py2neo import ClientError, Node
+from py2neo.aio import AsyncGraph
+
+
+@fixture()
+def async_graph(uri):
+    g = AsyncGraph(uri)
+    yield g
+    g.close()
+
+
+def run(coroutine):
+    return get_event_loop().run_until_complete(coroutine)
+
+
+def test_can_run_and_iterate(async_graph):
+
+    async def f():
+        cursor = await async_graph.run("UNWIND range(1, 3) AS n RETURN n")
+        assert cursor.keys() == ["n"]
+        values = []
+        async for record in cursor:
+            values.append(record["n"])
+        return values
+
+    assert run(f()) == [1, 2, 3]
+
+
+def test_can_evaluate(async_graph):
+    assert run(async_graph.evaluate("RETURN $x", x=1)) == 1
+
+
+def test_can_run_concurrent_queries(async_graph):
+
+    async def f():
+        return await gather(*[async_graph.evaluate("RETURN $x", x=i) for i in range(20)])
+
+    assert run(f()) == list(range(20))
+
+
+def test_entities_are_bound_to_blocking_graph(async_graph, graph):
+    assert async_graph.graph == graph
+    node = run(async_graph.evaluate("CREATE (a:Person {name:'Alice'}) RETURN a"))
+    assert isinstance(node, Node)
+    assert node.graph == graph
+    assert graph.exists(node)
+
+
+def test_can_commit_transaction(async_graph, graph):
+
+    async def f():
+        async with await async_graph.begin() as tx:
+            return await tx.evaluate("CREATE (a) RETURN id(a)")
+
+    identity = run(f())
+    assert graph.nodes.get(identity) is not None
+
+
+def test_can_rollback_transaction(async_graph, graph):
+
+    async def f():
+        tx = await async_graph.begin()
+        identity = await tx.evaluate("CREATE (a) RETURN id(a)")
+        await tx.rollback()
+        return identity
+
+    identity = run(f())
+    assert graph.evaluate("MATCH (a) WHERE id(a) = $x RETURN count(a)", x=identity) == 0
+
+
+def test_stats_available(async_graph):
+
+    async def f():
+        cursor = await async_graph.run("CREATE (a:Banana)")
+        return await cursor.stats()
+
+    stats = run(f())
+    assert stats["nodes_created"] == 1
+
+
+def test_syntax_error_is_raised(async_graph):
+    with raises(ClientError) as e:
+        run(async_graph.run("X"))
+    assert e.value.code == "Neo.ClientError.Statement.SyntaxError"
+    assert run(async_graph.evaluate("RETURN 1")) == 1
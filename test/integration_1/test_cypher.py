@@ -16,6 +16,11 @@
 # limitations under the License.
 
 
+from pytest import raises
+
+from py2neo import ClientError
+
+
 def test_simple_evaluation(graph):
     value = graph.evaluate("RETURN 1")
     assert value == 1
@@ -46,3 +51,26 @@ def test_can_run_cypher_while_in_transaction(graph):
     created = record[0]
     assert outer_result_list == [(1,), (2,), (3,), (4,), (5,), (6,), (7,), (8,), (9,), (10,)]
     assert graph.exists(created)
+
+
+def test_can_run_multiple_statements_in_pipelined_transaction(graph):
+    tx = graph.begin(pipelined=True)
+    cursors = [tx.run("RETURN $x", x=i) for i in range(10)]
+    values = [cursor.evaluate() for cursor in cursors]
+    tx.commit()
+    assert values == list(range(10))
+
+
+def test_pipelined_transaction_writes_are_committed(graph):
+    tx = graph.begin(pipelined=True)
+    cursor = tx.run("CREATE (a) RETURN id(a)")
+    tx.commit()
+    assert graph.nodes.get(cursor.evaluate()) is not None
+
+
+def test_pipelined_transaction_errors_are_raised_on_result_access(graph):
+    tx = graph.begin(pipelined=True)
+    cursor = tx.run("X")
+    with raises(ClientError) as e:
+        cursor.keys()
+    assert e.value.code == "Neo.ClientError.Statement.SyntaxError"
@@ -101,7 +101,7 @@ def test_get_non_existent_node_by_id(graph):
     assert graph.nodes.get(node_id) is None
 
 
-def test_node_cache_is_thread_local(graph):
+def test_node_cache_is_shared_between_threads(graph):
     from threading import Thread
     node = Node()
     graph.create(node)
@@ -116,7 +116,7 @@ def test_node_cache_is_thread_local(graph):
     thread.join()
 
     assert node.identity in graph.node_cache
-    assert node.identity not in other_cache_keys
+    assert node.identity in other_cache_keys
 
 
 def test_graph_repr(graph):
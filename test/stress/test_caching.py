@@ -19,7 +19,7 @@
 from platform import python_implementation
 from unittest import TestCase, skipIf
 
-from py2neo.internal.caching import ThreadLocalEntityCache
+from py2neo.internal.caching import EntityCache
 
 
 IMPLEMENTATION = python_implementation()
@@ -35,33 +35,33 @@ class EntityCacheTestCase(TestCase):
 
     def test_update_with_value_constructor_where_key_does_not_exist(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
 
         # When
         key = "X"
         value = cache.update(key, Entity)
 
         # Then a new value should have been created, inserted and extracted
-        assert key in cache._dict
+        assert key in cache
         assert isinstance(value, Entity)
 
     def test_update_with_value_constructor_where_key_already_exists(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
         old_value = Entity()
-        cache._dict[key] = old_value
+        cache.update(key, old_value)
 
         # When
         value = cache.update(key, Entity)
 
         # Then the old value should be extracted
-        assert key in cache._dict
+        assert key in cache
         assert value is old_value
 
     def test_update_with_value_where_key_does_not_exist(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
 
         # When
@@ -69,61 +69,134 @@ class EntityCacheTestCase(TestCase):
         value = cache.update(key, new_value)
 
         # Then the new value should have been inserted
-        assert key in cache._dict
+        assert key in cache
         assert value is new_value
 
     def test_update_with_value_where_key_already_exists(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
         old_value = Entity()
-        cache._dict[key] = old_value
+        cache.update(key, old_value)
 
         # When
         new_value = Entity()
         value = cache.update(key, new_value)
 
         # Then the old value should have been replaced by the new value
-        assert key in cache._dict
+        assert key in cache
         assert value is new_value
 
     def test_update_with_none_where_key_does_not_exist(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
 
         # When
         cache.update(key, None)
 
         # Then the key should still not exist in the cache
-        assert key not in cache._dict
+        assert key not in cache
 
     def test_update_with_none_where_key_already_exists(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
         value = Entity()
-        cache._dict[key] = value
+        cache.update(key, value)
 
         # When
         cache.update(key, None)
 
         # Then the key should no longer exist in the cache
-        assert key not in cache._dict
+        assert key not in cache
+
+    @skipIf(IMPLEMENTATION == "PyPy", "Test not supported in PyPy yet")
+    def test_recently_used_values_are_retained_up_to_capacity(self):
+        # Given
+        cache = EntityCache(capacity=2, stripes=1)
+        cache.update("A", Entity)
+        cache.update("B", Entity)
+
+        # When
+        cache.get("A")
+        cache.update("C", Entity)
+
+        # Then the least recently used value should have been evicted
+        assert "A" in cache
+        assert "B" not in cache
+        assert "C" in cache
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["retained"] == 2
+
+    @skipIf(IMPLEMENTATION == "PyPy", "Test not supported in PyPy yet")
+    def test_invalidated_values_are_retained(self):
+        from gc import collect
+        from weakref import ref
+
+        # Given
+        cache = EntityCache(capacity=2, stripes=1)
+        value = ref(cache.update("X", Entity))
+
+        # When
+        cache.invalidate(["X"])
+        missed = cache.get("X")
+        collect()
+
+        # Then the value should be returned again when refreshed
+        assert missed is None
+        assert "X" not in cache
+        assert value() is not None
+        assert cache.update("X", Entity) is value()
+        cache.touch("X")
+        assert cache.get("X") is value()
+
+    def test_hits_and_misses_are_counted(self):
+        # Given
+        cache = EntityCache()
+        value = cache.update("X", Entity)
+
+        # When
+        cache.get("X")
+        cache.get("Y")
+        cache.update("X", Entity)
+
+        # Then
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 2
+        assert stats["cached"] == 1
+        assert cache["X"] is value
+
+    def test_values_are_shared_between_threads(self):
+        from threading import Thread
+
+        # Given
+        cache = EntityCache()
+        value = cache.update("X", Entity)
+        found = []
+
+        # When
+        thread = Thread(target=lambda: found.append(cache.get("X")))
+        thread.start()
+        thread.join()
+
+        # Then
+        assert found == [value]
 
     @skipIf(IMPLEMENTATION == "PyPy", "Test not supported in PyPy yet")
     def test_implicit_removal_by_value_deletion(self):
         # Given
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
         key = "X"
         value = Entity()
-        cache._dict[key] = value
+        cache.update(key, value)
 
         # When
         del value
 
         # Then the key should no longer exist in the cache
-        assert key not in cache._dict
+        assert key not in cache
 
     @skipIf(IMPLEMENTATION == "PyPy", "Test not supported in PyPy yet")
     def test_threaded_usage(self):
@@ -131,7 +204,7 @@ class EntityCacheTestCase(TestCase):
         from threading import Event, Lock, Thread
         from time import time
 
-        cache = ThreadLocalEntityCache()
+        cache = EntityCache()
 
         keys = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
         values = []
@@ -186,9 +259,10 @@ class EntityCacheTestCase(TestCase):
 
             def assert_integrity(self):
                 with values_lock:
-                    with cache.lock:
-                        for key, value in cache._dict.items():
-                            assert key in keys
+                    for key in cache.keys():
+                        assert key in keys
+                        value = cache.get(key)
+                        if value is not None:
                             assert value in values
 
             actions = [merge_random_key_and_new_value, merge_random_key_and_new_value,
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from io import BytesIO
+from unittest import TestCase
+
+from py2neo.data import Table
+
+
+ROW_COUNT = 1000000
+
+
+class SeparatedValuesExportTestCase(TestCase):
+
+    def setUp(self):
+        self.table = Table(((i, 1.5 * i, "Person %d" % i, i % 2 == 0, None) for i in range(ROW_COUNT)),
+                           keys=["id", "score", "name", "even", "nothing"])
+
+    def test_csv_export_of_many_rows(self):
+        out = BytesIO()
+        count = self.table.write_csv(out, header=True)
+        assert count == ROW_COUNT
+        lines = out.getvalue().split(b"\r\n")
+        assert lines[:3] == [b"id,score,name,even,nothing", b"0,0.0,Person 0,true,", b"1,1.5,Person 1,false,"]
+        assert lines[-2:] == [b"%d,%.1f,Person %d,false," % (ROW_COUNT - 1, 1.5 * (ROW_COUNT - 1), ROW_COUNT - 1), b""]
+        assert len(lines) == ROW_COUNT + 2
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from json import dumps as json_dumps
+from sys import getsizeof
+from unittest import TestCase
+
+from neobolt.packstream import Structure
+
+from py2neo import Graph, Node, Relationship
+from py2neo.data import LazyNode
+from py2neo.internal.hydration import CypherResult, JSONHydrator, PackStreamHydrator
+from py2neo.internal.hydration.streaming import JSONStream
+
+
+RECORD_COUNT = 20000
+WIDE_RECORD_COUNT = 100000
+WIDE_RECORD_WIDTH = 20
+LARGE_RECORD_COUNT = 1000000
+LARGE_VALUE_SIZE = 4000000
+SMALL_CHUNK_SIZE = 4096
+
+
+def rest_node(identity):
+    return {
+        "self": "http://localhost:7474/db/data/node/%d" % identity,
+        "metadata": {"id": identity, "labels": ["Person"]},
+        "data": {"name": "Person %d" % identity, "age": identity % 100},
+    }
+
+
+def rest_relationship(identity, start, end):
+    return {
+        "self": "http://localhost:7474/db/data/relationship/%d" % identity,
+        "start": "http://localhost:7474/db/data/node/%d" % start,
+        "end": "http://localhost:7474/db/data/node/%d" % end,
+        "type": "KNOWS",
+        "metadata": {"id": identity, "type": "KNOWS"},
+        "data": {"since": 1999},
+    }
+
+
+def rest_body(count):
+    return json_dumps({
+        "results": [{
+            "columns": ["a", "r", "b", "n"],
+            "data": [{"rest": [rest_node(2 * i), rest_relationship(i, 2 * i, 2 * i + 1), rest_node(2 * i + 1), i],
+                      "meta": [None, None, None, None]} for i in range(count)],
+        }],
+        "errors": [],
+    }).encode("utf-8")
+
+
+def hydrate_all(graph, body, chunk_size=65536):
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=[])
+    records = []
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    for _, key, value in JSONHydrator.iter_response(chunks):
+        if key == "columns":
+            hydrator.keys = value
+        elif key == "record":
+            records.append(hydrator.hydrate(value["rest"]))
+    return records
+
+
+class JSONHydrationTestCase(TestCase):
+
+    def setUp(self):
+        self.graph = Graph("http://localhost:7474")
+        self.graph.node_cache.clear()
+        self.graph.relationship_cache.clear()
+
+    def test_rest_entity_hydration_of_many_records(self):
+        body = rest_body(RECORD_COUNT)
+        records = hydrate_all(self.graph, body)
+        assert len(records) == RECORD_COUNT
+        a, r, b, n = records[-1]
+        assert isinstance(a, Node) and isinstance(b, Node)
+        assert isinstance(r, Relationship)
+        assert r.start_node is a and r.end_node is b
+        assert type(r).__name__ == "KNOWS"
+        assert a["name"] == "Person %d" % (2 * n)
+        again = hydrate_all(self.graph, body)
+        assert all(x is y for record, other in zip(records, again) for x, y in zip(record[:3], other[:3]))
+
+
+class JSONStreamTestCase(TestCase):
+
+    def decode_in_small_chunks(self, value):
+        """ Decode a document holding a single large value from small
+        chunks, returning the value and the number of characters that
+        the underlying decoder was asked to scan.
+        """
+        body = json_dumps([value]).encode("utf-8")
+        stream = JSONStream(body[i:i + SMALL_CHUNK_SIZE] for i in range(0, len(body), SMALL_CHUNK_SIZE))
+        raw_decode = stream._decoder.raw_decode
+        scanned = [0]
+
+        def counting_raw_decode(s, idx=0):
+            try:
+                decoded, end = raw_decode(s, idx)
+            except ValueError:
+                scanned[0] += len(s) - idx
+                raise
+            else:
+                scanned[0] += end - idx
+                return decoded, end
+
+        stream._decoder.raw_decode = counting_raw_decode
+        values = [stream.value() for _ in stream.iter_array()]
+        assert len(values) == 1
+        return values[0], scanned[0], len(body)
+
+    def test_large_string_is_scanned_once(self):
+        value = u"x\\\"y" * (LARGE_VALUE_SIZE // 4)
+        decoded, scanned, size = self.decode_in_small_chunks(value)
+        assert decoded == value
+        assert scanned <= 2 * size
+
+    def test_large_array_is_scanned_once(self):
+        value = list(range(LARGE_VALUE_SIZE // 10))
+        decoded, scanned, size = self.decode_in_small_chunks(value)
+        assert decoded == value
+        assert scanned <= 2 * size
+
+    def test_large_object_is_scanned_once(self):
+        value = {"k%d" % i: {"v": [i, "s"]} for i in range(LARGE_VALUE_SIZE // 40)}
+        decoded, scanned, size = self.decode_in_small_chunks(value)
+        assert decoded == value
+        assert scanned <= 2 * size
+
+
+class PackStreamHydrationTestCase(TestCase):
+
+    def setUp(self):
+        self.graph = Graph("http://localhost:7474")
+
+    def test_wide_scalar_hydration(self):
+        keys = ["x%d" % i for i in range(WIDE_RECORD_WIDTH)]
+        records = [[i, 1.5 * i, "s%d" % i, True, None] * (WIDE_RECORD_WIDTH // 5) for i in range(WIDE_RECORD_COUNT)]
+        hydrator = PackStreamHydrator(version=2, graph=self.graph, keys=keys)
+        hydrated = list(map(hydrator.hydrate, records))
+        assert len(hydrated) == WIDE_RECORD_COUNT
+        assert all(type(values) is tuple for values in hydrated)
+        assert hydrated == list(map(tuple, records))
+
+    def test_lazy_and_eager_node_hydration_agree(self):
+        records = [[Structure(b"N", i, ["Person"], {"name": "Person %d" % i, "age": i % 100})]
+                   for i in range(RECORD_COUNT)]
+        self.graph.node_cache.clear()
+        eager = list(map(PackStreamHydrator(version=2, graph=self.graph, keys=["n"]).hydrate, records))
+        self.graph.node_cache.clear()
+        lazy = list(map(PackStreamHydrator(version=2, graph=self.graph, keys=["n"], lazy=True).hydrate, records))
+        assert all(isinstance(n, Node) for n, in eager)
+        assert all(isinstance(n, LazyNode) for n, in lazy)
+        assert len(self.graph.node_cache) == 0
+        assert [n["name"] for n, in lazy] == [n["name"] for n, in eager]
+        assert lazy == eager
+
+
+class RecordStressTestCase(TestCase):
+
+    keys = ["x%d" % i for i in range(WIDE_RECORD_WIDTH)]
+
+    def make_result(self):
+        values = tuple(range(WIDE_RECORD_WIDTH))
+        result = CypherResult({"fields": self.keys})
+        result.append_records(values for _ in range(LARGE_RECORD_COUNT))
+        result.done()
+        return result
+
+    def fetch_all(self, result):
+        records = []
+        fetch = result.fetch
+        record = fetch()
+        while record is not None:
+            records.append(record)
+            record = fetch()
+        return records
+
+    def test_records_share_one_key_index(self):
+        records = self.fetch_all(self.make_result())
+        assert len(records) == LARGE_RECORD_COUNT
+        assert len(set(map(type, records))) == 1
+        assert records[0].keys() == self.keys
+        assert sum(record["x19"] for record in records) == 19 * LARGE_RECORD_COUNT
+
+    def test_records_are_no_larger_than_their_values(self):
+        records = self.fetch_all(self.make_result())
+        assert not hasattr(records[-1], "__dict__")
+        assert getsizeof(records[-1]) == getsizeof(tuple(records[-1]))
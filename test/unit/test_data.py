@@ -19,7 +19,9 @@
 from io import StringIO
 from unittest import TestCase
 
-from py2neo.data import Table, Subgraph, Walkable, Node, Relationship, PropertyDict, Path, walk
+from pickle import dumps, loads
+
+from py2neo.data import Table, TableStream, Subgraph, Walkable, Node, Relationship, PropertyDict, Path, Record, walk
 
 
 KNOWS = Relationship.type("KNOWS")
@@ -348,6 +350,187 @@ class DataListTestCase(TestCase):
                                          u'Carol\t55\r\n'
                                          u'Dave\t66\r\n')
 
+    def test_write_csv_with_quoting(self):
+        table = Table([
+            [u'say "hi"', [1, 2]],
+            [u"a\r\nb", None],
+        ], keys=["text", "list"])
+        out = StringIO()
+        table.write_csv(out)
+        self.assertEqual(out.getvalue(), u'"say ""hi""","[1, 2]"\r\n'
+                                         u'"a\r\nb",\r\n')
+
+    def test_write_csv_with_booleans(self):
+        table = Table([
+            [True, 1.5],
+            [None, 2],
+            [False, None],
+        ], keys=["flag", "number"])
+        out = StringIO()
+        table.write_csv(out, header=True)
+        self.assertEqual(out.getvalue(), u'flag,number\r\n'
+                                         u'true,1.5\r\n'
+                                         u',2\r\n'
+                                         u'false,\r\n')
+
+    def test_write_csv_to_binary_file(self):
+        from io import BytesIO
+        table = Table([
+            [u"Zo\u00eb", 33],
+        ], keys=["name", "age"])
+        out = BytesIO()
+        table.write_csv(out, header=True)
+        self.assertEqual(out.getvalue(), u'name,age\r\nZo\u00eb,33\r\n'.encode("utf-8"))
+        self.assertFalse(out.closed)
+
+    def test_fast_csv_matches_styled_output(self):
+        table = Table([
+            [u"Alice", 33, True, [u"x", 1]],
+            [u"Bob, Jr", None, False, {u"a": 1}],
+            [b"Carol", 55.5, None, None],
+        ], keys=["name", "age", "flag", "other"])
+        fast = StringIO()
+        table.write_csv(fast, header=True)
+        styled = StringIO()
+        table.write_csv(styled, header={"bold": False})
+        self.assertEqual(fast.getvalue(), styled.getvalue())
+
+    def test_fast_csv_matches_styled_output_for_single_empty_values(self):
+        table = Table([
+            [None],
+            [u""],
+            [u"Alice"],
+        ], keys=["name"])
+        fast = StringIO()
+        table.write_csv(fast, header=True)
+        styled = StringIO()
+        table.write_csv(styled, header={"bold": False})
+        self.assertEqual(fast.getvalue(), u'name\r\n""\r\n""\r\nAlice\r\n')
+        self.assertEqual(styled.getvalue(), fast.getvalue())
+
+
+class TableStreamTestCase(TestCase):
+
+    records = [
+        ["Alice", 33],
+        ["Bob", 44],
+        ["Carol", None],
+        ["Dave", 66.5],
+    ]
+
+    def test_requires_keys(self):
+        with self.assertRaises(ValueError):
+            _ = TableStream(iter(self.records))
+
+    def test_reads_one_window_at_a_time(self):
+        source = iter(self.records)
+        stream = TableStream(source, keys=["name", "age"], window_size=3)
+        self.assertEqual(stream.field("age")["type"], int)
+        self.assertEqual(len(list(source)), 1)
+
+    def test_field_metadata_is_refined_by_later_windows(self):
+        stream = TableStream(self.records, keys=["name", "age"], window_size=2)
+        self.assertEqual(stream.field("age"), {"type": int, "numeric": True, "optional": False})
+        pages = list(stream.pages())
+        self.assertEqual([len(page) for page in pages], [2, 2])
+        self.assertEqual(pages[0].field(1)["type"], int)
+        field = stream.field(1)
+        self.assertEqual(set(field["type"]), {int, float})
+        self.assertTrue(field["numeric"])
+        self.assertTrue(field["optional"])
+
+    def test_pages_from_cursor(self):
+        from py2neo.database import Cursor
+        from py2neo.internal.hydration import CypherResult
+        result = CypherResult({"fields": ["name", "age"]})
+        result.append_records(map(tuple, self.records))
+        result.done()
+        pages = list(TableStream(Cursor(result), window_size=3).pages())
+        self.assertEqual(pages, [[("Alice", 33), ("Bob", 44), ("Carol", None)], [("Dave", 66.5)]])
+        self.assertEqual(pages[0].keys(), ["name", "age"])
+
+    def test_write_matches_table_within_one_window(self):
+        expected = StringIO()
+        Table(self.records, keys=["name", "age"]).write(expected, header=True)
+        out = StringIO()
+        count = TableStream(self.records, keys=["name", "age"], window_size=4).write(out, header=True)
+        self.assertEqual(count, 4)
+        self.assertEqual(out.getvalue(), expected.getvalue())
+
+    def test_write_widens_columns_for_later_windows(self):
+        out = StringIO()
+        TableStream([["a"], ["bbb"]], keys=["x"], window_size=1).write(out)
+        self.assertEqual(out.getvalue(), u' a \r\n'
+                                         u' bbb \r\n')
+
+    def test_write_with_skip_and_limit(self):
+        out = StringIO()
+        count = TableStream(self.records, keys=["name", "age"], window_size=1).write_csv(out, skip=1, limit=2)
+        self.assertEqual(count, 2)
+        self.assertEqual(out.getvalue(), u'Bob,44\r\n'
+                                         u'Carol,\r\n')
+
+    def test_write_csv_with_header_once(self):
+        out = StringIO()
+        TableStream(self.records, keys=["name", "age"], window_size=2).write_csv(out, header=True)
+        self.assertEqual(out.getvalue(), u'name,age\r\n'
+                                         u'Alice,33\r\n'
+                                         u'Bob,44\r\n'
+                                         u'Carol,\r\n'
+                                         u'Dave,66.5\r\n')
+
+    def test_write_tsv(self):
+        out = StringIO()
+        TableStream(self.records[:2], keys=["name", "age"], window_size=1).write_tsv(out)
+        self.assertEqual(out.getvalue(), u'Alice\t33\r\n'
+                                         u'Bob\t44\r\n')
+
+    def test_write_html(self):
+        out = StringIO()
+        TableStream(self.records[:2], keys=["name", "age"], window_size=1).write_html(out, header=True)
+        self.assertEqual(out.getvalue(), u'<table>'
+                                         u'<tr><th>name</th><th>age</th></tr>'
+                                         u'<tr><td style="text-align:left">Alice</td>'
+                                         u'<td style="text-align:right">33</td></tr>'
+                                         u'<tr><td style="text-align:left">Bob</td>'
+                                         u'<td style="text-align:right">44</td></tr>'
+                                         u'</table>')
+
+
+class RecordTestCase(TestCase):
+
+    def test_access_by_key_and_index(self):
+        record = Record(zip(["name", "age"], ["Alice", 33]))
+        self.assertEqual(record["name"], "Alice")
+        self.assertEqual(record[1], 33)
+        self.assertEqual(record.get("age"), 33)
+        self.assertIsNone(record.get("height"))
+        with self.assertRaises(KeyError):
+            _ = record["height"]
+        with self.assertRaises(IndexError):
+            _ = record[2]
+
+    def test_records_with_same_keys_share_type(self):
+        record_type = Record.keyed(["name", "age"])
+        record_1 = record_type.from_values(("Alice", 33))
+        record_2 = Record(zip(["name", "age"], ["Bob", 44]))
+        self.assertIs(type(record_1), type(record_2))
+        self.assertIsInstance(record_1, Record)
+        self.assertEqual(record_1.keys(), ["name", "age"])
+        self.assertEqual(record_1, Record(zip(["name", "age"], ["Alice", 33])))
+
+    def test_records_do_not_carry_instance_dictionaries(self):
+        record = Record(zip(["name"], ["Alice"]))
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_slice(self):
+        record = Record(zip(["a", "b", "c"], [1, 2, 3]))
+        self.assertEqual(record[1:], Record(zip(["b", "c"], [2, 3])))
+
+    def test_pickle(self):
+        record = Record(zip(["name", "age"], ["Alice", 33]))
+        self.assertEqual(loads(dumps(record)), record)
+
 
 class NodeCastTestCase(TestCase):
 
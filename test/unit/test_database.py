@@ -14,3 +14,436 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+
+
+from array import array
+
+from pytest import importorskip, mark, raises
+
+from py2neo.database import Cursor
+from py2neo.internal.hydration import CypherResult
+
+
+def make_cursor(keys, records):
+    result = CypherResult({"fields": keys})
+    result.append_records(records)
+    result.done()
+    return Cursor(result)
+
+
+def test_to_columns_packs_numeric_columns():
+    cursor = make_cursor(["n", "x", "s"], [(1, 0.5, "a"), (2, 1.5, "b"), (3, 2.5, "c")])
+    columns = cursor.to_columns()
+    assert list(columns) == ["n", "x", "s"]
+    assert isinstance(columns["n"], array) and list(columns["n"]) == [1, 2, 3]
+    assert isinstance(columns["x"], array) and list(columns["x"]) == [0.5, 1.5, 2.5]
+    assert columns["s"] == ["a", "b", "c"]
+
+
+def test_to_columns_reverts_to_list_for_mixed_values():
+    cursor = make_cursor(["n"], [(1,), (None,), (True,), (2 ** 70,)])
+    assert cursor.to_columns() == {"n": [1, None, True, 2 ** 70]}
+
+
+def test_to_columns_selects_fields():
+    cursor = make_cursor(["a", "b"], [(1, "x"), (2, "y")])
+    assert cursor.to_columns(["b", 0]) == {"b": ["x", "y"], "a": array("q", [1, 2])}
+
+
+def test_to_ndarray_builds_array_from_columns():
+    numpy = importorskip("numpy")
+    cursor = make_cursor(["a", "b"], [(1, 2.5), (3, 4.5)])
+    a = cursor.to_ndarray()
+    assert a.dtype == numpy.float64
+    assert a.tolist() == [[1.0, 2.5], [3.0, 4.5]]
+
+
+def test_to_ndarray_with_non_numeric_columns():
+    importorskip("numpy")
+    cursor = make_cursor(["a", "b"], [(1, "x"), (2, "y")])
+    assert cursor.to_ndarray(dtype=object).tolist() == [[1, "x"], [2, "y"]]
+
+
+def test_to_data_frame_builds_frame_from_columns():
+    importorskip("pandas")
+    cursor = make_cursor(["name", "born"], [("Alice", 1970), ("Bob", 1980)])
+    df = cursor.to_data_frame()
+    assert list(df.columns) == ["name", "born"]
+    assert df["born"].tolist() == [1970, 1980]
+    assert df["name"].tolist() == ["Alice", "Bob"]
+
+
+def test_to_series_extracts_one_field():
+    importorskip("pandas")
+    cursor = make_cursor(["name", "born"], [("Alice", 1970), ("Bob", 1980)])
+    assert cursor.to_series("born").tolist() == [1970, 1980]
+
+
+def test_to_arrow_builds_table_in_batches():
+    importorskip("pyarrow")
+    cursor = make_cursor(["n", "s"], [(i, "x%d" % i) for i in range(10)])
+    table = cursor.to_arrow(batch_size=3)
+    assert table.column_names == ["n", "s"]
+    assert table.num_rows == 10
+    assert len(table.column("n").chunks) == 4
+    assert table.column("n").to_pylist() == list(range(10))
+
+
+def test_to_arrow_flattens_nodes_and_relationships():
+    importorskip("pyarrow")
+    from py2neo import Node, Relationship
+    a = Node("Person", name="Alice")
+    a.identity = 1
+    b = Node("Person", name="Bob")
+    b.identity = 2
+    ab = Relationship(a, "KNOWS", b, since=1999)
+    ab.identity = 7
+    table = make_cursor(["a", "r"], [(a, ab)]).to_arrow()
+    assert table.column("a").to_pylist() == [{"id": 1, "labels": ["Person"], "properties": {"name": "Alice"}}]
+    assert table.column("r").to_pylist() == [{"id": 7, "type": "KNOWS", "start": 1, "end": 2,
+                                             "properties": {"since": 1999}}]
+
+
+def test_to_arrow_with_schema():
+    pyarrow = importorskip("pyarrow")
+    schema = pyarrow.schema([pyarrow.field("n", pyarrow.float64())])
+    table = make_cursor(["n"], [(1,), (2,)]).to_arrow(schema=schema)
+    assert table.schema == schema
+
+
+def test_write_parquet(tmpdir):
+    importorskip("pyarrow")
+    from pyarrow.parquet import read_table
+    path = str(tmpdir.join("result.parquet"))
+    cursor = make_cursor(["n", "s"], [(i, "x%d" % i) for i in range(10)])
+    assert cursor.write_parquet(path, batch_size=4) == 10
+    table = read_table(path)
+    assert table.column("n").to_pylist() == list(range(10))
+    assert table.column("s").to_pylist() == ["x%d" % i for i in range(10)]
+
+
+def test_to_arrow_keeps_properties_first_seen_in_later_batches():
+    importorskip("pyarrow")
+    from py2neo import Node
+    a = Node("Person", name="Alice")
+    a.identity = 1
+    b = Node("Person", name="Bob", email="bob@example.com")
+    b.identity = 2
+    table = make_cursor(["n"], [(a,), (b,)]).to_arrow(batch_size=1)
+    assert table.column("n").to_pylist() == [
+        {"id": 1, "labels": ["Person"], "properties": {"name": "Alice", "email": None}},
+        {"id": 2, "labels": ["Person"], "properties": {"name": "Bob", "email": "bob@example.com"}},
+    ]
+
+
+def test_to_arrow_with_column_that_is_null_first():
+    importorskip("pyarrow")
+    table = make_cursor(["n"], [(None,), (None,), (3,)]).to_arrow(batch_size=2)
+    assert str(table.schema.field("n").type) == "int64"
+    assert table.column("n").to_pylist() == [None, None, 3]
+
+
+def test_write_parquet_with_values_that_differ_between_batches(tmpdir):
+    importorskip("pyarrow")
+    from pyarrow.parquet import read_table
+    from py2neo import Node
+    a = Node("Person", name="Alice")
+    a.identity = 1
+    b = Node("Person", name="Bob", age=44)
+    b.identity = 2
+    path = str(tmpdir.join("result.parquet"))
+    cursor = make_cursor(["n", "x"], [(a, None), (b, 7)])
+    assert cursor.write_parquet(path, batch_size=1, infer_from_all=True) == 2
+    table = read_table(path)
+    assert [n["properties"] for n in table.column("n").to_pylist()] == [
+        {"name": "Alice", "age": None},
+        {"name": "Bob", "age": 44},
+    ]
+    assert table.column("x").to_pylist() == [None, 7]
+
+
+def test_write_parquet_streams_with_schema_of_first_batch(tmpdir):
+    importorskip("pyarrow")
+    from pyarrow.parquet import read_table
+    path = str(tmpdir.join("result.parquet"))
+    cursor = make_cursor(["n"], [(1,), (None,), (3,)])
+    assert cursor.write_parquet(path, batch_size=1) == 3
+    table = read_table(path)
+    assert str(table.schema.field("n").type) == "int64"
+    assert table.column("n").to_pylist() == [1, None, 3]
+
+
+def test_write_parquet_streaming_rejects_properties_first_seen_in_later_batches(tmpdir):
+    importorskip("pyarrow")
+    from py2neo import Node
+    a = Node("Person", name="Alice")
+    a.identity = 1
+    b = Node("Person", name="Bob", age=44)
+    b.identity = 2
+    path = str(tmpdir.join("result.parquet"))
+    cursor = make_cursor(["n"], [(a,), (b,)])
+    with raises(TypeError):
+        cursor.write_parquet(path, batch_size=1)
+
+
+def test_write_parquet_streaming_fills_properties_missing_from_later_batches(tmpdir):
+    importorskip("pyarrow")
+    from pyarrow.parquet import read_table
+    from py2neo import Node
+    a = Node("Person", name="Alice", age=33)
+    a.identity = 1
+    b = Node("Person", name="Bob")
+    b.identity = 2
+    path = str(tmpdir.join("result.parquet"))
+    assert make_cursor(["n"], [(a,), (b,)]).write_parquet(path, batch_size=1) == 2
+    table = read_table(path)
+    assert [n["properties"] for n in table.column("n").to_pylist()] == [
+        {"name": "Alice", "age": 33},
+        {"name": "Bob", "age": None},
+    ]
+
+
+def test_to_arrow_merges_nested_null_and_numeric_types():
+    importorskip("pyarrow")
+    from py2neo import Node
+    a = Node("Person", name=None, score=1)
+    a.identity = 1
+    b = Node("Person", name="Bob", score=2.5)
+    b.identity = 2
+    table = make_cursor(["n"], [(a,), (b,)]).to_arrow(batch_size=1)
+    properties = table.schema.field("n").type["properties"].type
+    assert str(properties["name"].type) == "string"
+    assert str(properties["score"].type) == "double"
+    assert [n["properties"] for n in table.column("n").to_pylist()] == [
+        {"name": None, "score": 1.0},
+        {"name": "Bob", "score": 2.5},
+    ]
+
+
+def test_fetch_many_returns_records():
+    cursor = make_cursor(["n"], [(i,) for i in range(5)])
+    batch = cursor.fetch_many(3)
+    assert [record["n"] for record in batch] == [0, 1, 2]
+    assert cursor.current["n"] == 2
+    assert cursor.fetch_many(3, tuples=True) == [(3,), (4,)]
+    assert cursor.fetch_many(3) == []
+
+
+def test_iter_batches():
+    cursor = make_cursor(["n"], [(i,) for i in range(5)])
+    assert list(cursor.iter_batches(2, tuples=True)) == [[(0,), (1,)], [(2,), (3,)], [(4,)]]
+
+
+def test_fetch_many_pulls_more_records_as_required():
+    remaining = [[(i,)] for i in range(5)]
+    result = CypherResult({"fields": ["n"]})
+
+    def more():
+        if remaining:
+            result.append_records(remaining.pop(0))
+        else:
+            result.done()
+
+    result._on_more = more
+    cursor = Cursor(result)
+    assert cursor.fetch_many(4, tuples=True) == [(0,), (1,), (2,), (3,)]
+    assert cursor.fetch_many(4, tuples=True) == [(4,)]
+
+
+def test_graphs_have_separate_entity_caches():
+    from py2neo import Graph, Node
+    graph_1 = Graph("http://server-1:7474")
+    graph_2 = Graph("http://server-2:7474")
+    node = Node()
+    graph_1.node_cache.update(1, node)
+    assert 1 in graph_1.node_cache
+    assert 1 not in graph_2.node_cache
+
+
+def test_lru_cache_policy():
+    from py2neo import Graph
+    from py2neo.internal.caching import EntityCache
+    graph = Graph("http://localhost:7474", cache_policy="lru", cache_capacity=100)
+    assert isinstance(graph.node_cache, EntityCache)
+    assert graph.node_cache.capacity == 100
+    assert graph.node_cache.ttl is None
+
+
+def test_ttl_cache_policy():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474", cache_policy="ttl", cache_ttl=5)
+    assert graph.relationship_cache.ttl == 5
+
+
+def test_none_cache_policy():
+    from py2neo import Graph
+    from py2neo.internal.caching import NullEntityCache
+    graph = Graph("http://localhost:7474", cache_policy="none")
+    assert isinstance(graph.node_cache, NullEntityCache)
+
+
+def test_custom_cache_policy():
+    from py2neo import Graph
+    from py2neo.internal.caching import NullEntityCache
+    graph = Graph("http://localhost:7474", cache_policy=lambda capacity, ttl: NullEntityCache())
+    assert isinstance(graph.node_cache, NullEntityCache)
+
+
+def test_unknown_cache_policy():
+    from pytest import raises
+    from py2neo import Graph
+    with raises(ValueError):
+        _ = Graph("http://localhost:7474", cache_policy="sometimes")
+
+
+def test_graph_is_shared_when_cache_settings_agree():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474", cache_policy="lru", cache_capacity=100)
+    assert Graph("http://localhost:7474") is graph
+    assert Graph("http://localhost:7474", cache_policy="lru") is graph
+    assert Graph("http://localhost:7474", cache_capacity=100, cache_ttl=60) is graph
+
+
+def test_conflicting_cache_settings_are_rejected():
+    from pytest import raises
+    from py2neo import Graph
+    Graph("http://localhost:7474")
+    with raises(ValueError):
+        _ = Graph("http://localhost:7474", cache_policy="lru")
+    with raises(ValueError):
+        _ = Graph("http://localhost:7474", cache_capacity=100)
+    with raises(ValueError):
+        _ = Graph("http://localhost:7474", cache_ttl=5)
+
+
+def test_graph_is_shared_when_connector_settings_agree():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474", max_connections=5, fetch_size=100)
+    assert Graph("http://localhost:7474") is graph
+    assert Graph("http://localhost:7474", max_connections=5, max_lifetime=3600) is graph
+    assert graph.database.connector.config["max_connections"] == 5
+
+
+@mark.parametrize("settings", [{"max_connections": 5}, {"acquire_timeout": 1}, {"max_idle_time": 30},
+                               {"max_lifetime": 60}, {"liveness_check_timeout": 10}, {"fetch_size": 100}])
+def test_conflicting_connector_settings_are_rejected(settings):
+    from py2neo import Graph
+    Graph("http://localhost:7474")
+    with raises(ValueError):
+        _ = Graph("http://localhost:7474", **settings)
+
+
+def test_expired_entities_are_reused_when_rehydrated():
+    from time import sleep
+    from py2neo import Graph
+    from py2neo.internal.hydration import PackStreamHydrator
+    graph = Graph("http://localhost:7474", cache_policy="ttl", cache_ttl=0.05)
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=[])
+    node = hydrator.hydrate_node(None, 1, ["Person"], {"name": "Alice"})
+    assert graph.node_cache.get(1) is node
+    sleep(0.1)
+    assert 1 not in graph.node_cache
+    assert graph.node_cache.get(1) is None
+    again = hydrator.hydrate_node(None, 1, ["Person"], {"name": "Alicia"})
+    assert again is node
+    assert graph.node_cache.get(1) is node
+    assert node["name"] == "Alicia"
+
+
+@mark.parametrize("policy", ["weak", "lru", "ttl", "none"])
+def test_nodes_can_be_fetched_by_id_under_every_cache_policy(policy):
+    from neobolt.packstream import Structure
+    from py2neo import Graph
+    from py2neo.internal.hydration import PackStreamHydrator
+    graph = Graph("http://localhost:7474", cache_policy=policy)
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["_"])
+    queries = []
+
+    def run(cypher, parameters=None):
+        queries.append(cypher)
+        return [hydrator.hydrate([Structure(b"N", 1, ["Person"], {"name": "Alice"})]),
+                hydrator.hydrate([Structure(b"N", 2, ["Person"], {"name": "Bob"})])]
+
+    graph.run = run
+    nodes = graph.nodes.get([2, 3, 1])
+    assert nodes[1] is None
+    assert [nodes[0]["name"], nodes[2]["name"]] == ["Bob", "Alice"]
+    assert [nodes[0].identity, nodes[2].identity] == [2, 1]
+    assert len(queries) == 1
+
+
+@mark.parametrize("policy", ["weak", "lru", "ttl", "none"])
+def test_relationships_can_be_fetched_by_id_under_every_cache_policy(policy):
+    from neobolt.packstream import Structure
+    from py2neo import Graph
+    from py2neo.internal.hydration import PackStreamHydrator
+    graph = Graph("http://localhost:7474", cache_policy=policy)
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["_"])
+    queries = []
+
+    def run(cypher, parameters=None):
+        queries.append(cypher)
+        return [hydrator.hydrate([Structure(b"R", 7, 1, 2, "KNOWS", {"since": 1999})]),
+                hydrator.hydrate([Structure(b"R", 8, 2, 1, "LIKES", {})])]
+
+    graph.run = run
+    relationships = graph.relationships.get((8, 9, 7))
+    assert relationships[1] is None
+    assert (type(relationships[0]).__name__, type(relationships[2]).__name__) == ("LIKES", "KNOWS")
+    assert relationships[2]["since"] == 1999
+    assert len(queries) == 1
+
+
+def test_invalidated_nodes_are_refreshed_in_one_query():
+    from neobolt.packstream import Structure
+    from py2neo import Graph
+    from py2neo.internal.hydration import PackStreamHydrator
+    graph = Graph("http://localhost:7474", cache_policy="lru")
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["_"])
+    alice = hydrator.hydrate_node(None, 1, ["Person"], {"name": "Alice"})
+    bob = hydrator.hydrate_node(None, 2, ["Person"], {"name": "Bob"})
+    queries = []
+
+    def run(cypher, parameters=None):
+        queries.append(cypher)
+        return [hydrator.hydrate([Structure(b"N", 1, ["Person"], {"name": "Alicia"})])]
+
+    graph.run = run
+    try:
+        assert graph.nodes.get([1, 2]) == [alice, bob]
+        assert queries == []
+        graph.invalidate([1])
+        assert 1 not in graph.node_cache and 2 in graph.node_cache
+        nodes = graph.nodes.get([1, 2])
+        assert nodes[0] is alice and nodes[1] is bob
+        assert alice["name"] == "Alicia"
+        assert queries == ["MATCH (_) WHERE id(_) in [1] RETURN _"]
+        graph.invalidate()
+        assert 1 not in graph.node_cache and 2 not in graph.node_cache
+    finally:
+        del graph.run
+
+
+def test_commit_callbacks_only_run_after_commit():
+    from py2neo import Graph
+    from py2neo.database import Transaction
+    connector = Graph("http://localhost:7474").database.connector
+    calls = []
+    connector.begin = lambda: "tx"
+    connector.commit = lambda tx: calls.append("commit")
+    connector.rollback = lambda tx: calls.append("rollback")
+    connector.is_valid_transaction = lambda tx: True
+    try:
+        tx = Transaction(Graph("http://localhost:7474"))
+        tx._on_commit(lambda: calls.append("callback"))
+        tx.rollback()
+        assert calls == ["rollback"]
+        del calls[:]
+        tx = Transaction(Graph("http://localhost:7474"))
+        tx._on_commit(lambda: calls.append("callback"))
+        tx._checkpoint()
+        tx._on_commit(lambda: calls.append("callback"))
+        tx.commit()
+        assert calls == ["commit", "callback", "commit", "callback"]
+    finally:
+        del connector.begin, connector.commit, connector.rollback, connector.is_valid_transaction
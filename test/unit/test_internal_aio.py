@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from sys import version_info
+
+from pytest import mark, raises
+
+from py2neo import Graph
+
+
+requires_asyncio = mark.skipif(version_info < (3, 5), reason="Asyncio support requires Python 3.5 or above")
+
+
+def run(awaitable):
+    from asyncio import new_event_loop
+    loop = new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        loop.close()
+
+
+def completed(value=None, error=None):
+    """ Return an awaitable that immediately produces `value`, or
+    raises `error`.
+    """
+    from asyncio import Future
+    future = Future()
+    if error is None:
+        future.set_result(value)
+    else:
+        future.set_exception(error)
+    return future
+
+
+class FakeAsyncConnection(object):
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self._closed = False
+
+    def sync(self):
+        return completed(error=None if self.alive else ConnectionError("Connection lost"))
+
+    def close(self):
+        self._closed = True
+
+    def closed(self):
+        return self._closed
+
+
+@requires_asyncio
+def test_failed_connection_attempts_do_not_use_up_the_pool():
+    from py2neo.internal.aio import AsyncConnectionPool
+    pool = AsyncConnectionPool(lambda: completed(error=ConnectionError("Refused")), max_size=1)
+    for _ in range(3):
+        with raises(ConnectionError):
+            run(pool.acquire())
+    assert pool.size == 0
+
+
+@requires_asyncio
+def test_dead_idle_connection_is_replaced():
+    from py2neo.internal.aio import AsyncConnectionPool
+    dead, live = FakeAsyncConnection(alive=False), FakeAsyncConnection()
+    connections = [dead, live]
+    pool = AsyncConnectionPool(lambda: completed(connections.pop(0)), max_size=1)
+    cx = run(pool.acquire())
+    pool.release(cx)
+    assert run(pool.acquire()) is live
+    assert dead.closed()
+    assert pool.size == 1
+
+
+@requires_asyncio
+def test_path_relationship_types_are_looked_up_asynchronously():
+    from py2neo.internal.aio import AsyncConnector, AsyncJSONHydrator
+    from py2neo.internal.hydration import RELATIONSHIP_TYPES_QUERY
+
+    graph = Graph("http://localhost:7474")
+    connector = AsyncConnector("http://localhost:7474")
+    statements = []
+
+    class Lookup(object):
+
+        def __init__(self, records):
+            self.records = list(records)
+
+        def fetch(self):
+            return completed(self.records.pop(0) if self.records else None)
+
+    def lookup(statement, parameters=None, **kwargs):
+        statements.append((statement, sorted(parameters["x"])))
+        return completed(Lookup((r_id, "KNOWS") for r_id in parameters["x"]))
+
+    def blocking_run(*args, **kwargs):
+        raise AssertionError("Blocking query run on the event loop")
+
+    connector.run = lookup
+    graph.run = blocking_run
+    hydrator = AsyncJSONHydrator(version="rest", graph=graph, keys=["p"])
+    path = {"nodes": ["/node/1", "/node/2", "/node/3"], "relationships": ["/relationship/7", "/relationship/8"],
+            "directions": ["->", "->"]}
+    records = [[path], [path]]
+    run(connector._resolve_relationship_types(hydrator, records))
+    assert statements == [(RELATIONSHIP_TYPES_QUERY, [7, 8])]
+    (p,), _ = hydrator.hydrate_records(records)
+    assert [type(r).__name__ for r in p.relationships] == ["KNOWS", "KNOWS"]
+
+
+@requires_asyncio
+def test_async_http_results_never_look_up_relationship_types_by_blocking():
+    from json import dumps as json_dumps
+    from py2neo.internal.aio import AsyncConnector
+    from py2neo.internal.hydration import HydrationError, RELATIONSHIP_TYPES_QUERY
+
+    graph = Graph("http://localhost:7474")
+    connector = AsyncConnector("http://localhost:7474")
+    path = {"nodes": ["/node/1", "/node/2", "/node/3"], "relationships": ["/relationship/7", "/relationship/8"],
+            "directions": ["->", "->"]}
+    known = {7: "KNOWS", 8: "LIKES"}
+    statements = []
+
+    def post(url, statement=None, parameters=None):
+        statements.append(statement)
+        if statement == RELATIONSHIP_TYPES_QUERY:
+            result = {"columns": ["id(r)", "type(r)"],
+                      "data": [{"rest": [r_id, known[r_id]]} for r_id in parameters["x"] if r_id in known]}
+        else:
+            result = {"columns": ["p"], "data": [{"rest": [path]}]}
+        return completed((200, {}, json_dumps({"results": [result], "errors": []}).encode("utf-8")))
+
+    def blocking_run(*args, **kwargs):
+        raise AssertionError("Blocking query run on the event loop")
+
+    connector._post = post
+    graph.run = blocking_run
+    result = run(connector.run("MATCH p=()-->()-->() RETURN p", graph=graph))
+    p, = run(result.fetch())
+    assert [type(r).__name__ for r in p.relationships] == ["KNOWS", "LIKES"]
+    assert statements == ["MATCH p=()-->()-->() RETURN p", RELATIONSHIP_TYPES_QUERY]
+
+    # A relationship deleted before its type could be looked up
+    del known[8]
+    graph.relationship_cache.clear()
+    with raises(HydrationError):
+        run(connector.run("MATCH p=()-->()-->() RETURN p", graph=graph))
+
+
+@requires_asyncio
+def test_async_http_request_with_unexpected_status_raises():
+    from py2neo.database import GraphError
+    from py2neo.internal.aio import AsyncConnector
+
+    connector = AsyncConnector("http://localhost:7474")
+    connector._post = lambda url, statement=None, parameters=None: completed((404, {}, b""))
+    with raises(GraphError) as e:
+        run(connector.run("RETURN 1", tx="1"))
+    assert e.value.http_status_code == 404
+
+
+@requires_asyncio
+def test_async_graph_does_not_open_a_blocking_connection_pool():
+    from py2neo.aio import AsyncGraph
+
+    graph = AsyncGraph("http://localhost:7474")
+    assert graph.graph.database._connector is None
+    graph.close()
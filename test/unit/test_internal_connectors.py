@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from collections import deque
+from json import dumps as json_dumps, loads as json_loads
+from threading import Thread
+from zlib import decompress, MAX_WBITS
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from neobolt.direct import Response
+from neobolt.routing import READ_ACCESS, WRITE_ACCESS, RoutingTable
+from neobolt.exceptions import ServiceUnavailable
+from pytest import raises
+
+from py2neo.data import Path
+from py2neo.database import ClientError, Graph, GraphError, TransactionError
+from py2neo.internal import connectors
+from py2neo.internal.connectors import BoltConnectionPool, BoltRoutingConnectionPool, Connector, gzip_compress
+from py2neo.internal.hydration import CypherResult, JSONHydrator, RELATIONSHIP_TYPES_QUERY
+
+
+ADDRESS = ("localhost", 7687)
+READER = ("127.0.0.1", 7688)
+WRITER = ("127.0.0.1", 7689)
+
+
+class FakeConnection(object):
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.resets = 0
+        self._closed = False
+
+    def closed(self):
+        return self._closed
+
+    def defunct(self):
+        return False
+
+    def timedout(self):
+        return False
+
+    def reset(self):
+        self.resets += 1
+        if not self.alive:
+            raise ServiceUnavailable("Connection lost")
+
+    def close(self):
+        self._closed = True
+
+
+class FakeConnector(object):
+
+    def __init__(self, *connections):
+        self.connections = list(connections)
+
+    def __call__(self, address, **config):
+        return self.connections.pop(0)
+
+
+def test_released_connection_is_reused():
+    cx = FakeConnection()
+    pool = BoltConnectionPool(FakeConnector(cx), ADDRESS)
+    assert pool.acquire() is cx
+    pool.release(cx)
+    assert pool.acquire() is cx
+
+
+def test_idle_connection_is_evicted():
+    cx_1, cx_2 = FakeConnection(), FakeConnection()
+    pool = BoltConnectionPool(FakeConnector(cx_1, cx_2), ADDRESS, max_idle_time=0)
+    pool.release(pool.acquire())
+    cx_1.last_used -= 1
+    assert pool.acquire() is cx_2
+    assert cx_1.closed()
+
+
+def test_idle_connection_is_checked_before_reuse():
+    cx = FakeConnection()
+    pool = BoltConnectionPool(FakeConnector(cx), ADDRESS, liveness_check_timeout=0)
+    pool.release(pool.acquire())
+    cx.last_used -= 1
+    assert pool.acquire() is cx
+    assert cx.resets == 1
+
+
+def test_dead_connection_is_replaced():
+    cx_1, cx_2 = FakeConnection(alive=False), FakeConnection()
+    pool = BoltConnectionPool(FakeConnector(cx_1, cx_2), ADDRESS, liveness_check_timeout=0)
+    pool.release(pool.acquire())
+    cx_1.last_used -= 1
+    assert pool.acquire() is cx_2
+    assert cx_1.closed()
+    assert list(pool.connections[ADDRESS]) == [cx_2]
+
+
+def make_routing_pool(*connections, **config):
+    pool = BoltRoutingConnectionPool(FakeConnector(*connections), ADDRESS, {}, **config)
+    pool.routing_table = RoutingTable([ADDRESS], [READER], [WRITER], ttl=300)
+    return pool
+
+
+def test_idle_routed_connections_are_evicted_for_every_server():
+    reader, writer, new_writer = FakeConnection(), FakeConnection(), FakeConnection()
+    pool = make_routing_pool(reader, writer, new_writer, max_idle_time=0)
+    pool.release(pool.acquire(READ_ACCESS))
+    pool.release(pool.acquire(WRITE_ACCESS))
+    reader.last_used -= 1
+    writer.last_used -= 1
+    assert pool.acquire(WRITE_ACCESS) is new_writer
+    assert reader.closed() and writer.closed()
+    assert list(pool.connections[READER]) == []
+
+
+def test_dead_routed_connection_is_replaced():
+    dead, live = FakeConnection(alive=False), FakeConnection()
+    pool = make_routing_pool(dead, live, liveness_check_timeout=0)
+    pool.release(pool.acquire(READ_ACCESS))
+    dead.last_used -= 1
+    assert pool.acquire(READ_ACCESS) is live
+    assert dead.resets == 1 and dead.closed()
+    assert list(pool.connections[READER]) == [live]
+
+
+def test_connectors_track_transactions_separately():
+    connector_1 = Connector("http://localhost:7474")
+    connector_2 = Connector("http://localhost:7474")
+    connector_1.transactions.add(object())
+    assert not connector_2.transactions
+
+
+def test_http_connector_prebuilds_headers():
+    connector = Connector("http://localhost:7474", compress_requests=True)
+    assert connector.json_headers["Content-Type"] == "application/json"
+    assert connector.json_headers["Content-Encoding"] == "gzip"
+    assert "Content-Type" not in connector.headers
+
+
+def test_gzip_compression():
+    data = b'{"statements":[]}'
+    assert decompress(gzip_compress(data), 16 + MAX_WBITS) == data
+
+
+class FakeHTTPServer(ThreadingMixIn, HTTPServer):
+    """ Stands in for the Neo4j HTTP transactional endpoint, replying
+    to a path query with a single path and to a relationship type
+    lookup with the type of each relationship requested.
+    """
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("localhost", 0), FakeHTTPRequestHandler)
+        self.statements = []
+
+    @property
+    def uri(self):
+        return "http://localhost:%d" % self.server_address[1]
+
+
+class FakeHTTPRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    # Drop idle keep-alive connections, so that the request thread
+    # finishes, and can be joined, soon after the test ends.
+    timeout = 0.5
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json_loads(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))
+        results = []
+        for statement in body["statements"]:
+            self.server.statements.append(statement["statement"])
+            if statement["statement"] == RELATIONSHIP_TYPES_QUERY:
+                data = [{"rest": [r_id, "KNOWS"]} for r_id in statement["parameters"]["x"]]
+                results.append({"columns": ["id(r)", "type(r)"], "data": data})
+            else:
+                path = {"nodes": ["%s/db/data/node/1" % self.server.uri, "%s/db/data/node/2" % self.server.uri],
+                        "relationships": ["%s/db/data/relationship/7" % self.server.uri],
+                        "directions": ["->"]}
+                results.append({"columns": ["p"], "data": [{"rest": [path]}]})
+        data = json_dumps({"results": results, "errors": []}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def test_path_types_can_be_resolved_with_a_single_http_connection(monkeypatch):
+    # Small chunks keep the response, and so its connection, open
+    # while the path is hydrated.
+    monkeypatch.setattr(connectors, "HTTP_CHUNK_SIZE", 16)
+    server = FakeHTTPServer()
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        graph = Graph(server.uri, max_connections=1, acquire_timeout=1)
+        path = graph.evaluate("MATCH p=()-->() RETURN p")
+        assert isinstance(path, Path)
+        assert [type(r).__name__ for r in path.relationships] == ["KNOWS"]
+        assert server.statements == ["MATCH p=()-->() RETURN p", RELATIONSHIP_TYPES_QUERY]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class FakeHTTPResponse(object):
+    """ Stands in for a streamed HTTP response, recording whether its
+    connection has been released back to the pool.
+    """
+
+    status = 200
+
+    def __init__(self, body):
+        self.body = json_dumps(body).encode("utf-8")
+        self.released = False
+
+    def stream(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        self.released = True
+
+
+def test_path_types_are_looked_up_after_the_response_is_released(monkeypatch):
+    graph = Graph("http://localhost:7474")
+    connector = Connector("http://localhost:7474")
+    path = {"nodes": ["http://localhost:7474/db/data/node/1", "http://localhost:7474/db/data/node/2"],
+            "relationships": ["http://localhost:7474/db/data/relationship/8"],
+            "directions": ["->"]}
+    r = FakeHTTPResponse({"results": [{"columns": ["n"], "data": [{"rest": [1]}]},
+                                      {"columns": ["p"], "data": [{"rest": [path]}]}],
+                          "errors": []})
+    lookups = []
+
+    def run(cypher, **parameters):
+        assert r.released
+        lookups.append((cypher, parameters))
+        return iter([(8, "KNOWS")])
+
+    monkeypatch.setattr(graph, "run", run)
+    results = [(JSONHydrator("rest", graph, None), CypherResult()) for _ in range(2)]
+    for _ in connector._stream(r, results):
+        pass
+    assert lookups == [(RELATIONSHIP_TYPES_QUERY, {"x": [8]})]
+    assert results[0][1].fetch_many(10) == [(1,)]
+    [(p,)] = results[1][1].fetch_many(10)
+    assert [type(rel).__name__ for rel in p.relationships] == ["KNOWS"]
+
+
+def test_http_request_with_unexpected_status_raises():
+
+    class Response(FakeHTTPResponse):
+
+        status = 404
+
+        def read(self):
+            return self.body
+
+    connector = Connector("http://localhost:7474")
+    r = Response({"errors": []})
+    connector._post = lambda url, statements=(), preload_content=True: r
+    with raises(GraphError) as e:
+        connector.run("RETURN 1", tx="1")
+    assert e.value.http_status_code == 404
+    assert r.released
+
+
+class FakeTransactionConnection(object):
+    """ Stands in for a Bolt connection with an open transaction,
+    replying to each queued statement with the next scripted outcome:
+    either a list of records or a failure. As with a real connection,
+    a failure resets the connection, and the server ignores all
+    statements queued behind the one that failed.
+    """
+
+    protocol_version = 2
+
+    def __init__(self, *outcomes):
+        self.outcomes = deque(outcomes)
+        self.responses = deque()
+
+    def run(self, statement, parameters, **handlers):
+        self.responses.append(("RUN", self.outcomes[0], Response(self, **handlers)))
+
+    def pull_all(self, **handlers):
+        self.responses.append(("PULL_ALL", self.outcomes.popleft(), Response(self, **handlers)))
+
+    def send(self):
+        pass
+
+    def fetch(self):
+        message, outcome, response = self.responses.popleft()
+        if isinstance(outcome, dict):
+            if message == "RUN":
+                response.on_failure(outcome)
+            else:
+                response.on_ignored({})
+        elif message == "RUN":
+            response.on_success({"fields": ["n"]})
+        else:
+            response.on_records(outcome)
+            response.on_success({})
+
+    def sync(self):
+        while self.responses:
+            self.fetch()
+
+    def reset(self):
+        while self.responses:
+            _, _, response = self.responses.popleft()
+            response.on_ignored({})
+
+
+class FakeBoltPool(object):
+
+    def release(self, cx):
+        pass
+
+
+def test_pipelined_statements_after_a_failure_are_not_empty():
+    connector = Connector("bolt://localhost:7687")
+    connector.pool = FakeBoltPool()
+    failure = {"code": "Neo.ClientError.Statement.SyntaxError", "message": "Invalid input"}
+    tx = FakeTransactionConnection([[1]], failure, [[3]])
+    connector.transactions.add(tx)
+    results = [connector.run("RETURN 1", tx=tx, pipelined=True),
+               connector.run("RETRUN 2", tx=tx, pipelined=True),
+               connector.run("RETURN 3", tx=tx, pipelined=True)]
+    assert results[0].fetch_values() == (1,)
+    with raises(ClientError):
+        results[1].fetch_values()
+    with raises(TransactionError):
+        results[2].fetch_values()
+    with raises(TransactionError):
+        results[2].keys()
+    assert not connector.is_valid_transaction(tx)
+
+
+def test_pipelined_statements_each_raise_their_own_error():
+    connector = Connector("bolt://localhost:7687")
+    connector.pool = FakeBoltPool()
+    failure = {"code": "Neo.ClientError.Statement.SyntaxError", "message": "Invalid input"}
+    tx = FakeTransactionConnection([[1]], failure, [[3]])
+    connector.transactions.add(tx)
+    results = [connector.run("RETURN 1", tx=tx, pipelined=True),
+               connector.run("RETRUN 2", tx=tx, pipelined=True),
+               connector.run("RETURN 3", tx=tx, pipelined=True)]
+    with raises(ClientError):
+        tx.sync()
+    with raises(TransactionError) as e:
+        results[0].fetch_values()
+    assert "rolled back" in str(e.value)
+    with raises(ClientError) as e:
+        results[1].keys()
+    assert e.value.code == "Neo.ClientError.Statement.SyntaxError"
+    with raises(TransactionError) as e:
+        results[2].fetch_values()
+    assert "not executed" in str(e.value)
+    assert not connector.is_valid_transaction(tx)
+    assert tx not in connector.pipelined_results
+
+
+def test_pipelined_statements_succeed_together():
+    connector = Connector("bolt://localhost:7687")
+    connector.pool = FakeBoltPool()
+    tx = FakeTransactionConnection([[1]], [[2], [3]])
+    connector.transactions.add(tx)
+    results = [connector.run("RETURN 1", tx=tx, pipelined=True),
+               connector.run("UNWIND [2, 3] AS n RETURN n", tx=tx, pipelined=True)]
+    tx.sync()
+    assert results[0].fetch_many(10) == [(1,)]
+    assert results[1].fetch_many(10) == [(2,), (3,)]
+
+
+def test_pipelined_http_statements_after_a_failure_raise():
+    connector = Connector("http://localhost:7474")
+    failure = {"code": "Neo.ClientError.Statement.SyntaxError", "message": "Invalid input"}
+    requests = []
+
+    def post(url, statements=(), preload_content=True):
+        requests.append((url, list(statements)))
+        return FakeHTTPResponse({"results": [{"columns": ["1"], "data": [{"rest": [1]}]}], "errors": [failure]})
+
+    connector._post = post
+    graph = Graph("http://localhost:7474")
+    tx = "1"
+    connector.transactions.add(tx)
+    connector.pending[tx] = []
+    results = [connector.run("RETURN 1", tx=tx, graph=graph, pipelined=True),
+               connector.run("RETRUN 2", tx=tx, graph=graph, pipelined=True),
+               connector.run("RETURN 3", tx=tx, graph=graph, pipelined=True)]
+    with raises(ClientError):
+        connector.sync(tx)
+    assert len(requests) == 1 and len(requests[0][1]) == 3
+    with raises(TransactionError):
+        results[0].fetch_many(10)
+    with raises(ClientError):
+        results[1].fetch_values()
+    with raises(TransactionError):
+        results[2].fetch_values()
+    with raises(TransactionError):
+        results[2].keys()
+    assert not connector.is_valid_transaction(tx)
+
+
+def pipelined_http_transaction(post):
+    connector = Connector("http://localhost:7474")
+    connector._post = post
+    graph = Graph("http://localhost:7474")
+    tx = "1"
+    connector.transactions.add(tx)
+    connector.pending[tx] = []
+    results = [connector.run("RETURN 1", tx=tx, graph=graph, pipelined=True),
+               connector.run("RETURN 2", tx=tx, graph=graph, pipelined=True)]
+    return connector, tx, results
+
+
+def test_pipelined_http_statements_fail_with_the_request():
+
+    def post(url, statements=(), preload_content=True):
+        raise IOError("Connection refused")
+
+    connector, tx, results = pipelined_http_transaction(post)
+    with raises(IOError):
+        results[1].keys()
+    for result in results:
+        with raises(IOError):
+            result.keys()
+        with raises(IOError):
+            result.fetch_values()
+    assert not connector.is_valid_transaction(tx)
+
+
+def test_pipelined_http_statements_fail_with_an_unexpected_status():
+
+    class Response(FakeHTTPResponse):
+
+        status = 500
+
+        def read(self):
+            return self.body
+
+    responses = []
+
+    def post(url, statements=(), preload_content=True):
+        responses.append(Response({}))
+        responses[-1].body = b"Internal Server Error"
+        return responses[-1]
+
+    connector, tx, results = pipelined_http_transaction(post)
+    with raises(GraphError) as e:
+        connector.commit(tx)
+    assert e.value.http_status_code == 500
+    assert responses[0].released
+    for result in results:
+        with raises(GraphError) as e:
+            result.fetch_values()
+        assert e.value.http_status_code == 500
+    assert not connector.is_valid_transaction(tx)
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from neobolt.packstream import Structure
+
+from py2neo.internal.hydration import CypherResult, JSONHydrator, PackStreamHydrator
+from py2neo.internal.hydration.streaming import JSONStream
+
+
+class FakeSource(object):
+
+    def __init__(self, result, size):
+        self.result = result
+        self.remaining = iter(range(size))
+        self.pulls = 0
+
+    def __call__(self):
+        self.pulls += 1
+        try:
+            self.result.append_records([[next(self.remaining)]])
+        except StopIteration:
+            self.result.done()
+
+
+def make_result(size, fetch_size=None):
+    result = CypherResult({"fields": ["n"]}, fetch_size=fetch_size)
+    source = FakeSource(result, size)
+    result._on_more = source
+    return result, source
+
+
+def test_fetch_pulls_single_record_by_default():
+    result, source = make_result(10)
+    record = result.fetch()
+    assert record["n"] == 0
+    assert source.pulls == 1
+
+
+def test_fetch_pulls_in_batches_of_fetch_size():
+    result, source = make_result(10, fetch_size=4)
+    assert result.fetch()["n"] == 0
+    assert source.pulls == 4
+    assert len(result._records) == 3
+
+
+def test_fetch_does_not_pull_while_records_are_buffered():
+    result, source = make_result(10, fetch_size=4)
+    for n in range(4):
+        assert result.fetch()["n"] == n
+    assert source.pulls == 4
+
+
+def test_fetch_returns_all_records_then_none():
+    result, _ = make_result(5, fetch_size=2)
+    values = []
+    while True:
+        record = result.fetch()
+        if record is None:
+            break
+        values.append(record["n"])
+    assert values == [0, 1, 2, 3, 4]
+
+
+def test_discard_consumes_without_buffering():
+    result, source = make_result(10, fetch_size=4)
+    result.fetch()
+    result.discard()
+    assert source.pulls == 11
+    assert len(result._records) == 0
+    assert result.fetch() is None
+
+
+def test_interleaved_results_keep_all_records():
+    # Two results that share a connection, and therefore a source:
+    # reading the keys of the second drains the rest of the first into
+    # its buffer
+    first = CypherResult({"fields": ["n"]}, fetch_size=2)
+    second = CypherResult(fetch_size=2)
+    messages = [(first, [[n]]) for n in range(6)]
+    messages += [(first, None), (second, {"fields": ["m"]}), (second, [[10]]), (second, None)]
+
+    def more():
+        result, message = messages.pop(0)
+        if message is None:
+            result.done()
+        elif isinstance(message, dict):
+            result.update_metadata(message)
+        else:
+            result.append_records(message)
+
+    first._on_more = more
+    second._on_more = more
+    assert first.fetch()["n"] == 0
+    assert len(first._records) == 1
+    assert second.keys() == ["m"]
+    assert len(first._records) == 5
+    assert [record[0] for record in first.fetch_many(10)] == [1, 2, 3, 4, 5]
+    assert second.fetch_many(10) == [(10,)]
+
+
+def test_json_stream_reads_values_split_across_chunks():
+    stream = JSONStream(iter([b'[12', b'3, "a', b'b", tr', b'ue, {"x": [1', b']}]']))
+    values = []
+    for _ in stream.iter_array():
+        values.append(stream.value())
+    assert values == [123, "ab", True, {"x": [1]}]
+
+
+def test_json_stream_walks_objects():
+    stream = JSONStream(iter([u'{"a": 1, ', u'"b": {}}']))
+    items = []
+    for key in stream.iter_object():
+        items.append((key, stream.value()))
+    assert items == [("a", 1), ("b", {})]
+
+
+def test_json_stream_decodes_multibyte_characters_split_across_chunks():
+    data = u'["café"]'.encode("utf-8")
+    stream = JSONStream(data[i:i + 1] for i in range(len(data)))
+    values = [stream.value() for _ in stream.iter_array()]
+    assert values == [u"café"]
+
+
+def test_json_stream_reads_escaped_strings_split_across_chunks():
+    data = b'["a\\\\\\"b\\\\", 1]'
+    for size in range(1, len(data)):
+        stream = JSONStream(data[i:i + size] for i in range(0, len(data), size))
+        assert [stream.value() for _ in stream.iter_array()] == [u'a\\"b\\', 1]
+
+
+def test_json_stream_reads_numbers_split_across_chunks():
+    data = b'[-12.5e3, 7]'
+    for size in range(1, len(data)):
+        stream = JSONStream(data[i:i + size] for i in range(0, len(data), size))
+        assert [stream.value() for _ in stream.iter_array()] == [-12.5e3, 7]
+
+
+def test_json_response_is_parsed_incrementally():
+    body = (b'{"results":[{"columns":["n"],"data":[{"rest":[1],"meta":[null]},'
+            b'{"rest":[2],"meta":[null]}],"stats":{}}],"errors":[]}')
+    read = []
+
+    def chunks():
+        for i in range(0, len(body), 8):
+            read.append(i)
+            yield body[i:i + 8]
+
+    events = JSONHydrator.iter_response(chunks())
+    assert next(events) == (0, "columns", ["n"])
+    assert next(events) == (0, "record", {"rest": [1], "meta": [None]})
+    assert len(read) < len(range(0, len(body), 8))
+    assert list(events) == [
+        (0, "record", {"rest": [2], "meta": [None]}),
+        (0, "stats", {}),
+        (0, "end", None),
+        (None, "errors", []),
+    ]
+
+
+def test_json_hydrator_builds_entities_directly():
+    from py2neo import Graph, Node
+    graph = Graph("http://localhost:7474")
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=["a", "r", "m"])
+    a, r, m = hydrator.hydrate([
+        {"self": "http://localhost:7474/db/data/node/1",
+         "metadata": {"id": 1, "labels": ["Person"]}, "data": {"name": "Alice"}},
+        {"self": "http://localhost:7474/db/data/relationship/7",
+         "start": "http://localhost:7474/db/data/node/1", "end": "http://localhost:7474/db/data/node/2",
+         "type": "KNOWS", "metadata": {"id": 7, "type": "KNOWS"}, "data": {"since": 1999}},
+        {"x": [1, {"y": 2}]},
+    ])
+    assert isinstance(a, Node)
+    assert a.identity == 1
+    assert a.has_label("Person")
+    assert a["name"] == "Alice"
+    assert r.identity == 7
+    assert type(r).__name__ == "KNOWS"
+    assert r.start_node is a
+    assert r.end_node.identity == 2
+    assert r["since"] == 1999
+    assert m == {"x": [1, {"y": 2}]}
+
+
+def test_json_path_relationship_types_are_taken_from_cache():
+    from py2neo import Graph, Path
+    graph = Graph("http://localhost:7474")
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=["p"])
+    known = hydrator.hydrate_relationship(None, 7, 1, 2, "KNOWS")
+    path = {"nodes": ["http://localhost:7474/db/data/node/1", "http://localhost:7474/db/data/node/2"],
+            "relationships": ["http://localhost:7474/db/data/relationship/7"],
+            "directions": ["->"], "start": "http://localhost:7474/db/data/node/1",
+            "end": "http://localhost:7474/db/data/node/2", "length": 1}
+    records = hydrator.hydrate_records([[path], [path]])
+    p = records[0][0]
+    assert isinstance(p, Path)
+    assert p.relationships[0] is known
+    assert p.start_node.identity == 1
+    assert type(p.relationships[0]).__name__ == "KNOWS"
+    assert records[1][0] == p
+
+
+def test_json_path_relationship_types_are_looked_up_in_one_query():
+    from py2neo import Graph
+    from py2neo.internal.hydration import RELATIONSHIP_TYPES_QUERY
+    graph = Graph("http://localhost:7474")
+    queries = []
+
+    def run(cypher, **parameters):
+        queries.append((cypher, parameters))
+        return iter([(r_id, "KNOWS" if r_id % 2 else "LIKES") for r_id in parameters["x"]])
+
+    graph.run = run
+    uri = "http://localhost:7474/db/data/%s/%d"
+
+    def path(start, length):
+        # relationship i always runs from node i to node i + 1
+        return {"nodes": [uri % ("node", i) for i in range(start, start + length + 1)],
+                "relationships": [uri % ("relationship", i) for i in range(start, start + length)],
+                "directions": ["->"] * length}
+
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=["p", "q"])
+    records = hydrator.hydrate_records([[path(11, 2), path(12, 2)], [path(11, 3), path(12, 1)]])
+    assert len(queries) == 1
+    cypher, parameters = queries[0]
+    assert cypher == RELATIONSHIP_TYPES_QUERY
+    assert sorted(parameters["x"]) == [11, 12, 13]
+    p, q = records[0]
+    assert [type(r).__name__ for r in p.relationships] == ["KNOWS", "LIKES"]
+    assert [type(r).__name__ for r in q.relationships] == ["LIKES", "KNOWS"]
+
+
+def test_packstream_hydrator_passes_scalar_records_through():
+    from py2neo import Graph
+    hydrator = PackStreamHydrator(version=2, graph=Graph("http://localhost:7474"), keys=["a", "b", "c"])
+    assert hydrator.hydrate([1, 2.5, u"three"]) == (1, 2.5, u"three")
+
+
+def test_packstream_hydrator_falls_back_when_structures_appear():
+    from py2neo import Graph, Node
+    hydrator = PackStreamHydrator(version=2, graph=Graph("http://localhost:7474"), keys=["n", "x"])
+    assert hydrator.hydrate([1, None]) == (1, None)
+    n, x = hydrator.hydrate([Structure(b"N", 1, ["Person"], {"name": "Alice"}), [1, 2]])
+    assert isinstance(n, Node)
+    assert n["name"] == "Alice"
+    assert x == [1, 2]
+
+
+def test_packstream_hydrator_only_hydrates_non_scalar_columns():
+    from py2neo import Graph, Node
+    hydrator = PackStreamHydrator(version=2, graph=Graph("http://localhost:7474"), keys=["n", "x", "s"])
+    hydrated = []
+    hydrate_object = hydrator.hydrate_object
+
+    def spy(obj, inst=None):
+        hydrated.append(obj)
+        return hydrate_object(obj, inst)
+
+    hydrator.hydrate_object = spy
+    for i in range(3):
+        node = Structure(b"N", i, ["Person"], {})
+        n, x, s = hydrator.hydrate([node, i, u"s"])
+        assert isinstance(n, Node)
+        assert (x, s) == (i, u"s")
+    assert hydrator.scalar_columns == [False, True, True]
+    assert [obj.fields[0] for obj in hydrated if isinstance(obj, Structure)] == [0, 1, 2]
+    assert all(isinstance(obj, (Structure, dict)) for obj in hydrated)
+    n, x, s = hydrator.hydrate([None, Structure(b"N", 9, [], {}), u"s"])
+    assert isinstance(x, Node)
+    assert hydrator.scalar_columns == [False, False, True]
+
+
+def test_lazy_packstream_hydration_returns_proxies():
+    from py2neo import Graph, Node
+    from py2neo.data import LazyNode
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    n, = hydrator.hydrate([Structure(b"N", 101, ["Person"], {"name": "Alice", "age": 33})])
+    assert isinstance(n, LazyNode)
+    assert n.identity == 101
+    assert n["name"] == "Alice"
+    assert n["email"] is None
+    assert n.get("age") == 33
+    assert dict(n) == {"name": "Alice", "age": 33}
+    assert n.has_label("Person")
+    assert set(n.labels) == {"Person"}
+    assert 101 not in graph.node_cache
+    node = Node("Person", name="Alice", age=33)
+    node.graph = graph
+    node.identity = 101
+    assert n == node and node == n
+    assert hash(n) == hash(node)
+    assert repr(n) == repr(node)
+
+
+def test_lazy_node_materializes_when_modified():
+    from py2neo import Graph, Node
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    n, = hydrator.hydrate([Structure(b"N", 102, ["Person"], {"name": "Bob"})])
+    n["age"] = 44
+    n.add_label("Employee")
+    node = n.materialize()
+    assert isinstance(node, Node)
+    assert graph.node_cache[102] is node
+    assert node["age"] == 44
+    assert n["age"] == 44
+    assert n.has_label("Employee")
+    assert node.nodes == (node,)
+
+
+def test_lazy_node_materializes_when_related():
+    from py2neo import Graph, Node, Relationship
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    n, = hydrator.hydrate([Structure(b"N", 103, ["Person"], {"name": "Carol"})])
+    r = Relationship(n, "KNOWS", Node(name="Dave"))
+    assert r.start_node is n.materialize()
+
+
+def test_lazy_node_materializes_in_subgraphs():
+    from py2neo import Graph, Node, Relationship, Subgraph
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    n, = hydrator.hydrate([Structure(b"N", 106, ["Person"], {"name": "Frank"})])
+    dave = Node(name="Dave")
+    r = Relationship(n, "KNOWS", dave)
+    node = n.materialize()
+    assert set(Subgraph([n]).nodes) == {node}
+    assert all(type(x) is Node for x in Subgraph([n]).nodes)
+    assert set((n | dave).nodes) == {node, dave}
+    assert set((Subgraph([dave]) | n).nodes) == {node, dave}
+    assert set((n & Subgraph([n, dave])).nodes) == {node}
+    assert set((Subgraph([n, dave]) - n).nodes) == {dave}
+    assert set((n ^ Subgraph([dave])).nodes) == {node, dave}
+    walkable = n + r
+    assert list(walkable.nodes) == [node, dave]
+    assert list(walkable.relationships) == [r]
+
+
+def test_lazy_hydration_reuses_cached_nodes():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    eager = PackStreamHydrator(version=2, graph=graph, keys=["n"])
+    lazy = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    a, = eager.hydrate([Structure(b"N", 104, ["Person"], {"name": "Alice"})])
+    b, = lazy.hydrate([Structure(b"N", 104, ["Person"], {"name": "Alicia"})])
+    assert b is a
+    assert a["name"] == "Alicia"
+
+
+def test_lazy_node_materializes_as_cached_node_unchanged():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    lazy = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    eager = PackStreamHydrator(version=2, graph=graph, keys=["n"])
+    n, = lazy.hydrate([Structure(b"N", 105, ["Person"], {"name": "Eve"})])
+    a, = eager.hydrate([Structure(b"N", 105, ["Person", "Employee"], {"name": "Eve", "age": 27})])
+    a["age"] = 28
+    assert n.materialize() is a
+    assert dict(a) == {"name": "Eve", "age": 28}
+    assert set(a.labels) == {"Person", "Employee"}
+    assert a._dirty
+    assert n["age"] == 28
+
+
+def test_lazy_node_materializes_over_cached_placeholder():
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n", "r"], lazy=True)
+    n, r = hydrator.hydrate([Structure(b"N", 107, ["Person"], {"name": "Gina"}),
+                             Structure(b"R", 9, 107, 108, "KNOWS", {})])
+    assert graph.node_cache.peek(107)._stale == {"labels", "properties"}
+    node = n.materialize()
+    assert node is r.start_node
+    assert not node._stale
+    assert dict(node) == {"name": "Gina"}
+    assert set(node.labels) == {"Person"}
+    assert not node._dirty
+
+
+def test_lazy_hydration_converts_structured_property_values():
+    from neotime import Date
+    from py2neo import Graph
+    graph = Graph("http://localhost:7474")
+    hydrator = PackStreamHydrator(version=2, graph=graph, keys=["n"], lazy=True)
+    n, = hydrator.hydrate([Structure(b"N", 105, [], {"born": Structure(b"D", 0)})])
+    assert n["born"] == Date(1970, 1, 1)
+
+
+def test_lazy_json_hydration_returns_proxies():
+    from py2neo import Graph
+    from py2neo.data import LazyNode
+    graph = Graph("http://localhost:7474")
+    graph.node_cache.clear()
+    hydrator = JSONHydrator(version="rest", graph=graph, keys=["a"], lazy=True)
+    a, = hydrator.hydrate([{"self": "http://localhost:7474/db/data/node/106",
+                            "metadata": {"id": 106, "labels": ["Person"]}, "data": {"name": "Alice"}}])
+    assert isinstance(a, LazyNode)
+    assert a.identity == 106
+    assert a["name"] == "Alice"
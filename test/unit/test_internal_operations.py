@@ -0,0 +1,494 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# Copyright 2011-2019, Nigel Small
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from itertools import count
+from threading import Lock, current_thread
+from time import sleep
+from warnings import catch_warnings, simplefilter
+
+from pytest import raises
+
+from py2neo import Graph, Node, Relationship, Subgraph
+from py2neo.database import TransientError
+from py2neo.internal.operations import bulk_create_subgraph, create_subgraph, merge_subgraph, \
+    merge_relationships_by_key, pull_subgraph, push_subgraph
+
+
+class FakeTransaction(object):
+    """ Stands in for a :class:`.Transaction`, recording the size of
+    each batch sent and returning a new identity for every entity.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.entities = []
+        self.batches = []
+        self.checkpoints = []
+        self.statements = []
+        self.callbacks = []
+        self.identities = count()
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        data = dict(parameters or {}, **kwparameters)["x"]
+        self.statements.append((cypher, data))
+        self.batches.append(len(data))
+        return [(next(self.identities),) for _ in data]
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        self.cypher = cypher
+        return len(self.run(cypher, parameters, **kwparameters))
+
+    def _checkpoint(self):
+        self.checkpoints.append(len(self.batches))
+
+    def _on_commit(self, callback):
+        self.callbacks.append(callback)
+
+    def commit(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        self.callbacks = []
+
+
+def make_chain(size):
+    nodes = [Node("Person", name="Person %d" % i) for i in range(size)]
+    relationships = [Relationship(a, "KNOWS", b) for a, b in zip(nodes, nodes[1:])]
+    return Subgraph(nodes, relationships)
+
+
+def test_create_subgraph_in_one_batch_per_group():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    create_subgraph(tx, make_chain(10))
+    assert tx.batches == [10, 9]
+    assert tx.checkpoints == []
+
+
+def test_create_subgraph_in_batches():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(10)
+    create_subgraph(tx, subgraph, batch_size=4)
+    assert tx.batches == [4, 4, 2, 4, 4, 1]
+    identities = set(node.identity for node in subgraph.nodes)
+    assert identities == set(range(10))
+    for relationship in subgraph.relationships:
+        assert relationship.graph is tx.graph
+        assert tx.graph.relationship_cache.get(relationship.identity) is relationship
+
+
+def test_create_subgraph_commits_every_n_batches():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    create_subgraph(tx, make_chain(10), batch_size=4, commit_every=2)
+    assert tx.checkpoints == [2, 4]
+
+
+def test_merge_subgraph_in_batches():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(5)
+    merge_subgraph(tx, subgraph, "Person", "name", batch_size=2, commit_every=1)
+    assert tx.batches == [2, 2, 1, 2, 2]
+    assert tx.checkpoints == [1, 2, 3, 4]
+    assert all(node.graph is tx.graph for node in subgraph.nodes)
+
+
+def test_merge_subgraph_on_two_property_keys():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    alice = Node("Person", name="Alice", email="alice@example.com")
+    merge_subgraph(tx, Subgraph([alice]), "Person", ("name", "email"))
+    [(cypher, data)] = tx.statements
+    assert "MERGE (_:Person {name:data[0][0], email:data[0][1]})" in cypher
+    assert data == [[["Alice", "alice@example.com"], {"name": "Alice", "email": "alice@example.com"}]]
+    assert alice.graph is tx.graph
+
+
+def test_graph_merge_on_two_property_keys():
+    graph = Graph("http://localhost:7474")
+    calls = []
+
+    class FakeTransactionContext(object):
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def merge(self, *args, **kwargs):
+            calls.append((args, kwargs))
+
+    graph.begin = FakeTransactionContext
+    alice = Node("Person", name="Alice", email="alice@example.com")
+    graph.merge(alice, "Person", "name", "email")
+    graph.merge(alice, "Person", "name", batch_size=10)
+    assert calls == [((alice, "Person", ("name", "email")), {}),
+                     ((alice, "Person", "name"), {"batch_size": 10})]
+
+
+def test_batch_size_must_be_positive():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    with raises(ValueError):
+        create_subgraph(tx, make_chain(2), batch_size=0)
+    with raises(ValueError):
+        create_subgraph(tx, make_chain(2), commit_every=0)
+
+
+class FakeBulkGraph(object):
+    """ Stands in for the transactions of a :class:`.Graph` during a
+    bulk load, recording the threads on which batches are run.
+    """
+
+    def __init__(self, graph, failures=0):
+        self.graph = graph
+        self.lock = Lock()
+        self.identities = count()
+        self.threads = set()
+        self.batches = []
+        self.commits = 0
+        self.failures = failures
+
+    def begin(self):
+        return FakeBulkTransaction(self)
+
+
+class FakeBulkTransaction(object):
+
+    def __init__(self, bulk):
+        self.bulk = bulk
+        self.graph = bulk.graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            with self.bulk.lock:
+                self.bulk.commits += 1
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        data = dict(parameters or {}, **kwparameters)["x"]
+        bulk = self.bulk
+        sleep(0.01)
+        with bulk.lock:
+            if bulk.failures:
+                bulk.failures -= 1
+                raise TransientError("Deadlock detected")
+            bulk.threads.add(current_thread().name)
+            bulk.batches.append((cypher.split()[4], len(data)))
+            return [(next(bulk.identities),) for _ in data]
+
+
+def test_bulk_create_runs_batches_concurrently():
+    graph = Graph("http://localhost:7474")
+    bulk = FakeBulkGraph(graph)
+    graph.begin = bulk.begin
+    subgraph = make_chain(10) | Node("Company", name="ACME")
+    bulk_create_subgraph(graph, subgraph, workers=3, batch_size=3)
+    assert len(bulk.threads) > 1
+    assert bulk.commits == 8
+    assert sorted(size for kind, size in bulk.batches) == [1, 1, 3, 3, 3, 3, 3, 3]
+    assert set(node.identity for node in subgraph.nodes) | set(r.identity for r in subgraph.relationships) == \
+        set(range(20))
+    for node in subgraph.nodes:
+        assert node.graph is graph
+        assert graph.node_cache.get(node.identity) is node
+    for relationship in subgraph.relationships:
+        assert relationship.graph is graph
+        assert graph.relationship_cache.get(relationship.identity) is relationship
+
+
+def test_bulk_create_creates_nodes_before_relationships():
+    graph = Graph("http://localhost:7474")
+    bulk = FakeBulkGraph(graph)
+    graph.begin = bulk.begin
+    bulk_create_subgraph(graph, make_chain(10), workers=4, batch_size=2)
+    kinds = [kind for kind, size in bulk.batches]
+    assert kinds == ["CREATE"] * 5 + ["MATCH"] * 5
+
+
+def test_bulk_create_retries_transient_errors():
+    graph = Graph("http://localhost:7474")
+    bulk = FakeBulkGraph(graph, failures=2)
+    graph.begin = bulk.begin
+    subgraph = make_chain(2)
+    bulk_create_subgraph(graph, subgraph, workers=1, batch_size=10)
+    assert all(node.graph is graph for node in subgraph.nodes)
+
+
+def test_bulk_create_gives_up_after_repeated_transient_errors():
+    graph = Graph("http://localhost:7474")
+    bulk = FakeBulkGraph(graph, failures=3)
+    graph.begin = bulk.begin
+    with raises(TransientError):
+        bulk_create_subgraph(graph, make_chain(2), workers=1, batch_size=10)
+
+
+class FakeSchema(object):
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def get_indexes(self, label):
+        return self.indexes.get(label, [])
+
+
+def test_merge_relationships_by_key_uses_indexes():
+    graph = Graph("http://localhost:7474")
+    graph.schema = FakeSchema({"Person": [("name",)], "Company": [("name",), ("city", "name")]})
+    tx = FakeTransaction(graph)
+    data = (("Person %d" % i, "ACME", {"since": i}) for i in range(5))
+    with catch_warnings(record=True) as warnings:
+        simplefilter("always")
+        total = merge_relationships_by_key(tx, "WORKS_FOR", data, ("Person", "name"), ("Company", "name"),
+                                           batch_size=2)
+    assert not warnings
+    assert total == 5
+    assert tx.batches == [2, 2, 1]
+    assert tx.cypher.splitlines() == [
+        "UNWIND $x AS data",
+        "MATCH (a:Person {name:data[0]}) USING INDEX a:Person(name)",
+        "MATCH (b:Company {name:data[1]}) USING INDEX b:Company(name)",
+        "MERGE (a)-[_:WORKS_FOR]->(b) SET _ = data[2]",
+        "RETURN count(_)",
+    ]
+
+
+def test_create_relationships_by_key_without_index():
+    graph = Graph("http://localhost:7474")
+    graph.schema = FakeSchema({})
+    tx = FakeTransaction(graph)
+    with catch_warnings(record=True) as warnings:
+        simplefilter("always")
+        total = merge_relationships_by_key(tx, "KNOWS", [("Alice", "Bob", {})], ("Person", "name"), merge=False)
+    assert len(warnings) == 1
+    assert total == 1
+    assert tx.cypher.splitlines()[1:4] == [
+        "MATCH (a:Person {name:data[0]})",
+        "MATCH (b:Person {name:data[1]})",
+        "CREATE (a)-[_:KNOWS]->(b) SET _ = data[2]",
+    ]
+
+
+def test_created_entities_are_clean():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(3)
+    create_subgraph(tx, subgraph)
+    assert not any(node._dirty for node in subgraph.nodes)
+    assert not any(relationship._dirty for relationship in subgraph.relationships)
+    del tx.statements[:]
+    push_subgraph(tx, subgraph)
+    assert tx.statements == []
+
+
+def test_push_subgraph_sends_only_changed_entities():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(6)
+    create_subgraph(tx, subgraph)
+    nodes = sorted(subgraph.nodes, key=lambda n: n["name"])
+    relationships = sorted(subgraph.relationships, key=lambda r: r.start_node["name"])
+    del tx.statements[:]
+    nodes[0]["age"] = 33
+    nodes[1]["age"] = 44
+    nodes[2].add_label("Employee")
+    nodes[3].add_label("Employee")
+    nodes[3].remove_label("Person")
+    relationships[0]["since"] = 2000
+    relationships[1]["since"] = 1999
+    push_subgraph(tx, subgraph, batch_size=1)
+    tx.commit()
+    statements = sorted(tx.statements, key=lambda statement: (statement[0], str(statement[1][0][1])))
+    assert statements == sorted([
+        ("UNWIND $x AS data\nMATCH (_) WHERE id(_) = data[0]\nSET _ = data[1]",
+         [[nodes[0].identity, {"name": "Person 0", "age": 33}]]),
+        ("UNWIND $x AS data\nMATCH (_) WHERE id(_) = data[0]\nSET _ = data[1]",
+         [[nodes[1].identity, {"name": "Person 1", "age": 44}]]),
+        ("UNWIND $x AS data\nMATCH (_) WHERE id(_) = data[0]\nSET _:Employee",
+         [[nodes[2].identity, None]]),
+        ("UNWIND $x AS data\nMATCH (_) WHERE id(_) = data[0]\nREMOVE _:Person\nSET _:Employee",
+         [[nodes[3].identity, None]]),
+        ("UNWIND $x AS data MATCH ()-[_]->() WHERE id(_) = data[0] SET _ = data[1]",
+         [[relationships[0].identity, {"since": 2000}]]),
+        ("UNWIND $x AS data MATCH ()-[_]->() WHERE id(_) = data[0] SET _ = data[1]",
+         [[relationships[1].identity, {"since": 1999}]]),
+    ], key=lambda statement: (statement[0], str(statement[1][0][1])))
+    assert nodes[3]._remote_labels == {"Employee"}
+    del tx.statements[:]
+    push_subgraph(tx, subgraph)
+    assert tx.statements == []
+
+
+def test_push_subgraph_groups_nodes_by_change():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(5)
+    create_subgraph(tx, subgraph)
+    del tx.statements[:]
+    for node in subgraph.nodes:
+        node["age"] = 1
+    push_subgraph(tx, subgraph)
+    assert len(tx.statements) == 1
+    assert len(tx.statements[0][1]) == 5
+
+
+def test_push_subgraph_resends_changes_after_rollback():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(2)
+    create_subgraph(tx, subgraph)
+    node = sorted(subgraph.nodes, key=lambda n: n["name"])[0]
+    relationship = list(subgraph.relationships)[0]
+    del tx.statements[:]
+    node["age"] = 33
+    node.add_label("Employee")
+    relationship["since"] = 1999
+    push_subgraph(tx, subgraph)
+    assert node._dirty and relationship._dirty
+    tx.rollback()
+    assert node._dirty and relationship._dirty
+    assert "Employee" not in node._remote_labels
+    pushed = list(tx.statements)
+    del tx.statements[:]
+    push_subgraph(tx, subgraph)
+    assert tx.statements == pushed
+    tx.commit()
+    assert not node._dirty and not relationship._dirty
+    assert node._remote_labels == {"Person", "Employee"}
+    del tx.statements[:]
+    push_subgraph(tx, subgraph)
+    assert tx.statements == []
+
+
+def test_push_subgraph_keeps_changes_made_before_commit():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(2)
+    create_subgraph(tx, subgraph)
+    node = sorted(subgraph.nodes, key=lambda n: n["name"])[0]
+    relationship = list(subgraph.relationships)[0]
+    del tx.statements[:]
+    node["age"] = 33
+    relationship["since"] = 1999
+    push_subgraph(tx, subgraph)
+    node["age"] = 34
+    node.add_label("Employee")
+    relationship["since"] = 2000
+    tx.commit()
+    assert node._dirty and relationship._dirty
+    assert node._remote_labels == {"Person"}
+    del tx.statements[:]
+    push_subgraph(tx, subgraph)
+    pushed = dict((data[0][0], data[0][1]) for _, data in tx.statements)
+    assert pushed == {node.identity: dict(node), relationship.identity: {"since": 2000}}
+    assert "SET _:Employee" in tx.statements[0][0]
+    tx.commit()
+    assert not node._dirty and not relationship._dirty
+    assert node._remote_labels == {"Person", "Employee"}
+
+
+class FakePullTransaction(object):
+    """ Stands in for a :class:`.Transaction`, returning copies of the
+    remote entities held by identity.
+    """
+
+    def __init__(self, graph, remote_nodes, remote_relationships):
+        self.graph = graph
+        self.remote_nodes = remote_nodes
+        self.remote_relationships = remote_relationships
+        self.statements = []
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        ids = dict(parameters or {}, **kwparameters)["x"]
+        self.statements.append((cypher, ids))
+        remote = self.remote_relationships if "-[_]->" in cypher else self.remote_nodes
+        return [(remote[i],) for i in ids if i in remote]
+
+
+def bind(graph, entity, identity):
+    entity.graph = graph
+    entity.identity = identity
+    return entity
+
+
+def test_pull_subgraph_fetches_all_entities_in_two_queries():
+    graph = Graph("http://localhost:7474")
+    alice = bind(graph, Node("Person", name="Alice"), 1)
+    bob = bind(graph, Node("Person", name="Bob"), 2)
+    gone = bind(graph, Node("Person", name="Gone"), 3)
+    ab = bind(graph, Relationship(alice, "KNOWS", bob), 10)
+    remote_alice = bind(graph, Node("Person", "Employee", name="Alice", age=33), 1)
+    remote_ab = bind(graph, Relationship(remote_alice, "KNOWS", bob, since=1999), 10)
+    tx = FakePullTransaction(graph, {1: remote_alice, 2: bob}, {10: remote_ab})
+    bob["age"] = 44
+    pull_subgraph(tx, Subgraph([alice, bob, gone], [ab]))
+    assert len(tx.statements) == 2
+    assert sorted(tx.statements[0][1]) == [1, 2, 3]
+    assert tx.statements[1][1] == [10]
+    assert alice.labels == {"Person", "Employee"}
+    assert alice._remote_labels == {"Person", "Employee"}
+    assert dict(alice) == {"name": "Alice", "age": 33}
+    assert dict(bob) == {"name": "Bob", "age": 44}
+    assert not bob._dirty
+    assert dict(ab) == {"since": 1999}
+    assert dict(gone) == {"name": "Gone"}
+    assert graph.node_cache.get(1) is alice
+    assert graph.relationship_cache.get(10) is ab
+
+
+def test_pull_subgraph_without_an_entity_cache():
+    graph = Graph("http://localhost:7474", cache_policy="none")
+    alice = bind(graph, Node("Person", name="Alice"), 1)
+    bob = bind(graph, Node("Person", name="Bob"), 2)
+    ab = bind(graph, Relationship(alice, "KNOWS", bob), 10)
+    remote_alice = bind(graph, Node("Person", "Employee", name="Alice", age=33), 1)
+    remote_bob = bind(graph, Node("Person", name="Robert"), 2)
+    remote_ab = bind(graph, Relationship(remote_alice, "KNOWS", remote_bob, since=1999), 10)
+    tx = FakePullTransaction(graph, {1: remote_alice, 2: remote_bob}, {10: remote_ab})
+    pull_subgraph(tx, Subgraph([alice, bob], [ab]))
+    assert len(tx.statements) == 2
+    assert alice.labels == {"Person", "Employee"}
+    assert dict(alice) == {"name": "Alice", "age": 33}
+    assert dict(bob) == {"name": "Robert"}
+    assert dict(ab) == {"since": 1999}
+    assert ab.start_node is alice and ab.end_node is bob
+    assert graph.node_cache.get(1) is None
+
+
+def test_pull_subgraph_in_batches():
+    graph = Graph("http://localhost:7474")
+    nodes = [bind(graph, Node(), i) for i in range(5)]
+    tx = FakePullTransaction(graph, {}, {})
+    pull_subgraph(tx, Subgraph(nodes), batch_size=2)
+    assert sorted(len(ids) for _, ids in tx.statements) == [1, 2, 2]
+
+
+def test_push_subgraph_sends_lists_changed_in_place():
+    tx = FakeTransaction(Graph("http://localhost:7474"))
+    subgraph = make_chain(2)
+    node = sorted(subgraph.nodes, key=lambda n: n["name"])[0]
+    relationship = list(subgraph.relationships)[0]
+    node["tags"] = ["a"]
+    relationship["years"] = [1999]
+    create_subgraph(tx, subgraph)
+    tx.commit()
+    del tx.statements[:]
+    node["tags"].append("b")
+    relationship["years"].append(2000)
+    assert not node._dirty and not relationship._dirty
+    push_subgraph(tx, subgraph)
+    tx.commit()
+    pushed = dict((data[0][0], data[0][1]) for _, data in tx.statements)
+    assert pushed == {node.identity: {"name": node["name"], "tags": ["a", "b"]},
+                      relationship.identity: {"years": [1999, 2000]}}